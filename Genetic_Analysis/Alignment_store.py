@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from Genetic_Analysis.Fasta_stream import read_alignment_blocks, fasta_dimensions, DEFAULT_MAX_BYTES
+
+"""
+File name: Alignment_store.py
+Author: Sarah Schoem
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script converts an aligned FASTA file once into a compact binary store and opens it with numpy.memmap,
+    so repeated analyses of the same alignment read no text at all.
+
+    A store is two files that share a path prefix:
+        <prefix>.aln   the alignment as a fixed-width uint8 matrix, one row per sequence
+        <prefix>.json  the accession of every row, the matrix shape and the source file's digest, mtime and size
+
+    Column slices of the memory-mapped matrix are zero-copy, and rows are looked up by accession in O(1) through
+    an index built when the store is opened. store_for() converts on first use and again whenever the source
+    FASTA changes.
+
+License: MIT License
+"""
+
+# Default directory for converted alignments
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alignment_store")
+
+AlignmentStore = namedtuple("AlignmentStore", ["ids", "index", "matrix", "source"])
+AlignmentStore.__doc__ = """ An opened alignment store.
+
+ids (list): accession of every row
+index (dict): accession mapped to the list of rows it appears in
+matrix (numpy.memmap): read-only uint8 matrix of shape (sequences, alignment length)
+source (dict): path, SHA-256 digest, mtime and size of the FASTA file the store was converted from
+"""
+
+
+def file_digest(path):
+    """ Returns the SHA-256 hex digest of a file's contents. """
+    sha = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def convert_fasta(fasta_file, store_path, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Converts an aligned FASTA file into an alignment store, holding at most max_bytes of sequence in memory.
+
+    Args:
+    - fasta_file (str): Path to the aligned FASTA file
+    - store_path (str): Path prefix of the store files to write
+    - max_bytes (int): Memory ceiling for one block of sequences
+
+    Returns:
+    - The store path prefix
+    """
+    n_rows, width = fasta_dimensions(fasta_file)
+    if n_rows == 0 or width == 0:
+        raise ValueError(f"No sequences found in {fasta_file}")
+
+    stat = os.stat(fasta_file)
+    digest = file_digest(fasta_file)
+
+    directory = os.path.dirname(store_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write to temporary files first so a failed conversion never leaves a half-written store behind
+    matrix = np.memmap(store_path + ".aln.tmp", dtype=np.uint8, mode="w+", shape=(n_rows, width))
+    ids = []
+    for block_ids, block in read_alignment_blocks(fasta_file, max_bytes):
+        matrix[len(ids):len(ids) + len(block_ids)] = block
+        ids.extend(block_ids)
+    matrix.flush()
+    del matrix
+
+    metadata = {
+        "ids": ids,
+        "shape": [n_rows, width],
+        "source": {"path": os.path.abspath(fasta_file), "digest": digest,
+                   "mtime_ns": stat.st_mtime_ns, "size": stat.st_size},
+    }
+    with open(store_path + ".json.tmp", "w") as handle:
+        json.dump(metadata, handle)
+
+    os.replace(store_path + ".aln.tmp", store_path + ".aln")
+    os.replace(store_path + ".json.tmp", store_path + ".json")
+    return store_path
+
+
+def open_store(store_path):
+    """
+    Opens an alignment store read-only.
+
+    Args:
+    - store_path (str): Path prefix of the store files
+
+    Returns:
+    - AlignmentStore
+    """
+    with open(store_path + ".json") as handle:
+        metadata = json.load(handle)
+
+    ids = metadata["ids"]
+    n_rows, width = metadata["shape"]
+    matrix = np.memmap(store_path + ".aln", dtype=np.uint8, mode="r", shape=(n_rows, width))
+
+    index = {}
+    for row, accession in enumerate(ids):
+        index.setdefault(accession, []).append(row)
+
+    return AlignmentStore(ids, index, matrix, metadata["source"])
+
+
+def _store_path(fasta_file, store_dir):
+    path_key = hashlib.sha1(os.path.abspath(fasta_file).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(store_dir, f"{os.path.basename(fasta_file)}.{path_key}")
+
+
+def _is_current(store_path, fasta_file):
+    try:
+        with open(store_path + ".json") as handle:
+            metadata = json.load(handle)
+        source = metadata["source"]
+    except (OSError, KeyError, ValueError):
+        return False
+
+    if not os.path.exists(store_path + ".aln"):
+        return False
+
+    stat = os.stat(fasta_file)
+    if source["mtime_ns"] == stat.st_mtime_ns and source["size"] == stat.st_size:
+        return True
+
+    # The file was touched, so the store is only current if the contents are the same
+    if source["size"] != stat.st_size or source["digest"] != file_digest(fasta_file):
+        return False
+
+    # Record the new mtime so the next check does not hash the file again
+    source["mtime_ns"] = stat.st_mtime_ns
+    try:
+        with open(store_path + ".json.tmp", "w") as handle:
+            json.dump(metadata, handle)
+        os.replace(store_path + ".json.tmp", store_path + ".json")
+    except OSError:
+        pass  # A read-only store is still current, it is only checked more slowly
+    return True
+
+
+def store_for(fasta_file, store_dir=STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Opens the store of an aligned FASTA file, converting the file first if it has no store or has changed.
+
+    Args:
+    - fasta_file (str): Path to the aligned FASTA file
+    - store_dir (str): Directory holding converted alignments
+    - max_bytes (int): Memory ceiling for one block of sequences during conversion
+
+    Returns:
+    - AlignmentStore
+    """
+    store_path = _store_path(fasta_file, store_dir)
+    if not _is_current(store_path, fasta_file):
+        convert_fasta(fasta_file, store_path, max_bytes)
+    return open_store(store_path)
+
+
+def store_rows(store, accessions):
+    """
+    Returns the sorted row numbers of the given accessions, skipping any that are not in the store.
+
+    Args:
+    - store (AlignmentStore): An opened store
+    - accessions (iterable of str): Accessions to look up
+
+    Returns:
+    - numpy array of row numbers
+    """
+    rows = [row for accession in accessions for row in store.index.get(accession, ())]
+    return np.array(sorted(rows), dtype=np.intp)
+
+
+def get_sequence(store, accession):
+    """ Returns the aligned sequence of an accession as a str, raising KeyError if it is not in the store. """
+    return store.matrix[store.index[accession][0]].tobytes().decode("ascii")
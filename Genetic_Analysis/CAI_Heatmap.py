@@ -4,7 +4,7 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from Bio import SeqIO
-from Calculate_CAI import calculate_cai
+from Calculate_CAI import calculate_cai_batch
 
 """
 File name: CAI_Heatmap.py
@@ -21,7 +21,8 @@ License: MIT License
 # Data Manipulation #
 ##########
 
-# Load CAI default data
+# Load CAI default data, e.g. written by Score_CAI.py; user sequences below are scored with the same default weights
+# (relative adaptiveness of the influenza codon usage table), so the file should be too
 default_cai_data = pd.DataFrame(columns=["ID", "CAI"])
 default_cai_data = pd.read_csv("H5_CAI_Results_Influenza.csv")
 
@@ -44,11 +45,11 @@ while answer != "N" and answer != "Y":
 
 if user_data != "":
     with open(user_data) as fasta_file:
-        for record in SeqIO.parse(fasta_file, "fasta"):
-            ID = record.id
-            User_CAI = calculate_cai(str(record.seq))
-            new_row = pd.DataFrame([{"Accession": ID, "CAI": User_CAI}])
-            default_cai_data = pd.concat([default_cai_data, new_row], ignore_index=True)
+        records = [(record.id, str(record.seq)) for record in SeqIO.parse(fasta_file, "fasta")]
+
+    # Score every user sequence in one batch and append them all at once
+    user_cai_data = calculate_cai_batch([sequence for _, sequence in records], ids=[ID for ID, _ in records])
+    default_cai_data = pd.concat([default_cai_data, user_cai_data], ignore_index=True)
 
 
 ##########
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from Genetic_Analysis.Alignment_store import file_digest
+from Genetic_Analysis.Calculate_CAI import CODONS, INVALID_CODON, PSEUDOCOUNT, encode_codons, log_weight_table, \
+    calculate_cai_batch, influenza_relative_adaptiveness, relative_adaptiveness, synonymous_families
+from Genetic_Analysis.Fasta_stream import read_fasta_chunks
+
+"""
+File name: CAI_weights.py
+Author: Victoria, Debra Pacheco
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script builds CAI weight tables from reference sequences and scores sequences against several hosts at
+    once.
+
+    Weights are relative adaptiveness values (Sharp and Li, 1987, see relative_adaptiveness in Calculate_CAI.py):
+    each codon's count divided by the count of the most used codon for the same amino acid, so the preferred codon
+    of every family has w = 1. Codons never seen in the reference get a pseudocount of 0.5. Met, Trp and stop
+    codons have no synonymous choice and are left out of the table, so they are skipped when scoring.
+
+    Any reference FASTA (for example highly expressed chicken, duck, human or bovine genes) can be turned into a
+    table with weights_from_reference. Tables are cached on disk by the SHA-256 digest of the reference file.
+    calculate_cai_hosts encodes the codons of a batch once and scores them against every host table in the same
+    pass.
+
+License: MIT License
+"""
+
+# Default directory for cached weight tables
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cai_weights")
+
+def count_codons(fasta_file):
+    """
+    Counts the codons of every sequence in a FASTA file, reading each one in frame after removing gaps.
+
+    Args:
+    - fasta_file (str): Path to the reference FASTA file
+
+    Returns:
+    - Dictionary of codon to count
+    """
+    totals = np.zeros(INVALID_CODON + 1, dtype=np.int64)
+    for chunk in read_fasta_chunks(fasta_file):
+        codons, _ = encode_codons([sequence.replace(b"-", b"") for _, sequence in chunk])
+        totals += np.bincount(codons, minlength=INVALID_CODON + 1)
+    return {codon: int(count) for codon, count in zip(CODONS, totals)}
+
+
+def weights_from_reference(fasta_file, cache_dir=CACHE_DIR):
+    """
+    Returns the relative adaptiveness table of a reference FASTA file, cached on disk by the file's digest.
+
+    Args:
+    - fasta_file (str): Path to the reference FASTA file
+    - cache_dir (str): Directory holding cached tables
+
+    Returns:
+    - Dictionary of codon to w
+    """
+    cache_file = os.path.join(cache_dir, f"{file_digest(fasta_file)}.json")
+    try:
+        with open(cache_file) as handle:
+            return json.load(handle)["weights"]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    counts = count_codons(fasta_file)
+    weights = relative_adaptiveness(counts)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file + ".tmp", "w") as handle:
+            json.dump({"reference": os.path.abspath(fasta_file), "counts": counts, "weights": weights}, handle)
+        os.replace(cache_file + ".tmp", cache_file)
+    except OSError:
+        pass  # The table is still returned, it just has to be rebuilt next time
+
+    return weights
+
+
+def load_host_tables(references, cache_dir=CACHE_DIR):
+    """ Given a dictionary of host name to reference FASTA path returns a dictionary of host name to weights. """
+    return {host: weights_from_reference(path, cache_dir) for host, path in references.items()}
+
+
+def calculate_cai_hosts(sequences, host_weights, ids=None):
+    """
+    Scores a batch of sequences against several host weight tables, encoding the codons only once.
+
+    Args:
+    - sequences (iterable of str or bytes): Nucleotide sequences
+    - host_weights (dict): Host name mapped to a dictionary of codon weights
+    - ids (list of str): Accession of each sequence, optional
+
+    Returns:
+    - DataFrame with one CAI column per host, plus an Accession column if ids are given
+    """
+    hosts = list(host_weights)
+    tables = np.array([log_weight_table(host_weights[host]) for host in hosts]).reshape(len(hosts), -1)
+    scores = pd.DataFrame(calculate_cai_batch(sequences, log_weights=tables), columns=hosts)
+
+    if ids is not None:
+        scores.insert(0, "Accession", list(ids))
+    return scores
@@ -4,17 +4,35 @@
 File name: Calc_SynSub_NonSynSub_1.py
 Author: Sarah Schoem
 Created: 09Mar2025
-Version: 2.0
-Edit: 18Apr2025
+Version: 2.1
+Edit: 17Oct2026
 Description:
     This code calculates the dN/dS ratio using aligned codon sequences
     either manually or via PAML's codeml.
+
+    The manual method encodes the alignment once as a matrix of codon indices
+    (0-63 for TCAG codons, plus gap and ambiguous codes) and counts synonymous
+    and non-synonymous differences with 66 x 66 lookup tables. Differences
+    between codons that differ at more than one position are averaged over the
+    mutational pathways that avoid stop codons (Nei and Gojobori, 1986), and
+    identical codons count as no substitution at all.
 """
 
-from Bio import SeqIO
+import os
+import sys
 from collections import defaultdict
+from itertools import islice, permutations
+
+import numpy as np
 from Bio.Phylo.PAML import codeml
 
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Genetic_Analysis.Fasta_stream import read_fasta
+from Genetic_Analysis.Calculate_CAI import CODONS
+
 # Codon to amino acid mapping (standard genetic code)
 codon_to_aa = {
     "ATA": "I", "ATC": "I", "ATT": "I", "ATG": "M",
@@ -39,32 +57,158 @@ def codon_to_aa_func(codon):
     """Converts a codon into its corresponding amino acid."""
     return codon_to_aa.get(codon.upper(), "X")
 
-def calculate_substitutions(alignments):
-    """Calculate synonymous and non-synonymous substitutions."""
-    syn = 0
-    nonsyn = 0
-
-    for i in range(0, len(alignments[0][1]), 3):
-        codons = [seq[1][i:i+3] for seq in alignments]
-        ref_codon = codons[0]
-        ref_aa = codon_to_aa_func(ref_codon)
-
-        for codon in codons[1:]:
-            aa = codon_to_aa_func(codon)
-            if aa == ref_aa:
+# Codon codes after the 64 codons in Calculate_CAI.CODONS order
+GAP_CODON = 64        # "---"
+AMBIGUOUS_CODON = 65  # anything else that is not a T, C, A, G or U triplet
+N_CODON_CODES = 66
+
+# Sequences encoded per block by calculate_substitutions
+BLOCK_SEQUENCES = 4096
+
+# Byte to base number: T/U, C, A, G are 0-3 in either case, gaps are 4, anything else 5
+_BASE_CODES = np.full(256, 5, dtype=np.uint8)
+for _number, _bases in enumerate(("TtUu", "Cc", "Aa", "Gg")):
+    for _base in _bases:
+        _BASE_CODES[ord(_base)] = _number
+_BASE_CODES[ord("-")] = _BASE_CODES[ord(".")] = 4
+
+
+def _pathway_differences(codon1, codon2):
+    """Returns the (synonymous, non-synonymous) differences between two sense codons,
+    averaged over the pathways that do not pass through a stop codon."""
+    diff_pos = [i for i in range(3) if codon1[i] != codon2[i]]
+    pathways = []
+
+    for order in permutations(diff_pos):
+        current = codon1
+        syn = nonsyn = 0
+        through_stop = False
+        for i in order:
+            step = current[:i] + codon2[i] + current[i + 1:]
+            if codon_to_aa[step] == "*":
+                through_stop = True
+            if codon_to_aa[step] == codon_to_aa[current]:
                 syn += 1
             else:
                 nonsyn += 1
+            current = step
+        pathways.append((through_stop, syn, nonsyn))
+
+    # Every pathway is used only if all of them pass through a stop codon
+    usable = [p for p in pathways if not p[0]] or pathways
+    return (sum(p[1] for p in usable) / len(usable),
+            sum(p[2] for p in usable) / len(usable))
+
+
+def _build_codon_tables():
+    """Builds the synonymous/non-synonymous difference tables, the table of
+    comparable codon pairs and the synonymous site count of every codon."""
+    syn_diff = np.zeros((N_CODON_CODES, N_CODON_CODES))
+    nonsyn_diff = np.zeros((N_CODON_CODES, N_CODON_CODES))
+    comparable = np.zeros((N_CODON_CODES, N_CODON_CODES), dtype=bool)
+    syn_sites = np.zeros(N_CODON_CODES)
+
+    sense = [i for i, codon in enumerate(CODONS) if codon_to_aa[codon] != "*"]
+    for i in sense:
+        codon = CODONS[i]
+        # Changes to a stop codon count as non-synonymous sites
+        neighbours = [codon[:p] + base + codon[p + 1:] for p in range(3) for base in "TCAG" if base != codon[p]]
+        syn_sites[i] = sum(codon_to_aa[n] == codon_to_aa[codon] for n in neighbours) / 3
+
+        for j in sense:
+            comparable[i, j] = True
+            syn_diff[i, j], nonsyn_diff[i, j] = _pathway_differences(codon, CODONS[j])
+
+    return syn_diff, nonsyn_diff, comparable, syn_sites
+
 
+SYN_DIFFERENCES, NONSYN_DIFFERENCES, COMPARABLE, SYN_SITES = _build_codon_tables()
+
+
+def encode_codon_matrix(sequences, length=None):
+    """Encodes aligned nucleotide sequences as a matrix of codon codes.
+
+    sequences is a list of str or bytes, or a uint8 matrix of residue bytes.
+    Sequences shorter than length (default: the longest) are padded with gaps
+    and longer ones are cut. Returns a uint8 array of shape
+    (sequences, length // 3) holding 0-63, GAP_CODON or AMBIGUOUS_CODON.
+    """
+    if isinstance(sequences, np.ndarray):
+        matrix = sequences
+        if length is not None:
+            matrix = matrix[:, :length]
+    else:
+        rows = [s.encode("ascii") if isinstance(s, str) else bytes(s) for s in sequences]
+        if length is None:
+            length = max((len(row) for row in rows), default=0)
+        rows = [row[:length].ljust(length, b"-") for row in rows]
+        matrix = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), length)
+
+    n_codons = matrix.shape[1] // 3
+    bases = _BASE_CODES[matrix[:, :n_codons * 3]].reshape(len(matrix), n_codons, 3)
+
+    codes = (16 * bases[..., 0].astype(np.uint16) + 4 * bases[..., 1] + bases[..., 2]).astype(np.uint8)
+    codes[(bases > 3).any(axis=2)] = AMBIGUOUS_CODON
+    codes[(bases == 4).all(axis=2)] = GAP_CODON
+    return codes
+
+
+def reference_substitutions(codes, reference):
+    """Counts synonymous and non-synonymous differences of every row of a codon
+    matrix against one reference row of codon codes.
+
+    Returns (syn, nonsyn) arrays with one value per row. Codon positions with a
+    gap, an ambiguous base or a stop codon on either side are skipped.
+    """
+    return SYN_DIFFERENCES[reference, codes].sum(axis=1), NONSYN_DIFFERENCES[reference, codes].sum(axis=1)
+
+
+def pairwise_substitutions(codes):
+    """Counts synonymous and non-synonymous differences between every pair of
+    rows of a codon matrix. Returns two symmetric (rows x rows) arrays."""
+    n = len(codes)
+    syn = np.zeros((n, n))
+    nonsyn = np.zeros((n, n))
+    for i in range(n - 1):
+        row_syn, row_nonsyn = reference_substitutions(codes[i + 1:], codes[i])
+        syn[i, i + 1:] = syn[i + 1:, i] = row_syn
+        nonsyn[i, i + 1:] = nonsyn[i + 1:, i] = row_nonsyn
     return syn, nonsyn
 
+def calculate_substitutions(alignments):
+    """Calculate synonymous and non-synonymous substitutions.
+
+    alignments can be any iterable of (id, sequence) pairs, such as a read_fasta stream;
+    each sequence is compared to the first one and sequences are encoded in blocks,
+    so only the reference and one block are kept in memory.
+    """
+    syn = 0.0
+    nonsyn = 0.0
+
+    records = iter(alignments)
+    reference = next(records, None)
+    if reference is None:
+        return syn, nonsyn
+    ref_length = len(reference[1])
+    ref_codes = encode_codon_matrix([reference[1]])[0]
+
+    while True:
+        block = [seq for _, seq in islice(records, BLOCK_SEQUENCES)]
+        if not block:
+            break
+        block_syn, block_nonsyn = reference_substitutions(encode_codon_matrix(block, ref_length), ref_codes)
+        syn += block_syn.sum()
+        nonsyn += block_nonsyn.sum()
+
+    return float(syn), float(nonsyn)
+
 def process_fasta(input_fasta):
     """Processes a FASTA file and prints manual dN/dS analysis."""
-    alignments = [(record.id, str(record.seq)) for record in SeqIO.parse(input_fasta, "fasta")]
+    alignments = ((record_id, sequence.decode()) for record_id, sequence in read_fasta(input_fasta))
     syn, nonsyn = calculate_substitutions(alignments)
 
-    print(f"Synonymous substitutions: {syn}")
-    print(f"Non-synonymous substitutions: {nonsyn}")
+    print(f"Synonymous substitutions: {syn:.2f}")
+    print(f"Non-synonymous substitutions: {nonsyn:.2f}")
     
     if syn == 0:
         print("Warning: Synonymous substitutions = 0. Cannot compute dN/dS.")
@@ -108,7 +252,7 @@ def run_paml():
 
 #Choose method to run
 if __name__ == "__main__":
-    input_fasta = "Extracted_Codons.fasta"
+    input_fasta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Extracted_Codons.fasta")
     print("Calculating dN/dS manually using FASTA file...\n")
     process_fasta(input_fasta)
 
@@ -2,14 +2,27 @@
 
 import math
 
+import numpy as np
+import pandas as pd
+from Bio.Data.CodonTable import standard_dna_table
+
 """
 File name: Calculate_CAI.py
 Author: Victoria, Debra Pacheco
 Created: 1/30/25
-Version: 1.0
+Version: 1.2
 Description:
     This script calculates the CAI value for influenza A viruses.
 
+    Sequences are scored against relative adaptiveness weights (Sharp and Li, 1987) derived from the Kazusa
+    influenza codon usage table: each codon's usage divided by that of the most used codon for the same amino
+    acid, so every CAI is between 0 and 1. Met, Trp and stop codons have no synonymous choice and are skipped.
+
+    calculate_cai_batch scores many sequences at once: every codon is encoded as an integer index with NumPy and
+    looked up in a precomputed 64-entry table of log weights, and the per-sequence means are taken with bincount.
+    Several weight tables (for example one per host, see CAI_weights.py) can be stacked and applied to the same
+    encoded codons in one pass.
+
 License: MIT License
 """
 
@@ -33,12 +46,159 @@ influenza_codon_usage = {
     "GGT": 11.8, "GGC": 14.3, "GGA": 10.4, "GGG": 9.1}
 
 
-def calculate_cai(sequence):
+# Count given to codons missing from a usage table
+PSEUDOCOUNT = 0.5
+
+
+def synonymous_families():
+    """ Returns a dictionary of amino acid to its codons, leaving out stops and single-codon amino acids. """
+    families = {}
+    for codon, amino_acid in standard_dna_table.forward_table.items():
+        families.setdefault(amino_acid, []).append(codon)
+    return {aa: sorted(codons) for aa, codons in families.items() if len(codons) > 1}
+
+
+def relative_adaptiveness(codon_counts, pseudocount=PSEUDOCOUNT):
+    """
+    Converts codon counts or frequencies into relative adaptiveness weights.
+
+    Args:
+    - codon_counts (dict): Codon mapped to its count or frequency in the reference set
+    - pseudocount (float): Value used for codons with no count
+
+    Returns:
+    - Dictionary of codon to w, between 0 and 1
+    """
+    weights = {}
+    for codons in synonymous_families().values():
+        family = {codon: codon_counts.get(codon, 0) or pseudocount for codon in codons}
+        most_used = max(family.values())
+        for codon, count in family.items():
+            weights[codon] = count / most_used
+    return weights
+
+
+# Relative adaptiveness of the Kazusa influenza codon usage table, the default weights
+influenza_relative_adaptiveness = relative_adaptiveness(influenza_codon_usage)
+
+
+def calculate_cai(sequence, codon_weights=influenza_relative_adaptiveness):
     codons = [sequence[i:i + 3] for i in range(0, len(sequence), 3) if len(sequence[i:i + 3]) == 3]
-    valid_codons = [influenza_codon_usage[c] for c in codons if c in influenza_codon_usage]
+    valid_codons = [codon_weights[c] for c in codons if c in codon_weights]
 
     if not valid_codons:
         return 0  # Avoid division by zero
 
     cai_value = math.exp(sum(math.log(w) for w in valid_codons) / len(valid_codons))
     return round(cai_value, 4)
+
+
+# Codon index = 16 * first + 4 * second + third, with T, C, A, G numbered 0 to 3
+NUCLEOTIDES = "TCAG"
+CODONS = [a + b + c for a in NUCLEOTIDES for b in NUCLEOTIDES for c in NUCLEOTIDES]
+
+# Index given to codons containing anything other than an upper case T, C, A or G
+INVALID_CODON = 64
+
+# Byte to nucleotide number, 4 for anything else
+NUCLEOTIDE_CODES = np.full(256, 4, dtype=np.uint8)
+for number, base in enumerate(NUCLEOTIDES):
+    NUCLEOTIDE_CODES[ord(base)] = number
+
+# Sequence bytes scored per batch, which bounds the size of the codon index arrays
+BATCH_BYTES = 16 << 20
+
+
+def log_weight_table(codon_weights):
+    """ Given a dictionary of codon weights returns a 65-entry array of their logs, NaN for unknown codons. """
+    table = np.full(INVALID_CODON + 1, np.nan)
+    for index, codon in enumerate(CODONS):
+        if codon in codon_weights:
+            table[index] = math.log(codon_weights[codon])
+    return table
+
+
+influenza_log_weights = log_weight_table(influenza_relative_adaptiveness)
+
+
+def encode_codons(sequences):
+    """
+    Encodes the complete codons of each sequence as integer indices.
+
+    Args:
+    - sequences (list of str or bytes): Nucleotide sequences, read in frame from the first base
+
+    Returns:
+    - (codons, owners) where codons holds the index of every codon (INVALID_CODON if it has another character)
+      and owners holds the position in sequences that each codon came from
+    """
+    buffers = [sequence.encode("ascii") if isinstance(sequence, str) else bytes(sequence) for sequence in sequences]
+    lengths = np.array([len(buffer) for buffer in buffers], dtype=np.intp)
+    n_codons = lengths // 3
+
+    owners = np.repeat(np.arange(len(buffers)), n_codons)
+    sequence_starts = np.cumsum(lengths) - lengths
+    codon_numbers = np.arange(owners.size) - np.repeat(np.cumsum(n_codons) - n_codons, n_codons)
+    codon_starts = sequence_starts[owners] + 3 * codon_numbers
+
+    bases = NUCLEOTIDE_CODES[np.frombuffer(b"".join(buffers), dtype=np.uint8)]
+    first, second, third = bases[codon_starts], bases[codon_starts + 1], bases[codon_starts + 2]
+
+    codons = 16 * first.astype(np.intp) + 4 * second + third
+    codons[(first == 4) | (second == 4) | (third == 4)] = INVALID_CODON
+    return codons, owners
+
+
+def _batches(sequences, batch_bytes):
+    batch = []
+    size = 0
+    for sequence in sequences:
+        if batch and size + len(sequence) > batch_bytes:
+            yield batch
+            batch = []
+            size = 0
+        batch.append(sequence)
+        size += len(sequence)
+    if batch:
+        yield batch
+
+
+def calculate_cai_batch(sequences, ids=None, log_weights=influenza_log_weights, batch_bytes=BATCH_BYTES):
+    """
+    Calculates the CAI of many sequences at once, matching calculate_cai for each one.
+
+    Args:
+    - sequences (iterable of str or bytes): Nucleotide sequences
+    - ids (list of str): Accession of each sequence, optional
+    - log_weights (ndarray): 65-entry table from log_weight_table, or a (tables, 65) stack of them
+    - batch_bytes (int): Sequence bytes encoded at one time
+
+    Returns:
+    - numpy array of CAI values rounded to 4 places, 0 where a sequence has no scorable codons, or a DataFrame
+      with Accession and CAI columns if ids are given. A stack of tables gives a (sequences, tables) array and
+      ignores ids.
+    """
+    tables = np.atleast_2d(log_weights)
+    n_tables = tables.shape[0]
+
+    results = []
+    for batch in _batches(sequences, batch_bytes):
+        codons, owners = encode_codons(batch)
+        codon_logs = tables[:, codons]
+        valid = ~np.isnan(codon_logs)
+
+        # One bincount over (table, sequence) keys averages every table at once
+        keys = (np.arange(n_tables)[:, None] * len(batch) + owners)[valid]
+        totals = np.bincount(keys, weights=codon_logs[valid], minlength=n_tables * len(batch))
+        counts = np.bincount(keys, minlength=n_tables * len(batch))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cai = np.where(counts > 0, np.exp(totals / counts), 0.0)
+        results.append(np.round(cai, 4).reshape(n_tables, len(batch)).T)
+
+    cai_values = np.concatenate(results) if results else np.zeros((0, n_tables))
+    if np.ndim(log_weights) == 1:
+        cai_values = cai_values[:, 0]
+
+    if ids is None or cai_values.ndim == 2:
+        return cai_values
+    return pd.DataFrame({"Accession": list(ids), "CAI": cai_values})
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product
+
+import pandas as pd
+
+from Genetic_Analysis import Codeml_cache
+from Genetic_Analysis.Make_PAML_control_file import write_control_file
+
+"""
+File name: Codeml_batch.py
+Author: Sarah Schoem
+Created: 17Oct2026
+Version: 1.0
+Description:
+    This code runs codeml for every combination of alignment, tree and site model without any prompts, for
+    example an M0/M1a/M2a/M7/M8 sweep over all eight influenza segments.
+
+    Each job gets its own working directory holding a copy of the PHYLIP alignment and the tree, a codeml.ctl
+    written with Make_PAML_control_file, the codeml output (mlc) and a log of everything codeml printed.
+    At most --jobs codeml processes run at once, each one is stopped after --timeout seconds, and a job that
+    fails does not stop the others. The lnL, number of parameters, kappa and omega of every job are parsed with
+    Bio.Phylo.PAML.codeml and collected into one table.
+
+    For site models other than M0 the omega column holds the largest omega of the site classes, which is the
+    positive selection class of M2a and M8.
+
+    Finished jobs are stored in the Codeml_cache result cache. A job whose alignment, tree and control options
+    are already cached is not run again: its outputs are copied into the job directory and it is reported with
+    the status "cached".
+
+    Usage:
+        python -m Genetic_Analysis.Codeml_batch -a HA.phy NA.phy -t HA.treefile NA.treefile --paired \
+            -m M0 M1a M2a M7 M8 -o codeml_results.csv --jobs 8
+"""
+
+# Site models by name and the control file settings that select them
+MODELS = {
+    "M0": {"model": 0, "NSsites": 0},
+    "M1a": {"model": 0, "NSsites": 1},
+    "M2a": {"model": 0, "NSsites": 2},
+    "M3": {"model": 0, "NSsites": 3},
+    "M7": {"model": 0, "NSsites": 7},
+    "M8": {"model": 0, "NSsites": 8},
+}
+DEFAULT_MODELS = ("M0", "M1a", "M2a", "M7", "M8")
+
+# File names used inside every job directory
+SEQFILE = "seqfile.phy"
+TREEFILE = "tree.nwk"
+OUTFILE = "mlc"
+LOGFILE = "codeml.log"
+
+COLUMNS = ["job", "alignment", "tree", "model", "status", "returncode", "seconds", "lnL", "np", "kappa",
+           "omega", "directory"]
+
+CodemlJob = namedtuple("CodemlJob", ["name", "alignment", "tree", "model", "options"])
+CodemlJob.__doc__ = """ One codeml run.
+
+name (str): unique job name, also the name of its working directory
+alignment (str): path to the PHYLIP codon alignment
+tree (str): path to the Newick tree
+model (str): key of MODELS
+options (dict): extra codeml.ctl options, such as {"CodonFreq": 3}
+"""
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def build_jobs(alignments, trees, models=DEFAULT_MODELS, paired=False, options=None):
+    """
+    Builds the job matrix of alignments, trees and models.
+
+    Args:
+    - alignments (list of str): PHYLIP alignment paths
+    - trees (list of str): Newick tree paths
+    - models (list of str): Model names from MODELS
+    - paired (bool): Pair the i-th alignment with the i-th tree instead of using every combination
+    - options (dict): Extra codeml.ctl options used by every job
+
+    Returns:
+    - List of CodemlJob
+    """
+    unknown = [model for model in models if model not in MODELS]
+    if unknown:
+        raise ValueError(f"Unknown model(s) {', '.join(unknown)}; choose from {', '.join(MODELS)}")
+
+    if paired:
+        if len(alignments) != len(trees):
+            raise ValueError(f"{len(alignments)} alignment(s) cannot be paired with {len(trees)} tree(s)")
+        pairs = list(zip(alignments, trees))
+    else:
+        pairs = list(product(alignments, trees))
+
+    jobs = []
+    names = set()
+    for (alignment, tree), model in product(pairs, models):
+        name = f"{_stem(alignment)}__{_stem(tree)}__{model}"
+        base, copy = name, 1
+        while name in names:
+            copy += 1
+            name = f"{base}_{copy}"
+        names.add(name)
+        jobs.append(CodemlJob(name, alignment, tree, model, dict(options or {})))
+    return jobs
+
+
+def job_options(job):
+    """ Returns the codeml.ctl options of a job, with file names relative to its working directory. """
+    return {**job.options, **MODELS[job.model], "seqfile": SEQFILE, "treefile": TREEFILE, "outfile": OUTFILE}
+
+
+def prepare_job(job, work_dir):
+    """
+    Creates the working directory of a job with its alignment, tree and control file.
+
+    codeml cannot read paths with spaces, so the inputs are copied in under fixed short names.
+
+    Returns:
+    - Path of the job directory
+    """
+    job_dir = os.path.join(work_dir, job.name)
+    os.makedirs(job_dir, exist_ok=True)
+    shutil.copyfile(job.alignment, os.path.join(job_dir, SEQFILE))
+    shutil.copyfile(job.tree, os.path.join(job_dir, TREEFILE))
+    for stale in (OUTFILE, LOGFILE):
+        if os.path.exists(os.path.join(job_dir, stale)):
+            os.remove(os.path.join(job_dir, stale))
+    write_control_file(job_dir, **job_options(job))
+    return job_dir
+
+
+def parse_results(mlc_file):
+    """
+    Reads the lnL, number of parameters, kappa and omega from a codeml output file.
+
+    Returns:
+    - Dictionary with keys lnL, np, kappa and omega, NaN where codeml did not report a value
+    """
+    from Bio.Phylo.PAML import codeml
+
+    results = codeml.read(mlc_file)
+    model = next(iter(results.get("NSsites", {}).values()), {})
+    parameters = model.get("parameters", {})
+
+    omega = parameters.get("omega")
+    site_classes = parameters.get("site classes")
+    if not isinstance(omega, float) and site_classes:
+        # Bio keeps site class omegas as the strings printed by codeml
+        omega = max(float(site["omega"]) for site in site_classes.values() if "omega" in site)
+
+    parameter_list = parameters.get("parameter list")
+    return {
+        "lnL": model.get("lnL", float("nan")),
+        "np": len(parameter_list.split()) if parameter_list else float("nan"),
+        "kappa": parameters.get("kappa", float("nan")),
+        "omega": omega if isinstance(omega, float) else float("nan"),
+    }
+
+
+def run_job(job_dir, codeml_path="codeml", timeout=None):
+    """
+    Runs codeml in a prepared job directory, writing everything it prints to codeml.log.
+
+    Returns:
+    - Dictionary with the job's status (ok, failed, timeout, parse_error or not_found; cached jobs are not
+      run), return code, run time in seconds and parsed results
+    """
+    row = {"status": "ok", "returncode": None, "seconds": 0.0, "lnL": float("nan"), "np": float("nan"),
+           "kappa": float("nan"), "omega": float("nan"), "directory": job_dir}
+
+    start = time.perf_counter()
+    try:
+        with open(os.path.join(job_dir, LOGFILE), "w") as log:
+            try:
+                # codeml may wait for Enter when it finishes, so stdin is a newline
+                process = subprocess.run([codeml_path, "codeml.ctl"], cwd=job_dir, input="\n", stdout=log,
+                                         stderr=subprocess.STDOUT, text=True, timeout=timeout)
+                row["returncode"] = process.returncode
+            except FileNotFoundError:
+                row["status"] = "not_found"
+            except subprocess.TimeoutExpired:
+                row["status"] = "timeout"
+                log.write(f"\nStopped after {timeout} seconds\n")
+            except OSError as error:  # e.g. codeml is not executable
+                row["status"] = "failed"
+                log.write(f"\nCould not start {codeml_path}: {error}\n")
+    except OSError as error:  # The job directory cannot be written
+        row["status"] = "failed"
+        print(f"{job_dir}: {error}", file=sys.stderr)
+    row["seconds"] = time.perf_counter() - start
+
+    if row["status"] != "ok":
+        return row
+    if row["returncode"] != 0:
+        row["status"] = "failed"
+        return row
+
+    try:
+        row.update(parse_results(os.path.join(job_dir, OUTFILE)))
+    except (OSError, ValueError, KeyError) as error:
+        row["status"] = "parse_error"
+        with open(os.path.join(job_dir, LOGFILE), "a") as log:
+            log.write(f"\nCould not parse {OUTFILE}: {error}\n")
+    return row
+
+
+# Parsed values kept in the result cache
+CACHED_FIELDS = ["returncode", "seconds", "lnL", "np", "kappa", "omega"]
+
+
+def _restore_cached(job_dir, cached):
+    """ Copies a cache entry's outputs into a job directory and returns the job's result row. """
+    for name in (OUTFILE, LOGFILE):
+        path = os.path.join(cached["entry"], name)
+        if os.path.exists(path):
+            shutil.copyfile(path, os.path.join(job_dir, name))
+    return {"status": "cached", **{field: cached.get(field, float("nan")) for field in CACHED_FIELDS},
+            "directory": job_dir}
+
+
+def run_batch(jobs, work_dir="codeml_runs", codeml_path="codeml", processes=None, timeout=None, quiet=False,
+              cache_dir=Codeml_cache.CACHE_DIR, cache_max_bytes=Codeml_cache.DEFAULT_MAX_BYTES):
+    """
+    Runs a list of codeml jobs with at most `processes` codeml processes at a time.
+
+    Args:
+    - jobs (list of CodemlJob): Jobs from build_jobs
+    - work_dir (str): Directory the job directories are created in
+    - codeml_path (str): Path to the codeml executable
+    - processes (int): Number of codeml processes run at once, all cores if None
+    - timeout (float): Seconds each job may run, no limit if None
+    - quiet (bool): Do not print per-job progress
+    - cache_dir (str): Result cache directory, None to always run codeml
+    - cache_max_bytes (int): Size limit of the result cache
+
+    Returns:
+    - DataFrame with one row per job and the columns in COLUMNS, in job order
+    """
+    processes = processes or os.cpu_count() or 1
+    if os.path.dirname(codeml_path):
+        # Jobs run inside their own directories, so a relative path to codeml has to be made absolute
+        codeml_path = os.path.abspath(codeml_path)
+    rows = {}
+    keys = {}
+
+    def record(job, row):
+        rows[job.name] = {"job": job.name, "alignment": job.alignment, "tree": job.tree, "model": job.model, **row}
+        if not quiet:
+            print(f"{job.name}: {row['status']} in {row['seconds']:.1f} s, lnL = {row['lnL']}")
+
+    # codeml does the work in its own process, so threads are enough to keep the pool full
+    with ThreadPoolExecutor(max_workers=processes) as pool:
+        futures = {}
+        for job in jobs:
+            job_dir = prepare_job(job, work_dir)
+            if cache_dir is not None:
+                keys[job.name] = Codeml_cache.cache_key(job.alignment, job.tree, job_options(job))
+                cached = Codeml_cache.lookup(keys[job.name], cache_dir)
+                if cached is not None:
+                    record(job, _restore_cached(job_dir, cached))
+                    continue
+            futures[pool.submit(run_job, job_dir, codeml_path, timeout)] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            row = future.result()
+            if cache_dir is not None and row["status"] == "ok":
+                Codeml_cache.store(keys[job.name], {field: row[field] for field in CACHED_FIELDS},
+                                   [os.path.join(row["directory"], name) for name in (OUTFILE, LOGFILE)],
+                                   cache_dir, cache_max_bytes)
+            record(job, row)
+
+    return pd.DataFrame([rows[job.name] for job in jobs], columns=COLUMNS)
+
+
+def _parse_option(text):
+    name, sep, value = text.partition("=")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected name=value, got {text!r}")
+    return name.strip(), value.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run codeml over a matrix of alignments, trees and site models.")
+    parser.add_argument("-a", "--alignment", nargs="+", required=True, help="PHYLIP codon alignment(s)")
+    parser.add_argument("-t", "--tree", nargs="+", required=True, help="Newick tree file(s)")
+    parser.add_argument("-m", "--models", nargs="+", default=list(DEFAULT_MODELS), choices=list(MODELS),
+                        help="site models to fit (default: %(default)s)")
+    parser.add_argument("--paired", action="store_true",
+                        help="pair the i-th alignment with the i-th tree instead of using every combination")
+    parser.add_argument("--set", dest="options", action="append", type=_parse_option, default=[],
+                        metavar="NAME=VALUE", help="extra codeml.ctl option, may be repeated")
+    parser.add_argument("-w", "--workdir", default="codeml_runs", help="job directory root (default: %(default)s)")
+    parser.add_argument("-o", "--output", default="codeml_results.csv", help="output CSV (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="codeml processes at once (default: all cores)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per job (default: no limit)")
+    parser.add_argument("--codeml", default="codeml", help="codeml executable (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="always run codeml, ignoring cached results")
+    parser.add_argument("--cache-dir", default=Codeml_cache.CACHE_DIR, help="result cache directory")
+    parser.add_argument("--cache-size", type=float, default=Codeml_cache.DEFAULT_MAX_BYTES / (1 << 20),
+                        help="result cache size limit in MiB (default: %(default)s)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = build_jobs(args.alignment, args.tree, args.models, args.paired, dict(args.options))
+    except ValueError as error:
+        parser.error(str(error))
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    table = run_batch(jobs, args.workdir, args.codeml, args.jobs, args.timeout, args.quiet, cache_dir,
+                      int(args.cache_size * (1 << 20)))
+    table.to_csv(args.output, index=False)
+
+    finished = table["status"].isin(["ok", "cached"]).sum()
+    cached = (table["status"] == "cached").sum()
+    print(f"{finished} of {len(table)} codeml job(s) finished ({cached} from cache); results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
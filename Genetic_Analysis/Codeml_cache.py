@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import shutil
+
+from Genetic_Analysis.Alignment_store import file_digest
+from Genetic_Analysis.Make_PAML_control_file import DEFAULT_OPTIONS, format_option
+
+"""
+File name: Codeml_cache.py
+Author: Sarah Schoem
+Created: 17Oct2026
+Version: 1.0
+Description:
+    This code caches codeml results by content, so re-running an unchanged alignment, tree and model returns
+    the parsed lnL, np, kappa and omega straight away instead of running codeml again.
+
+    The cache key is the SHA-256 of the PHYLIP alignment's digest, the Newick tree's digest and the
+    normalized control options: the Make_PAML_control_file defaults overlaid with the job's options, formatted
+    the way they are written to codeml.ctl, without the seqfile, treefile and outfile names. Renaming or moving
+    the input files therefore still hits the cache, while any change to their contents or the settings misses.
+
+    Every entry is a directory holding result.json and the stored codeml outputs (mlc and codeml.log). An
+    entry's last use is the modification time of its result.json, and once the cache grows past max_bytes the
+    least recently used entries are removed.
+"""
+
+# Default directory for cached codeml results
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "codeml_cache")
+
+# Default size limit of the cache
+DEFAULT_MAX_BYTES = 1 << 30
+
+RESULT_FILE = "result.json"
+
+# Control file options that name files rather than change the analysis
+_FILE_OPTIONS = ("seqfile", "treefile", "outfile")
+
+
+def normalize_options(options):
+    """ Returns the full set of control options as sorted (name, value string) pairs, leaving out file names. """
+    settings = {**DEFAULT_OPTIONS, **options}
+    return sorted((name, format_option(value)) for name, value in settings.items() if name not in _FILE_OPTIONS)
+
+
+def cache_key(alignment, tree, options):
+    """
+    Returns the cache key of a codeml run.
+
+    Args:
+    - alignment (str): Path to the PHYLIP alignment
+    - tree (str): Path to the Newick tree
+    - options (dict): codeml.ctl options of the run
+
+    Returns:
+    - Hex digest string
+    """
+    payload = json.dumps({"alignment": file_digest(alignment), "tree": file_digest(tree),
+                          "options": normalize_options(options)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def lookup(key, cache_dir=CACHE_DIR):
+    """
+    Returns the cached result of a key and marks it as recently used, or None on a miss.
+
+    Returns:
+    - Dictionary with the parsed results plus "entry", the directory holding the stored outputs
+    """
+    entry = os.path.join(cache_dir, key)
+    result_file = os.path.join(entry, RESULT_FILE)
+    try:
+        with open(result_file) as handle:
+            result = json.load(handle)
+        os.utime(result_file)
+    except (OSError, ValueError):
+        return None
+
+    result["entry"] = entry
+    return result
+
+
+def store(key, result, outputs, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Adds a result and its output files to the cache, then evicts old entries if the cache is too large.
+
+    Args:
+    - key (str): Key from cache_key
+    - result (dict): JSON serializable parsed results
+    - outputs (list of str): Paths of output files to keep with the result; missing files are skipped
+    - cache_dir (str): Cache directory
+    - max_bytes (int): Size limit of the cache
+
+    Returns:
+    - Path of the new entry, or None if it could not be written
+    """
+    entry = os.path.join(cache_dir, key)
+    staging = entry + ".tmp"
+    try:
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for path in outputs:
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(staging, os.path.basename(path)))
+        with open(os.path.join(staging, RESULT_FILE), "w") as handle:
+            json.dump(result, handle)
+
+        # Write the entry under a temporary name first so a lookup never sees a half-written one
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        return None  # The result is still returned by the caller, it just has to be recomputed next time
+
+    evict(cache_dir, max_bytes)
+    return entry
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+
+def cache_entries(cache_dir=CACHE_DIR):
+    """ Returns (last used, size, path) of every complete cache entry, least recently used first. """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        try:
+            last_used = os.path.getmtime(os.path.join(entry, RESULT_FILE))
+            entries.append((last_used, _entry_size(entry), entry))
+        except OSError:
+            continue  # Not an entry, or one being written right now
+    return sorted(entries)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Removes the least recently used entries until the cache is at most max_bytes.
+
+    Returns:
+    - Number of entries removed
+    """
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
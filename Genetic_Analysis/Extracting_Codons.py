@@ -4,12 +4,43 @@
 File name: Extracted_codons.py
 Author: Sarah Schoem
 Created: 3/9/2025
-Version: 1.0
+Version: 2.0
+Edit: 17Oct2026
 Description:
     This code extracts codons from a previously aligned fasta file, trims the sequences to the same length, and writes the results to a new file.
+
+    trim_codon_alignment keeps the alignment instead of removing gaps: it works on whole codon columns, dropping
+    those where too many sequences have a gap (or, optionally, an ambiguous base), so every sequence stays in
+    frame and each column still holds homologous codons. The column statistics are collected in one vectorized
+    pass over blocks of the alignment, and the kept columns are written in a second pass. The output can go
+    straight to Calc_SynSub_NonSynSub_1.calculate_substitutions and be exported to PHYLIP.
+
+    The old behaviour, removing every gap and cutting all sequences to the shortest length, is still available
+    as process_fasta (--ungapped on the command line).
+
+    Usage:
+        python -m Genetic_Analysis.Extracting_Codons H5_Aligned.fasta Extracted_Codons.fasta --max-gap 0.5 --phylip Extracted_Codons.phy
 """
 
-from Bio import SeqIO
+import argparse
+import os
+import sys
+
+import numpy as np
+
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Genetic_Analysis.Calc_SynSub_NonSynSub_1 import encode_codon_matrix, AMBIGUOUS_CODON
+from Genetic_Analysis.Fasta_convert_phylip import fasta_to_phylip
+from Genetic_Analysis.Fasta_stream import read_fasta, read_alignment_blocks, DEFAULT_MAX_BYTES
+
+# Folder of this script, where the default input and output files are
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Alignment characters counted as gaps
+GAP_CODES = np.frombuffer(b"-.", dtype=np.uint8)
 
 def extract_codons(sequence):
     """
@@ -58,44 +89,180 @@ def trim_sequences(sequences):
 
 
 
-def process_fasta(input_fasta, output_file):
+def codon_column_stats(input_fasta, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Counts, for every codon column of an alignment, the sequences with a gap and with an ambiguous base there.
+
+    A codon counts as gapped if any of its three positions is a gap, and as ambiguous if it has no gap but is
+    not a plain T, C, A, G or U triplet. Bases after the last complete codon are ignored.
+
+    Args:
+    - input_fasta (str): Path to the aligned FASTA file
+    - max_bytes (int): Memory ceiling for one block of sequences
+
+    Returns:
+    - Dictionary with the number of sequences, the alignment width and per codon column arrays "gapped" and
+      "ambiguous"
+    """
+    sequences = 0
+    gapped = ambiguous = None
+
+    for ids, block in read_alignment_blocks(input_fasta, max_bytes):
+        codes = encode_codon_matrix(block)
+        n_codons = codes.shape[1]
+        if gapped is None:
+            gapped = np.zeros(n_codons, dtype=np.int64)
+            ambiguous = np.zeros(n_codons, dtype=np.int64)
+
+        has_gap = np.isin(block[:, :n_codons * 3], GAP_CODES).reshape(len(block), n_codons, 3).any(axis=2)
+        gapped += has_gap.sum(axis=0)
+        ambiguous += ((codes == AMBIGUOUS_CODON) & ~has_gap).sum(axis=0)
+        sequences += len(block)
+        width = block.shape[1]
+
+    return {"sequences": sequences, "width": width, "gapped": gapped, "ambiguous": ambiguous}
+
+
+def codon_column_mask(stats, max_gap_fraction=0.5, max_ambiguous_fraction=1.0):
+    """
+    Returns a boolean array marking the codon columns to keep.
+
+    Args:
+    - stats (dict): Output of codon_column_stats
+    - max_gap_fraction (float): Highest fraction of gapped codons a kept column may have
+    - max_ambiguous_fraction (float): Highest fraction of ambiguous codons a kept column may have
+    """
+    sequences = stats["sequences"]
+    return (stats["gapped"] <= max_gap_fraction * sequences) & \
+        (stats["ambiguous"] <= max_ambiguous_fraction * sequences)
+
+
+def trimmed_records(input_fasta, keep, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Yields the records of an aligned FASTA file with only the kept codon columns.
+
+    The records are aligned and in frame, so they can be passed straight to calculate_substitutions.
+
+    Args:
+    - input_fasta (str): Path to the aligned FASTA file
+    - keep (array of bool): Codon columns to keep, from codon_column_mask
+    - max_bytes (int): Memory ceiling for one block of sequences
+
+    Yields:
+    - (id, sequence) tuples where sequence is bytes
+    """
+    columns = (np.flatnonzero(keep)[:, None] * 3 + np.arange(3)).ravel()
+    for ids, block in read_alignment_blocks(input_fasta, max_bytes):
+        trimmed = block[:, columns]
+        for record_id, row in zip(ids, trimmed):
+            yield record_id, row.tobytes()
+
+
+def trim_codon_alignment(input_fasta, output_file, max_gap_fraction=0.5, max_ambiguous_fraction=1.0,
+                         phylip_file=None, quiet=False, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Drops gappy codon columns from an aligned FASTA file and writes the aligned codons to a new FASTA file.
+
+    Args:
+    - input_fasta (str): Path to the aligned FASTA file
+    - output_file (str): Path to the output FASTA file
+    - max_gap_fraction (float): Highest fraction of gapped codons a kept column may have
+    - max_ambiguous_fraction (float): Highest fraction of ambiguous codons a kept column may have
+    - phylip_file (str): Also write the trimmed alignment to this PHYLIP file, optional
+    - quiet (bool): Do not print the summary report
+    - max_bytes (int): Memory ceiling for one block of sequences
+
+    Returns:
+    - Dictionary summarizing the trim: sequences, codons, kept_codons, dropped_gap, dropped_ambiguous,
+      trailing_bases, gap_fraction_before and gap_fraction_after
+    """
+    # First pass: gap and ambiguity counts of every codon column
+    stats = codon_column_stats(input_fasta, max_bytes)
+    keep = codon_column_mask(stats, max_gap_fraction, max_ambiguous_fraction)
+    too_gappy = stats["gapped"] > max_gap_fraction * stats["sequences"]
+
+    # Second pass: write the kept columns
+    with open(output_file, "w") as out_file:
+        for record_id, sequence in trimmed_records(input_fasta, keep, max_bytes):
+            out_file.write(f">{record_id}\n")
+            out_file.write(sequence.decode() + "\n")
+
+    if phylip_file:
+        fasta_to_phylip(output_file, phylip_file)
+
+    n_codons = len(keep)
+    cells = stats["sequences"] * n_codons
+    kept_cells = stats["sequences"] * int(keep.sum())
+    report = {
+        "sequences": stats["sequences"],
+        "codons": n_codons,
+        "kept_codons": int(keep.sum()),
+        "dropped_gap": int(too_gappy.sum()),
+        "dropped_ambiguous": int((~keep & ~too_gappy).sum()),
+        "trailing_bases": stats["width"] - 3 * n_codons,
+        "gap_fraction_before": float(stats["gapped"].sum() / cells) if cells else 0.0,
+        "gap_fraction_after": float(stats["gapped"][keep].sum() / kept_cells) if kept_cells else 0.0,
+    }
+
+    if not quiet:
+        print(f"Sequences: {report['sequences']}")
+        print(f"Codon columns kept: {report['kept_codons']} of {report['codons']} "
+              f"({report['dropped_gap']} dropped for gaps, {report['dropped_ambiguous']} for ambiguous bases)")
+        if report["trailing_bases"]:
+            print(f"Ignored {report['trailing_bases']} base(s) after the last complete codon")
+        print(f"Gapped codons: {report['gap_fraction_before']:.1%} before, {report['gap_fraction_after']:.1%} after")
+        print(f"Codons extraction complete! Output saved to: {output_file}")
+        if phylip_file:
+            print(f"PHYLIP copy saved to: {phylip_file}")
+
+    return report
+
+
+def process_fasta(input_fasta, output_file, quiet=False):
     """
     Processes a FASTA file, trims the sequences to the same length, extracts codons from each sequence, and writes the results to a FASTA file.
+    The file is streamed twice, once to find the shortest ungapped length and once to write, so only one record is held in memory at a time.
 
     Args:
     - input_fasta (str): Path to the input FASTA file
     - output_file (str): Path to the output FASTA file where codons will be saved
+    - quiet (bool): Do not print the per-sequence debug output
     """
     try:
-        # Read the sequences from the input FASTA file
-        records = list(SeqIO.parse(input_fasta, "fasta"))
-        if not records:
+        # First pass: original lengths and the shortest length after removing gaps
+        original_lengths = []
+        min_length = None
+        for record_id, sequence in read_fasta(input_fasta):
+            original_lengths.append(len(sequence))
+            ungapped_length = len(sequence) - sequence.count(b'-')
+            if min_length is None or ungapped_length < min_length:
+                min_length = ungapped_length
+
+        if min_length is None:
             print(f"Error: The input file '{input_fasta}' does not contain any sequences.")
             return
 
-        # Extract the sequences into a list of strings
-        sequences = [str(record.seq) for record in records]
+        if not quiet:
+            # Debug: Check sequence lengths before trimming
+            print(f"Original Sequences Lengths: {original_lengths}")
 
-        # Debug: Check sequence lengths before trimming
-        print(f"Original Sequences Lengths: {[len(seq) for seq in sequences]}")
+            # Debug: Check sequence lengths after trimming
+            print(f"Trimmed Sequences Lengths: {[min_length] * len(original_lengths)}")
 
-        # Trim the sequences to the same length
-        trimmed_sequences = trim_sequences(sequences)
-
-        # Debug: Check sequence lengths after trimming
-        print(f"Trimmed Sequences Lengths: {[len(seq) for seq in trimmed_sequences]}")
-
-        # Write the trimmed codons to the output FASTA file
+        # Second pass: trim each sequence and write the codons to the output FASTA file
         with open(output_file, 'w') as out_file:
-            for record, trimmed_seq in zip(records, trimmed_sequences):
+            for record_id, sequence in read_fasta(input_fasta):
+                trimmed_seq = sequence.decode().replace('-', '')[:min_length]
+
                 # Extract the codons from the trimmed sequence
                 codons = extract_codons(trimmed_seq)
 
-                # Debug: Check codons extracted
-                print(f"Extracted Codons for {record.id}: {codons[:10]}")  # Display the first 10 codons
+                if not quiet:
+                    # Debug: Check codons extracted
+                    print(f"Extracted Codons for {record_id}: {codons[:10]}")  # Display the first 10 codons
 
                 # Write the codons in FASTA format with the original header
-                out_file.write(f">{record.id}\n")
+                out_file.write(f">{record_id}\n")
                 out_file.write("".join(codons) + "\n")  # Combine the codons without spaces for a proper FASTA format
 
         print(f"Codons extraction complete! Output saved to: {output_file}")
@@ -105,9 +272,34 @@ def process_fasta(input_fasta, output_file):
     except Exception as e:
         print(f"An error occurred: {e}")
 
-# Specify the paths to the input FASTA file and the output file
-input_fasta = "H5_Aligned.fasta"  # Replace with your FASTA file path
-output_file = "Extracted_Codons.fasta"  # Replace with desired output FASTA file path
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract in-frame codons from an aligned FASTA file.")
+    parser.add_argument("input_fasta", nargs="?", default=os.path.join(SCRIPT_DIR, "H5_Aligned.fasta"),
+                        help="aligned FASTA file (default: H5_Aligned.fasta next to this script)")
+    parser.add_argument("output_file", nargs="?", default=os.path.join(SCRIPT_DIR, "Extracted_Codons.fasta"),
+                        help="output FASTA file (default: Extracted_Codons.fasta next to this script)")
+    parser.add_argument("--max-gap", type=float, default=0.5,
+                        help="drop codon columns where more than this fraction of sequences has a gap (default: 0.5)")
+    parser.add_argument("--max-ambiguous", type=float, default=1.0,
+                        help="drop codon columns where more than this fraction of sequences has an ambiguous base "
+                             "(default: 1.0, keep all)")
+    parser.add_argument("--phylip", default=None, help="also write the trimmed alignment to this PHYLIP file")
+    parser.add_argument("--ungapped", action="store_true",
+                        help="old behaviour: remove all gaps and cut every sequence to the shortest length")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print the report")
+    args = parser.parse_args(argv)
+
+    if args.ungapped:
+        process_fasta(args.input_fasta, args.output_file, args.quiet)
+        return
+
+    try:
+        trim_codon_alignment(args.input_fasta, args.output_file, args.max_gap, args.max_ambiguous, args.phylip,
+                             args.quiet)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.input_fasta}' was not found.")
+    except ValueError as e:
+        print(f"Error: {e}")
 
-# Run the process
-process_fasta(input_fasta, output_file)
+if __name__ == "__main__":
+    main()
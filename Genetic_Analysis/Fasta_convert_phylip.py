@@ -2,23 +2,193 @@
 
 #Sarah Schoem
 #27Feb2025
+#Edit 17Oct2026: strict, relaxed and interleaved output from a byte-offset index, with an ID mapping table
 
-from Bio import SeqIO
-
-def fasta_to_phylip(input_fasta, output_phylip):
-    with open(input_fasta, "r") as fasta_file:
-        sequences = SeqIO.parse(fasta_file, "fasta")
-        
-        with open(output_phylip, "w") as phylip_file:
-            # First, write the number of sequences and sequence length
-            seq_list = list(sequences)
-            num_sequences = len(seq_list)
-            seq_length = len(seq_list[0].seq)  # Assuming all sequences have the same length
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Genetic_Analysis.Alignment_store import store_for
+from Genetic_Analysis.Fasta_stream import index_fasta, DEFAULT_MAX_BYTES
+
+# Folder of this script, where the default input and output files are
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Width of a name in strict PHYLIP
+STRICT_NAME_WIDTH = 10
+
+# Characters PHYLIP readers, codeml and Newick trees cannot take in a name
+_UNSAFE_NAME = re.compile(r"[\s(),:;\[\]']")
+
+_WHITESPACE = b" \t\r\n"
+
+# Memory taken by a bytes object besides its contents, counted for every row held
+_ROW_OVERHEAD = sys.getsizeof(b"")
+
+
+def phylip_names(ids, width=None):
+    # Makes a unique, safe PHYLIP name for every id. Unsafe characters become "_", names are cut to width
+    # (strict PHYLIP) and a name that is already taken gets a "_2", "_3", ... suffix
+    names = []
+    used = set()
+    for record_id in ids:
+        base = _UNSAFE_NAME.sub("_", record_id) or "seq"
+        name = base[:width]
+        copy = 1
+        while name in used:
+            copy += 1
+            suffix = f"_{copy}"
+            name = (base[:width - len(suffix)] if width else base) + suffix
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def format_name(name, style):
+    # Strict PHYLIP names fill exactly 10 columns. Relaxed names are padded to 10 like before, followed by at
+    # least two spaces once they are longer, since codeml reads a name up to two spaces in a row
+    if style == "strict":
+        return name.ljust(STRICT_NAME_WIDTH)
+    if len(name) < STRICT_NAME_WIDTH:
+        return name.ljust(STRICT_NAME_WIDTH) + " "
+    return name + "  "
+
+
+def write_id_map(path, names, ids):
+    with open(path, "w") as map_file:
+        map_file.write("phylip_name\toriginal_id\n")
+        for name, record_id in zip(names, ids):
+            map_file.write(f"{name}\t{record_id}\n")
+
+
+def _column_reader(input_fasta, index, max_bytes):
+    # Returns a function giving columns [start, stop) of rows first .. last - 1 as one bytes object per row.
+    # Evenly wrapped files are read in place through a memory map of the FASTA file itself: the columns of a
+    # row are one stretch of the file, so each row is sliced from the offset of its first column and its line
+    # breaks removed, and nothing larger than the returned bytes is built. Anything else is first converted
+    # to an alignment store, a full uint8 copy of the alignment in Alignment_store.STORE_DIR
+    if (index.line_bases > 0).all():
+        raw = np.memmap(input_fasta, dtype=np.uint8, mode="r")
+
+        def offset(row, column):
+            bases = int(index.line_bases[row])
+            return int(index.starts[row]) + (column // bases) * int(index.line_bytes[row]) + column % bases
+
+        def read_columns(first, last, start, stop):
+            return [raw[offset(row, start):offset(row, stop - 1) + 1].tobytes().translate(None, _WHITESPACE)
+                    for row in range(first, last)]
+    else:
+        matrix = store_for(input_fasta, max_bytes=max_bytes).matrix
+
+        def read_columns(first, last, start, stop):
+            return [columns.tobytes() for columns in np.asarray(matrix[first:last, start:stop])]
+
+    return read_columns
+
+
+def fasta_to_phylip(input_fasta, output_phylip, style="relaxed", interleaved=False, line_width=60,
+                    id_map=None, max_bytes=DEFAULT_MAX_BYTES):
+    # Converts an aligned FASTA file to PHYLIP while holding at most one sequence, or one interleaved block
+    # of at most max_bytes, in memory.
+    # Interleaved output reads the columns of as many blocks as fit in max_bytes for all sequences in one pass
+    # (at least one block of line_width columns). Every pass touches a page of every sequence, so a file larger
+    # than the page cache is read from disk about seq_length / columns-per-pass times; a larger max_bytes means
+    # fewer passes. A FASTA file whose lines are not evenly wrapped is first copied to an alignment store in
+    # Alignment_store.STORE_DIR, which needs as much disk space as the alignment.
+    #   style: "relaxed" (full names, the old output of this script) or "strict" (names in exactly 10 columns)
+    #   interleaved: write blocks of line_width columns, with an "I" on the first line as codeml expects
+    #   id_map: path of the tab separated phylip_name / original_id table. By default it is written to
+    #           <output>.ids.tsv only when a name had to be changed
+    # Returns the path of the ID mapping table, or None if none was written
+    if style not in ("relaxed", "strict"):
+        raise ValueError(f"Unknown PHYLIP style {style!r}, use 'relaxed' or 'strict'")
+
+    # First pass: record ids and offsets only
+    index = index_fasta(input_fasta)
+    num_sequences = len(index.ids)
+    if num_sequences == 0:
+        raise ValueError(f"No sequences found in {input_fasta}")
+    seq_length = int(index.lengths[0])
+    if (index.lengths != seq_length).any():
+        raise ValueError("Sequences must all be the same length")
+
+    names = phylip_names(index.ids, STRICT_NAME_WIDTH if style == "strict" else None)
+    labels = [format_name(name, style) for name in names]
+
+    # Second pass: copy the sequences
+    with open(output_phylip, "w") as phylip_file:
+        if not interleaved:
             phylip_file.write(f"{num_sequences} {seq_length}\n")
-            
-            # Write the sequences in phylip format
-            for record in seq_list:
-                phylip_file.write(f"{record.id.ljust(10)} {str(record.seq)}\n")
+            with open(input_fasta, "rb") as fasta_file:
+                for label, start, end in zip(labels, index.starts, index.ends):
+                    fasta_file.seek(start)
+                    sequence = fasta_file.read(end - start).translate(None, _WHITESPACE)
+                    phylip_file.write(f"{label}{sequence.decode()}\n")
+        else:
+            phylip_file.write(f"{num_sequences} {seq_length} I\n")
+            read_columns = _column_reader(input_fasta, index, max_bytes)
+
+            # Whole blocks of every sequence that fit in max_bytes are read per pass; if not even one block of
+            # all sequences fits, one block is read a group of rows at a time
+            blocks_per_pass = max(1, (max_bytes // num_sequences - _ROW_OVERHEAD) // line_width)
+            pass_width = blocks_per_pass * line_width
+            rows_per_group = max(1, max_bytes // (min(pass_width, seq_length) + _ROW_OVERHEAD))
+            for pass_start in range(0, seq_length, pass_width):
+                pass_stop = min(pass_start + pass_width, seq_length)
+                held = read_columns(0, num_sequences, pass_start, pass_stop) \
+                    if rows_per_group >= num_sequences else None
+
+                for start in range(pass_start, pass_stop, line_width):
+                    stop = min(start + line_width, seq_length)
+                    if start:
+                        phylip_file.write("\n")
+                    for first in range(0, num_sequences, rows_per_group):
+                        last = min(first + rows_per_group, num_sequences)
+                        if held is None:
+                            group, shift = read_columns(first, last, start, stop), 0
+                        else:
+                            group, shift = held, start - pass_start
+                        for row, columns in zip(range(first, last), group):
+                            label = labels[row] if start == 0 else ""
+                            phylip_file.write(f"{label}{columns[shift:shift + stop - start].decode()}\n")
+
+    renamed = any(name != record_id for name, record_id in zip(names, index.ids))
+    if id_map is None and renamed:
+        id_map = output_phylip + ".ids.tsv"
+    if id_map:
+        write_id_map(id_map, names, index.ids)
+    return id_map
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an aligned FASTA file to PHYLIP.")
+    parser.add_argument("input_fasta", nargs="?", default=os.path.join(SCRIPT_DIR, "H5_Aligned.fasta"),
+                        help="aligned FASTA file (default: H5_Aligned.fasta next to this script)")
+    parser.add_argument("output_phylip", nargs="?", default=os.path.join(SCRIPT_DIR, "H5_Aligned.phy"),
+                        help="PHYLIP file to write (default: H5_Aligned.phy next to this script)")
+    parser.add_argument("--strict", action="store_true", help="strict PHYLIP: names cut to 10 characters")
+    parser.add_argument("-i", "--interleaved", action="store_true", help="write interleaved blocks")
+    parser.add_argument("-w", "--width", type=int, default=60, help="columns per interleaved block (default: 60)")
+    parser.add_argument("--id-map", default=None, help="where to write the name mapping table "
+                                                       "(default: <output>.ids.tsv when names change)")
+    args = parser.parse_args(argv)
+
+    if args.width < 1:
+        parser.error("width must be at least 1")
+
+    id_map = fasta_to_phylip(args.input_fasta, args.output_phylip, "strict" if args.strict else "relaxed",
+                             args.interleaved, args.width, args.id_map)
+    print(f"PHYLIP file written to {args.output_phylip}")
+    if id_map:
+        print(f"Name mapping written to {id_map}")
+
 
-# Example usage:
-fasta_to_phylip("H5_Aligned.fasta", "H5_Aligned.phy")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+
+import numpy as np
+
+"""
+File name: Fasta_stream.py
+Author: Sarah Schoem
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script streams records from a FASTA file as (id, bytes) pairs without building SeqRecord objects, so the
+    analysis scripts can work through alignments with hundreds of thousands of H5 segments. Records can also be
+    grouped into blocks, or into uint8 alignment matrices, that stay under a configurable memory ceiling.
+
+    The record id is the first word of the header line, the same as SeqRecord.id.
+
+    index_fasta records where every sequence sits in the file and how it is wrapped, so any column range of a
+    record can be read straight from disk.
+
+License: MIT License
+"""
+
+# Default memory ceiling for one block of sequence data
+DEFAULT_MAX_BYTES = 64 << 20
+
+_WHITESPACE = b" \t\r\n"
+
+FastaIndex = namedtuple("FastaIndex", ["ids", "starts", "ends", "lengths", "line_bases", "line_bytes"])
+FastaIndex.__doc__ = """ Byte offsets of the records of a FASTA file.
+
+ids (list): record id of every record
+starts (ndarray): offset of the first sequence byte of every record
+ends (ndarray): offset just past the last sequence line of every record
+lengths (ndarray): sequence length of every record, whitespace not counted
+line_bases (ndarray): sequence characters on each full line, -1 if the record is not evenly wrapped
+line_bytes (ndarray): bytes taken by each full line including its line break
+"""
+
+
+def read_fasta(fasta_file):
+    """
+    Yields the records of a FASTA file one at a time.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file
+
+    Yields:
+    - (id, sequence) tuples where id is a str and sequence is bytes with all whitespace removed
+    """
+    with open(fasta_file, "rb") as handle:
+        record_id = None
+        lines = []
+
+        for line in handle:
+            if line.startswith(b">"):
+                if record_id is not None:
+                    yield record_id, b"".join(lines).translate(None, _WHITESPACE)
+                header = line[1:].split(None, 1)
+                record_id = header[0].decode() if header else ""
+                lines = []
+            elif record_id is not None:
+                # Anything before the first header is a comment and is skipped
+                lines.append(line)
+
+        if record_id is not None:
+            yield record_id, b"".join(lines).translate(None, _WHITESPACE)
+
+
+def read_fasta_chunks(fasta_file, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Yields the records of a FASTA file in lists whose sequences total at most max_bytes.
+
+    A single record longer than max_bytes is yielded on its own.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file
+    - max_bytes (int): Memory ceiling for the sequence data in one chunk
+
+    Yields:
+    - Lists of (id, sequence) tuples
+    """
+    chunk = []
+    chunk_bytes = 0
+
+    for record in read_fasta(fasta_file):
+        if chunk and chunk_bytes + len(record[1]) > max_bytes:
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(record)
+        chunk_bytes += len(record[1])
+
+    if chunk:
+        yield chunk
+
+
+def read_alignment_blocks(fasta_file, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Yields an aligned FASTA file as blocks of rows, each holding at most max_bytes of sequence data.
+
+    Args:
+    - fasta_file (str): Path to the aligned FASTA file
+    - max_bytes (int): Memory ceiling for one block
+
+    Yields:
+    - (ids, matrix) tuples where ids is a list of record ids and matrix is a uint8 array of shape
+      (sequences in block, alignment length)
+
+    Raises:
+    - ValueError if the file holds no sequences or the sequences are not all the same length
+    """
+    width = None
+
+    for chunk in read_fasta_chunks(fasta_file, max_bytes):
+        if width is None:
+            width = len(chunk[0][1])
+        if any(len(sequence) != width for _, sequence in chunk):
+            raise ValueError("Sequences must all be the same length")
+
+        matrix = np.frombuffer(b"".join(sequence for _, sequence in chunk), dtype=np.uint8)
+        yield [record_id for record_id, _ in chunk], matrix.reshape(len(chunk), width)
+
+    if width is None:
+        raise ValueError(f"No sequences found in {fasta_file}")
+
+
+def fasta_dimensions(fasta_file):
+    """
+    Counts the records in a FASTA file and returns the length of the first one without keeping any sequences.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file
+
+    Returns:
+    - (number of records, length of the first sequence), or (0, 0) for an empty file
+    """
+    count = 0
+    first_length = 0
+    for record_id, sequence in read_fasta(fasta_file):
+        if count == 0:
+            first_length = len(sequence)
+        count += 1
+    return count, first_length
+
+
+def index_fasta(fasta_file):
+    """
+    Indexes the records of a FASTA file in one pass without keeping any sequences.
+
+    A record is evenly wrapped when every sequence line but the last has the same length and line break, the last
+    line is no longer than the others, and no line holds spaces or tabs. Column c of such a record is at byte
+    starts + (c // line_bases) * line_bytes + c % line_bases.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file
+
+    Returns:
+    - FastaIndex
+    """
+    ids, starts, ends, lengths, line_bases, line_bytes = [], [], [], [], [], []
+    offset = 0
+    record_open = False
+
+    with open(fasta_file, "rb") as handle:
+        for line in handle:
+            if line.startswith(b">"):
+                if record_open:
+                    ends.append(offset)
+                    lengths.append(length)
+                    line_bases.append(bases if even else -1)
+                    line_bytes.append(width if even else -1)
+                header = line[1:].split(None, 1)
+                ids.append(header[0].decode() if header else "")
+                starts.append(offset + len(line))
+                record_open = True
+                length, bases, width, even, short_line = 0, None, None, True, False
+            elif record_open:
+                content = line.rstrip(b"\r\n")
+                size = len(content.translate(None, _WHITESPACE))
+                if size:
+                    if size != len(content) or short_line:
+                        even = False
+                    elif bases is None:
+                        bases, width = size, len(line)
+                    elif size > bases or (line.endswith(b"\n") and len(line) - len(content) != width - bases):
+                        even = False
+                    if bases is not None and size < bases:
+                        short_line = True
+                    length += size
+                else:
+                    short_line = True
+            offset += len(line)
+
+    if record_open:
+        ends.append(offset)
+        lengths.append(length)
+        line_bases.append(bases if even else -1)
+        line_bytes.append(width if even else -1)
+
+    return FastaIndex(ids, np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+                      np.array(lengths, dtype=np.int64),
+                      np.array([-1 if b is None else b for b in line_bases], dtype=np.int64),
+                      np.array([-1 if w is None else w for w in line_bytes], dtype=np.int64))
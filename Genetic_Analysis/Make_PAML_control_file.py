@@ -5,39 +5,116 @@
 
 import os
 
-# Define the content of the 'codeml.ctl' file for PAML 4.9j
-codeml_content = """seqfile = cleaned_H5_Aligned.phy  # Sequence alignment file (in Phylip format)
-treefile = H5_Aligned.fasta.treefile  # Phylogenetic tree file
-outfile = H5_results.txt  # Output file
+# Default settings of the 'codeml.ctl' file for PAML 4.9j
+DEFAULT_OPTIONS = {
+    "seqfile": "cleaned_H5_Aligned.phy",
+    "treefile": "H5_Aligned.fasta.treefile",
+    "outfile": "H5_results.txt",
+    "noisy": 9,
+    "verbose": 1,
+    "runmode": 0,
+    "seqtype": 1,
+    "CodonFreq": 2,
+    "clock": 0,
+    "model": 0,
+    "NSsites": 2,
+    "icode": 0,
+    "fix_kappa": 0,
+    "kappa": 2,
+    "fix_omega": 0,
+    "omega": 1,
+}
+
+# Blank-line separated groups the options are written in; any other option goes in the last group
+OPTION_GROUPS = [
+    ["seqfile", "treefile", "outfile"],
+    ["noisy", "verbose", "runmode"],
+    ["seqtype", "CodonFreq"],
+    ["clock", "model", "NSsites"],
+    ["icode", "fix_kappa", "kappa", "fix_omega", "omega"],
+]
+
+# Comments written next to an option while it has its default value
+OPTION_COMMENTS = {
+    "seqfile": "Sequence alignment file (in Phylip format)",
+    "treefile": "Phylogenetic tree file",
+    "outfile": "Output file",
+    "runmode": "Standard codon model analysis",
+    "seqtype": "Codon sequences",
+    "CodonFreq": "F3x4 model for codon frequencies",
+    "model": "One-ratio model (same dN/dS for all branches)",
+    "NSsites": "Positive selection model (M2a: neutral + selection)",
+}
+
+
+def format_option(value):
+    """
+    Formats an option value the way codeml reads it. Lists, such as several NSsites models, are space separated.
+    """
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return str(value)
+
+
+def control_file_content(**options):
+    """
+    Builds the content of a codeml.ctl file.
 
-noisy = 9
-verbose = 1
-runmode = 0  # Standard codon model analysis
+    Args:
+    - options: codeml options (for example seqfile="gene.phy", NSsites=[0, 1, 2]) that replace or add to
+      DEFAULT_OPTIONS
 
-seqtype = 1  # Codon sequences
-CodonFreq = 2  # F3x4 model for codon frequencies
+    Returns:
+    - Content of the control file as a string
+    """
+    settings = {**DEFAULT_OPTIONS, **options}
+    known = {name for group in OPTION_GROUPS for name in group}
+    groups = [list(group) for group in OPTION_GROUPS]
+    groups[-1].extend(name for name in settings if name not in known)
 
-clock = 0
-model = 0  # One-ratio model (same dN/dS for all branches)
-NSsites = 2  # Positive selection model (M2a: neutral + selection)
+    blocks = []
+    for group in groups:
+        lines = []
+        for name in group:
+            line = f"{name} = {format_option(settings[name])}"
+            if name in OPTION_COMMENTS and settings[name] == DEFAULT_OPTIONS.get(name):
+                line += f"  # {OPTION_COMMENTS[name]}"
+            lines.append(line)
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
 
-icode = 0
-fix_kappa = 0
-kappa = 2
-fix_omega = 0
-omega = 1"""
 
-# Prompt the user for the directory where the file should be saved
-user_directory = input("Please enter the directory where codeml.ctl should be saved: ")
+def write_control_file(directory, file_name="codeml.ctl", **options):
+    """
+    Writes a codeml control file into a directory, creating the directory if needed.
 
-# Ensure the directory exists
-os.makedirs(user_directory, exist_ok=True)
+    Args:
+    - directory (str): Directory the control file is written to
+    - file_name (str): Name of the control file
+    - options: codeml options passed to control_file_content
+
+    Returns:
+    - Full path of the control file
+    """
+    # Ensure the directory exists
+    os.makedirs(directory, exist_ok=True)
+
+    # Define the full path for the control file
+    file_path = os.path.join(directory, file_name)
+
+    # Write the content to the file
+    with open(file_path, "w") as f:
+        f.write(control_file_content(**options))
+    return file_path
+
+
+# Define the content of the 'codeml.ctl' file for PAML 4.9j
+codeml_content = control_file_content()
 
-# Define the full path for the control file
-file_path = os.path.join(user_directory, "codeml.ctl")
+if __name__ == "__main__":
+    # Prompt the user for the directory where the file should be saved
+    user_directory = input("Please enter the directory where codeml.ctl should be saved: ")
 
-# Write the modified content to the file
-with open(file_path, "w") as f:
-    f.write(codeml_content)
+    file_path = write_control_file(user_directory)
 
-print(f"codeml.ctl file has been written to {file_path}")
+    print(f"codeml.ctl file has been written to {file_path}")
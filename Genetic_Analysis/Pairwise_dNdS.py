@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Genetic_Analysis.Alignment_store import store_for
+from Genetic_Analysis.Calc_SynSub_NonSynSub_1 import encode_codon_matrix, SYN_DIFFERENCES, NONSYN_DIFFERENCES, \
+    COMPARABLE, SYN_SITES
+
+"""
+File name: Pairwise_dNdS.py
+Author: Sarah Schoem
+Created: 17Oct2026
+Version: 1.0
+Description:
+    This code calculates a full pairwise dN/dS matrix for an aligned set of
+    coding sequences with the Nei and Gojobori (1986) method and a Jukes-Cantor
+    correction, using the codon matrix and lookup tables from
+    Calc_SynSub_NonSynSub_1.
+
+    For each pair, only codon positions where both sequences have a sense codon
+    are used. Synonymous sites are the mean of the two codons' precomputed site
+    counts, and differences come from the pathway tables. Rows of the O(n^2)
+    pair list are split across a process pool and the results are written as
+    condensed matrices (the order used by scipy.spatial.distance.squareform)
+    to a .npz file with the sequence ids.
+
+    Usage:
+        python -m Genetic_Analysis.Pairwise_dNdS H5_Aligned.fasta -o H5_dNdS.npz --jobs 8
+"""
+
+# Target number of pairs handled by one pool task
+PAIRS_PER_TASK = 20000
+
+_codes = None
+
+
+def jukes_cantor(p):
+    """Jukes-Cantor corrected distance, NaN where p >= 0.75."""
+    p = np.asarray(p, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d = -0.75 * np.log(1 - 4.0 * p / 3)
+    return np.where(p < 0.75, d, np.nan)
+
+
+def ng86_row(codes, i):
+    """Nei-Gojobori statistics of row i against every later row of a codon matrix.
+
+    Returns a dict of arrays (one value per pair) with the synonymous and
+    non-synonymous sites (S, N), differences (Sd, Nd), dS, dN and omega.
+    """
+    ref = codes[i]
+    others = codes[i + 1:]
+
+    comparable = COMPARABLE[ref, others]
+    codons = comparable.sum(axis=1)
+    syn_sites = np.where(comparable, SYN_SITES[ref] + SYN_SITES[others], 0).sum(axis=1) / 2
+    nonsyn_sites = 3 * codons - syn_sites
+    syn_diff = SYN_DIFFERENCES[ref, others].sum(axis=1)
+    nonsyn_diff = NONSYN_DIFFERENCES[ref, others].sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ds = jukes_cantor(syn_diff / syn_sites)
+        dn = jukes_cantor(nonsyn_diff / nonsyn_sites)
+        omega = np.where(ds > 0, dn / ds, np.nan)
+
+    return {"S": syn_sites, "N": nonsyn_sites, "Sd": syn_diff, "Nd": nonsyn_diff, "dS": ds, "dN": dn,
+            "omega": omega}
+
+
+def _init_worker(codes):
+    global _codes
+    _codes = codes
+
+
+def _row_block(rows):
+    results = [ng86_row(_codes, i) for i in rows]
+    return rows[0], {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def _row_tasks(n, pairs_per_task):
+    """Groups rows 0..n-2 into consecutive ranges with about pairs_per_task pairs each."""
+    tasks = []
+    rows = []
+    pairs = 0
+    for i in range(n - 1):
+        rows.append(i)
+        pairs += n - i - 1
+        if pairs >= pairs_per_task:
+            tasks.append(rows)
+            rows = []
+            pairs = 0
+    if rows:
+        tasks.append(rows)
+    return tasks
+
+
+def condensed_offset(n, i):
+    """Position of pair (i, i + 1) in a condensed matrix of n sequences."""
+    return i * n - i * (i + 1) // 2
+
+
+def pairwise_dnds(codes, processes=None, pairs_per_task=PAIRS_PER_TASK):
+    """Calculates Nei-Gojobori statistics for every pair of rows of a codon matrix.
+
+    Args:
+    - codes (ndarray): codon matrix from encode_codon_matrix
+    - processes (int): number of worker processes, all cores if None, 1 to run in this process
+    - pairs_per_task (int): pairs handed to a worker at a time
+
+    Returns:
+    - dict of condensed arrays of length n * (n - 1) / 2 with keys S, N, Sd, Nd, dS, dN and omega
+    """
+    n = len(codes)
+    n_pairs = n * (n - 1) // 2
+    keys = ["S", "N", "Sd", "Nd", "dS", "dN", "omega"]
+    condensed = {key: np.empty(n_pairs) for key in keys}
+    tasks = _row_tasks(n, pairs_per_task)
+
+    def store(start_row, block):
+        offset = condensed_offset(n, start_row)
+        for key in keys:
+            condensed[key][offset:offset + len(block[key])] = block[key]
+
+    if processes == 1 or len(tasks) <= 1:
+        _init_worker(codes)
+        for rows in tasks:
+            store(*_row_block(rows))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(codes,)) as pool:
+            for start_row, block in pool.map(_row_block, tasks):
+                store(start_row, block)
+
+    return condensed
+
+
+def pairwise_dnds_fasta(input_fasta, output_file, processes=None):
+    """Calculates the pairwise dN/dS matrix of an aligned codon FASTA file and writes it to a .npz file
+    holding the ids and the condensed S, N, Sd, Nd, dS, dN and omega arrays."""
+    store = store_for(input_fasta)
+    codes = encode_codon_matrix(np.asarray(store.matrix))
+    condensed = pairwise_dnds(codes, processes)
+
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(output_file, ids=np.array(store.ids), **condensed)
+    return condensed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pairwise Nei-Gojobori dN/dS matrix of a codon alignment.")
+    parser.add_argument("input_fasta", help="aligned, in-frame nucleotide FASTA file")
+    parser.add_argument("-o", "--output", default="dNdS_matrix.npz", help="output .npz file (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    condensed = pairwise_dnds_fasta(args.input_fasta, args.output, args.jobs)
+    omega = condensed["omega"]
+    print(f"{len(omega)} pairs written to {args.output}")
+    if np.isfinite(omega).any():
+        print(f"Median pairwise dN/dS: {np.nanmedian(omega):.3f}")
+
+
+if __name__ == "__main__":
+    main()
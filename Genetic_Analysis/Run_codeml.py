@@ -3,29 +3,36 @@
 # Author:
 # Mock Directory: C:\Users\Avian_Influenza-main\Genetic_Analysis\paml4.9j\bin
 
-import subprocess
 import os
+import subprocess
 
-def run_codeml(codeml_path="codeml", control_file="codeml.ctl"):
+def run_codeml(codeml_path="codeml", control_file="codeml.ctl", working_dir=None, timeout=None):
     """
     Runs codeml from PAML using the specified control file.
 
     Args:
     - codeml_path (str): Path to the codeml executable (default assumes it's in PATH).
     - control_file (str): Path to the codeml control file.
+    - working_dir (str): Directory holding the control file. If None, the user is prompted for it.
+    - timeout (float): Seconds to wait for codeml before giving up, no limit if None.
 
     Returns:
     - Output from codeml as a string.
     """
-    # Prompt the user for the directory where the control file is located
-    user_directory = input("Please enter the directory where codeml.ctl is located: ")
+    if working_dir is None:
+        # Prompt the user for the directory where the control file is located
+        working_dir = input("Please enter the directory where codeml.ctl is located: ")
 
-    # Change the working directory to where the control file is located
-    os.chdir(user_directory)
+    # Checked first because a missing cwd raises the same FileNotFoundError as a missing executable
+    if not os.path.isdir(working_dir):
+        print(f"Error: the directory {working_dir} does not exist.")
+        return None
 
     try:
-        # Run codeml with the control file in the specified directory
-        result = subprocess.run([codeml_path, control_file], capture_output=True, text=True)
+        # Run codeml with the control file in the specified directory. codeml may wait for Enter when it
+        # finishes, so a newline is sent on stdin.
+        result = subprocess.run([codeml_path, control_file], cwd=working_dir, input="\n", capture_output=True,
+                                text=True, timeout=timeout)
         if result.returncode == 0:
             print("codeml ran successfully.")
             return result.stdout
@@ -35,8 +42,12 @@ def run_codeml(codeml_path="codeml", control_file="codeml.ctl"):
     except FileNotFoundError:
         print("Error: codeml executable not found. Check if PAML is installed and accessible in PATH.")
         return None
+    except subprocess.TimeoutExpired:
+        print(f"Error: codeml did not finish within {timeout} seconds.")
+        return None
 
-# Run the function
-output = run_codeml()
-if output:
-    print("codeml output:\n", output)
+if __name__ == "__main__":
+    # Run the function
+    output = run_codeml()
+    if output:
+        print("codeml output:\n", output)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Genetic_Analysis.CAI_weights import weights_from_reference
+from Genetic_Analysis.Calculate_CAI import calculate_cai_batch, influenza_log_weights, log_weight_table
+from Genetic_Analysis.Fasta_stream import read_fasta
+
+"""
+File name: Score_CAI.py
+Author: Victoria, Debra Pacheco
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script scores the CAI of every sequence in a folder of FASTA files, such as a GISAID or NCBI download,
+    without any prompts. Files are spread across a process pool and each file's results are written as soon as
+    it finishes, so memory stays flat and an interrupted run loses at most the files in flight.
+
+    Re-running with the same output resumes: files that are already complete are skipped, and accessions that
+    were already scored are not written twice. Completed files, including ones without any sequences, are
+    listed by their path relative to the folder in a <output>.done file next to the output.
+
+    Output is a CSV file with Accession, CAI and File columns, or a Parquet dataset (a directory of part files,
+    one per scored FASTA file) when the output path ends in .parquet. Parquet output needs pyarrow installed.
+
+    Sequences are scored against the relative adaptiveness of the influenza codon usage table, or with --weights
+    against a table built from a reference FASTA file of a host's highly expressed genes (see CAI_weights.py).
+    Resume an output with the same weights it was started with.
+
+    Usage:
+        python -m Genetic_Analysis.Score_CAI downloads/ -o H5_CAI_Results.csv --jobs 8
+        python -m Genetic_Analysis.Score_CAI downloads/ -o H5_CAI_Chicken.csv --weights chicken_genes.fasta
+
+License: MIT License
+"""
+
+FASTA_EXTENSIONS = (".fa", ".fasta", ".fas", ".fna", ".ffn")
+COLUMNS = ["Accession", "CAI", "File"]
+
+# Suffix of the file listing the completed FASTA files of an output
+DONE_SUFFIX = ".done"
+
+
+def find_fasta_files(folder, recursive=False):
+    """ Returns the sorted paths of the FASTA files in a folder. """
+    pattern = os.path.join(folder, "**", "*") if recursive else os.path.join(folder, "*")
+    return sorted(path for path in glob.glob(pattern, recursive=recursive)
+                  if os.path.isfile(path) and path.lower().endswith(FASTA_EXTENSIONS))
+
+
+def file_key(fasta_file, folder):
+    """ Returns the path of a FASTA file relative to the scored folder, with / separators. """
+    return os.path.relpath(fasta_file, folder).replace(os.sep, "/")
+
+
+def score_file(fasta_file, folder=None, log_weights=influenza_log_weights):
+    """
+    Scores every sequence in one FASTA file.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file
+    - folder (str): Scored folder; the File column holds the path relative to it, or the file name if None
+    - log_weights (ndarray): 65-entry table from log_weight_table
+
+    Returns:
+    - DataFrame with the Accession, CAI and File of every sequence
+    """
+    ids = []
+    sequences = []
+    seen = set()
+    for record_id, sequence in read_fasta(fasta_file):
+        # An accession repeated in the file is scored once, like one already in the output
+        if record_id in seen:
+            continue
+        seen.add(record_id)
+        ids.append(record_id)
+        sequences.append(sequence)
+
+    scores = calculate_cai_batch(sequences, ids=ids, log_weights=log_weights)
+    scores["File"] = file_key(fasta_file, folder) if folder is not None else os.path.basename(fasta_file)
+    return scores
+
+
+def is_parquet(output_path):
+    return output_path.lower().endswith(".parquet")
+
+
+def _read_parts(output_path):
+    """ Returns the Accession and File columns of the readable part files of a Parquet dataset. """
+    tables = []
+    for part in sorted(glob.glob(os.path.join(output_path, "*.parquet"))):
+        try:
+            tables.append(pd.read_parquet(part, columns=["Accession", "File"]))
+        except Exception as error:  # pyarrow raises its own errors for a part cut off by an interrupted run
+            print(f"Ignoring unreadable part file {part}: {error}", file=sys.stderr)
+    return pd.concat(tables) if tables else pd.DataFrame(columns=["Accession", "File"])
+
+
+def _drop_partial_line(output_path):
+    """ Truncates a CSV output back to its last newline, removing a row cut off by an interrupted run. """
+    with open(output_path, "rb+") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        handle.seek(size - 1)
+        if handle.read(1) == b"\n":
+            return
+
+        # Walk back in blocks to the last newline; the header line is kept even without one
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                handle.truncate(start + newline + 1)
+                return
+            end = start
+        handle.truncate(0)
+
+
+def load_progress(output_path):
+    """ Returns the (accessions, files) already written to an output, both empty if it does not exist yet. """
+    files = set()
+    try:
+        with open(output_path + DONE_SUFFIX) as handle:
+            files.update(line.rstrip("\n") for line in handle if line.strip())
+    except OSError:
+        pass
+
+    if not os.path.exists(output_path):
+        return set(), files
+
+    if is_parquet(output_path):
+        done = _read_parts(output_path)
+    else:
+        try:
+            done = pd.read_csv(output_path, usecols=["Accession", "File"], dtype=str)
+        except pd.errors.EmptyDataError:
+            return set(), files
+
+    # Outputs written before the .done file existed only have the File column
+    return set(done["Accession"]), files | set(done["File"])
+
+
+class _CSVSink:
+    """ Appends result rows to a CSV file, flushing after every file. """
+
+    def __init__(self, output_path):
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.handle = open(output_path, "a", newline="")
+        self.writer = csv.writer(self.handle)
+        if new_file:
+            self.writer.writerow(COLUMNS)
+
+    def write(self, scores):
+        self.writer.writerows(scores[COLUMNS].itertuples(index=False, name=None))
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+
+
+class _ParquetSink:
+    """ Writes the result rows of each FASTA file to a new part file of a Parquet dataset.
+
+    A part is written under a temporary name and renamed once it is closed, so an interrupted run never
+    leaves a part without its footer.
+    """
+
+    def __init__(self, output_path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow. Install it with: pip install pyarrow")
+
+        os.makedirs(output_path, exist_ok=True)
+        numbers = [int(name[5:-8]) for name in os.listdir(output_path)
+                   if name.startswith("part-") and name.endswith(".parquet") and name[5:-8].isdigit()]
+        self.next_part = max(numbers, default=-1) + 1
+        self.output_path = output_path
+        self.pa = pa
+        self.schema = pa.schema([("Accession", pa.string()), ("CAI", pa.float64()), ("File", pa.string())])
+        self.pq = pq
+
+    def write(self, scores):
+        if scores.empty:
+            return
+        part_path = os.path.join(self.output_path, f"part-{self.next_part:05d}.parquet")
+        self.pq.write_table(self.pa.Table.from_pandas(scores[COLUMNS], schema=self.schema, preserve_index=False),
+                            part_path + ".tmp")
+        os.replace(part_path + ".tmp", part_path)
+        self.next_part += 1
+
+    def close(self):
+        pass
+
+
+def score_folder(folder, output_path, jobs=None, recursive=False, overwrite=False, quiet=False,
+                 log_weights=influenza_log_weights):
+    """
+    Scores every FASTA file in a folder across a process pool and streams the results to output_path.
+
+    Args:
+    - folder (str): Folder containing FASTA files
+    - output_path (str): CSV file, or Parquet dataset directory if it ends in .parquet
+    - jobs (int): Number of worker processes, all cores if None
+    - recursive (bool): Also search subfolders
+    - overwrite (bool): Discard an existing output instead of resuming it
+    - quiet (bool): Do not print per-file progress
+    - log_weights (ndarray): 65-entry table from log_weight_table, the influenza relative adaptiveness by default
+
+    Returns:
+    - Number of sequences written in this run
+    """
+    if overwrite:
+        if os.path.isdir(output_path):
+            for part in glob.glob(os.path.join(output_path, "*.parquet*")):
+                os.remove(part)
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+        if os.path.exists(output_path + DONE_SUFFIX):
+            os.remove(output_path + DONE_SUFFIX)
+
+    if not is_parquet(output_path) and os.path.isfile(output_path):
+        _drop_partial_line(output_path)
+
+    done_accessions, done_files = load_progress(output_path)
+    files = [path for path in find_fasta_files(folder, recursive) if file_key(path, folder) not in done_files]
+    if not quiet:
+        print(f"{len(files)} file(s) to score, {len(done_files)} already complete.")
+
+    sink = _ParquetSink(output_path) if is_parquet(output_path) else _CSVSink(output_path)
+    done_log = open(output_path + DONE_SUFFIX, "a")
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(score_file, path, folder, log_weights): path for path in files}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    scores = future.result()
+                except (OSError, ValueError) as error:
+                    print(f"Skipping {path}: {error}", file=sys.stderr)
+                    continue
+
+                scores = scores[~scores["Accession"].isin(done_accessions)].drop_duplicates("Accession")
+                done_accessions.update(scores["Accession"])
+                sink.write(scores)
+                written += len(scores)
+
+                # Listed only after its rows are written, so an interrupted file is scored again
+                done_log.write(file_key(path, folder) + "\n")
+                done_log.flush()
+
+                if not quiet:
+                    print(f"Scored {len(scores)} sequence(s) from {os.path.basename(path)}")
+    finally:
+        sink.close()
+        done_log.close()
+
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the CAI of every sequence in a folder of FASTA files.")
+    parser.add_argument("folder", help="folder containing FASTA files")
+    parser.add_argument("-o", "--output", default="CAI_Results.csv",
+                        help="CSV file, or Parquet dataset if the name ends in .parquet (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="also search subfolders")
+    parser.add_argument("--overwrite", action="store_true", help="start over instead of resuming")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    parser.add_argument("-w", "--weights", default=None,
+                        help="reference FASTA file to build the codon weights from (default: relative adaptiveness "
+                             "of the influenza codon usage table)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"{args.folder} is not a folder")
+
+    log_weights = influenza_log_weights
+    if args.weights is not None:
+        if not os.path.isfile(args.weights):
+            parser.error(f"{args.weights} is not a file")
+        log_weights = log_weight_table(weights_from_reference(args.weights))
+
+    written = score_folder(args.folder, args.output, args.jobs, args.recursive, args.overwrite, args.quiet,
+                           log_weights)
+    print(f"CAI scoring complete! {written} sequence(s) written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import argparse
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from Genetic_Analysis.Fasta_stream import read_fasta
+from Genetic_Analysis.Calc_SynSub_NonSynSub_1 import encode_codon_matrix, SYN_DIFFERENCES, NONSYN_DIFFERENCES, \
+    COMPARABLE, SYN_SITES, BLOCK_SEQUENCES
+from Genetic_Analysis.Pairwise_dNdS import jukes_cantor
+
+"""
+File name: Selection_scan.py
+Author: Sarah Schoem
+Created: 17Oct2026
+Version: 1.0
+Description:
+    This code scans an aligned codon FASTA file (for example HA or PB2, or a
+    concatenated genome) for site-level selection signal that a single global
+    dN/dS hides, such as changes at receptor-binding residues.
+
+    Every sequence is compared to the first (reference) sequence, as in
+    Calc_SynSub_NonSynSub_1.process_fasta. For each codon site the synonymous
+    and non-synonymous sites and differences are summed over all sequences with
+    the Nei-Gojobori tables. Sliding windows are then read off one cumulative
+    sum of those per-site totals, so any window size costs the same. The last
+    window always ends at the last site, even when the step does not reach it.
+
+    The result is one tidy table with a row per site (scale = "site") and per
+    window (scale = "window"), ready for plotting.
+
+    Usage:
+        python -m Genetic_Analysis.Selection_scan Extracted_Codons.fasta -o scan.csv --window 20 --step 5
+"""
+
+TOTALS = ["comparisons", "S", "N", "Sd", "Nd"]
+
+
+def site_totals(records, block_sequences=BLOCK_SEQUENCES):
+    """Sums Nei-Gojobori statistics per codon site over every sequence compared to the first one.
+
+    Args:
+    - records (iterable): (id, sequence) pairs, the first one is the reference
+    - block_sequences (int): sequences encoded at a time
+
+    Returns:
+    - dict of arrays, one value per codon site: comparisons, S, N, Sd and Nd
+    """
+    records = iter(records)
+    reference = next(records, None)
+    if reference is None:
+        raise ValueError("No sequences to scan")
+
+    ref_length = len(reference[1])
+    ref = encode_codon_matrix([reference[1]])[0]
+    totals = {key: np.zeros(len(ref)) for key in TOTALS}
+
+    while True:
+        block = [sequence for _, sequence in islice(records, block_sequences)]
+        if not block:
+            break
+        codes = encode_codon_matrix(block, ref_length)
+
+        comparable = COMPARABLE[ref, codes]
+        totals["comparisons"] += comparable.sum(axis=0)
+        syn_sites = np.where(comparable, SYN_SITES[ref] + SYN_SITES[codes], 0).sum(axis=0) / 2
+        totals["S"] += syn_sites
+        totals["N"] += 3 * comparable.sum(axis=0) - syn_sites
+        totals["Sd"] += SYN_DIFFERENCES[ref, codes].sum(axis=0)
+        totals["Nd"] += NONSYN_DIFFERENCES[ref, codes].sum(axis=0)
+
+    return totals
+
+
+def _with_rates(table):
+    """Adds pS, pN, dS, dN and omega columns to a table of summed statistics."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table["pS"] = table["Sd"] / table["S"]
+        table["pN"] = table["Nd"] / table["N"]
+        table["dS"] = jukes_cantor(table["pS"])
+        table["dN"] = jukes_cantor(table["pN"])
+        table["omega"] = np.where(table["dS"] > 0, table["dN"] / table["dS"], np.nan)
+    return table
+
+
+def window_totals(totals, window, step=1):
+    """Sums per-site totals over sliding windows of codon sites using one cumulative sum.
+
+    Returns a dict of arrays with the 1-based first and last site of every window
+    plus the summed statistics. When the step does not land on the last site, one
+    more full-size window ending at the last site is added so no site is left out.
+    """
+    n_sites = len(totals["S"])
+    starts = np.arange(0, max(n_sites - window, 0) + 1, step)
+    if starts[-1] + window < n_sites:
+        starts = np.append(starts, n_sites - window)
+    ends = np.minimum(starts + window, n_sites)
+
+    windows = {"start": starts + 1, "end": ends}
+    for key in TOTALS:
+        cumulative = np.concatenate(([0.0], np.cumsum(totals[key])))
+        windows[key] = cumulative[ends] - cumulative[starts]
+    return windows
+
+
+def selection_scan(records, window=20, step=5):
+    """Runs a per-site and sliding-window selection scan.
+
+    Args:
+    - records (iterable): (id, sequence) pairs of aligned, in-frame codon sequences, reference first
+    - window (int): window size in codons
+    - step (int): distance in codons between window starts
+
+    Returns:
+    - DataFrame with columns scale, start, end, comparisons, S, N, Sd, Nd, pS, pN, dS, dN and omega
+    """
+    totals = site_totals(records)
+    sites = np.arange(1, len(totals["S"]) + 1)
+
+    site_table = pd.DataFrame({"scale": "site", "start": sites, "end": sites, **totals})
+    window_table = pd.DataFrame({"scale": "window", **window_totals(totals, window, step)})
+
+    table = pd.concat([site_table, window_table], ignore_index=True)
+    return _with_rates(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-site and sliding-window dN/dS scan of a codon alignment.")
+    parser.add_argument("input_fasta", help="aligned, in-frame nucleotide FASTA file; the first sequence is the "
+                                            "reference")
+    parser.add_argument("-o", "--output", default="selection_scan.csv", help="output CSV (default: %(default)s)")
+    parser.add_argument("-w", "--window", type=int, default=20, help="window size in codons (default: %(default)s)")
+    parser.add_argument("-s", "--step", type=int, default=5, help="window step in codons (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.window < 1 or args.step < 1:
+        parser.error("window and step must be at least 1")
+
+    table = selection_scan(read_fasta(args.input_fasta), args.window, args.step)
+    table.to_csv(args.output, index=False)
+
+    sites = table[table["scale"] == "site"]
+    print(f"Scanned {len(sites)} codon sites; table saved to {args.output}")
+    positive = sites[sites["omega"] > 1]
+    if len(positive):
+        print(f"Sites with dN/dS > 1: {', '.join(str(site) for site in positive['start'].head(20))}"
+              + (" ..." if len(positive) > 20 else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 
-import requests
-from io import StringIO
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
-from HPAI_maps.State_Conversion import state_conversion
+from HPAI_maps.data_sources import USDA_MAMMALS_URL, read_csv
+from HPAI_maps.State_Normalization import normalize_states
 
 """
 File name: HPAI_map.py
@@ -23,14 +22,8 @@ def generate_map():
     # Function to generate and return the map that can be used in Main file
 
     # Detection of Highly Pathogenic Avian Influenza in captive and wild mammals obtained from the USDA website May 2022 to present
-    url = "https://www.aphis.usda.gov/sites/default/files/hpai-mammals.csv"  # HPAI_maps Detections in mammals from USDA
-
-
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an error for bad status codes
-
-    # Read the content directly into a pandas DataFrame
-    data = pd.read_csv(StringIO(response.text))
+    # Read the CSV into a pandas DataFrame, downloading it only if the cached copy is out of date
+    data = read_csv(USDA_MAMMALS_URL)
 
     #print(data.tail(30))  # Display the first few rows
 
@@ -42,7 +35,7 @@ def generate_map():
     data['Year'] = pd.DatetimeIndex(data['Date Detected']).year
 
     # Create new column in data with the state abbreviation for Choropleth plotting
-    data['Abbreviation'] = data['State'].apply(state_conversion)
+    data['Abbreviation'] = normalize_states(data['State'])
 
     # Create a new data frame with state counts per year
     counts_year = data.groupby(['Abbreviation', 'Year']).size().reset_index(name='State_Count')
@@ -5,49 +5,58 @@ File name: HPAI_Animal_map.py
 Author: Debra Pacheco
 Created: 1/21/25
 Editor: Sarah Schoem
-Last Edited: 3/9/2025
-Version: 1.3
+Last Edited: 10/17/2026
+Version: 1.4
 Description:
     This script displays a choropleth map of the United States containing highly pathogenic avian influenza (HPAI)
     animal cases obtained from the Aphis USDA website and filtered by year.
 
+    The CSV files are downloaded through HPAI_maps.data_sources, which caches them and only downloads them
+    again when they have changed. Both files are fetched at the same time, and only their new rows are added to
+    HPAI_maps.detection_store, from which the map reads the per state and year counts. The finished map is kept
+    by HPAI_maps.map_cache as JSON and standalone HTML and only drawn again when those counts change.
+
 License: MIT License
 """
 
-import requests
-from io import StringIO
 import plotly.graph_objects as go
 import pandas as pd
-from HPAI_maps.State_Conversion import state_conversion
+from HPAI_maps.data_sources import CDC_FLOCKS_URL, USDA_MAMMALS_URL, DataSource, fetch_all, read_csv
+from HPAI_maps.detection_store import ingest, yearly_counts
+from HPAI_maps.map_cache import data_fingerprint, load_figure, map_artifact
+from HPAI_maps.State_Normalization import normalize_states
 
 
-def fetch_usda_data():
-    """Fetches and processes HPAI cases in wild mammals from USDA APHIS."""
-    url = "https://www.aphis.usda.gov/sites/default/files/hpai-mammals.csv"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = pd.read_csv(StringIO(response.text))
+# Files behind the animal map, keyed by the name generate_animal_map expects
+ANIMAL_SOURCES = (DataSource("wild_mammals", USDA_MAMMALS_URL), DataSource("livestock", CDC_FLOCKS_URL))
+
+
+def count_wild_mammals(data):
+    """Counts HPAI cases in wild mammals per state and year from the USDA APHIS table."""
     data['Year'] = pd.DatetimeIndex(data['Date Detected']).year
-    data['Abbreviation'] = data['State'].apply(state_conversion)
+    data['Abbreviation'] = normalize_states(data['State'])
     return data.groupby(['Abbreviation', 'Year']).size().reset_index(name='State_Count')
 
 
-def fetch_cdc_livestock_data():
-    """Fetches and processes HPAI cases in avian livestock from the CDC website."""
-    url = "https://www.cdc.gov/bird-flu/modules/situation-summary/commercial-backyard-flocks.csv"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = pd.read_csv(StringIO(response.text))
+def count_livestock(data):
+    """Counts HPAI cases in avian livestock per state and year from the CDC table."""
     data['Year'] = pd.to_datetime(data['Outbreak Date'], format='mixed').dt.year #different date format than aphis website
-    data['Abbreviation'] = data['State'].apply(state_conversion)
+    data['Abbreviation'] = normalize_states(data['State'])
     return data.groupby(['Abbreviation', 'Year']).size().reset_index(name='Livestock_Count')
 
 
-def generate_animal_map():
-    """Generates a choropleth map displaying HPAI cases in both wild mammals and livestock."""
-    wild_mammal_data = fetch_usda_data()
-    livestock_data = fetch_cdc_livestock_data()
+def fetch_usda_data():
+    """Fetches and processes HPAI cases in wild mammals from USDA APHIS."""
+    return count_wild_mammals(read_csv(USDA_MAMMALS_URL))
 
+
+def fetch_cdc_livestock_data():
+    """Fetches and processes HPAI cases in avian livestock from the CDC website."""
+    return count_livestock(read_csv(CDC_FLOCKS_URL))
+
+
+def build_animal_map(wild_mammal_data, livestock_data):
+    """Draws the choropleth map from the per state and year counts of wild mammals and livestock."""
     # Merge both datasets
     merged_data = pd.merge(wild_mammal_data, livestock_data, on=['Abbreviation', 'Year'], how='outer').fillna(0)
 
@@ -75,14 +84,20 @@ def generate_animal_map():
             visible=False
         ))
 
+    # Traces alternate wild mammals / livestock per year, so each button shows trace 2 * j or 2 * j + 1 only
+    def visible(trace):
+        flags = [False] * (2 * len(years))
+        flags[trace] = True
+        return flags
+
     dropdown_buttons = [
                            dict(label=f"Wild Mammals {year}", method="update",
-                                args=[{"visible": [(i % 2 == 0) and (i // 2 == j) for i in range(2 * len(years))]},
+                                args=[{"visible": visible(2 * j)},
                                       {"title": f"HPAI Cases in Wild Mammals - {year}"}])
                            for j, year in enumerate(years)
                        ] + [
                            dict(label=f"Livestock {year}", method="update",
-                                args=[{"visible": [(i % 2 == 1) and (i // 2 == j) for i in range(2 * len(years))]},
+                                args=[{"visible": visible(2 * j + 1)},
                                       {"title": f"HPAI Cases in Avian Livestock - {year}"}])
                            for j, year in enumerate(years)
                        ]
@@ -103,3 +118,32 @@ def generate_animal_map():
     )
 
     return fig
+
+
+def animal_map_artifact(frames=None):
+    """
+    Updates the detection store and returns the stored animal map, building it only if the counts changed.
+
+    Args:
+    - frames (dict): "wild_mammals" and "livestock" DataFrames already fetched, e.g. by fetch_all together with
+      other sources; both are downloaded at the same time if None
+
+    Returns:
+    - MapArtifact with the paths of the figure JSON and standalone HTML
+    """
+    if frames is None:
+        frames = fetch_all(ANIMAL_SOURCES)
+
+    # Add the detections that are new since the last map, then read the stored counts
+    ingest(frames["wild_mammals"], "wild_mammals", "Date Detected", identity_columns=("County", "Species"))
+    ingest(frames["livestock"], "livestock", "Outbreak Date", identity_columns=("County", "Flock Type"))
+    wild_mammal_data = yearly_counts("wild_mammals", "State_Count")
+    livestock_data = yearly_counts("livestock", "Livestock_Count")
+
+    return map_artifact("animal_map", data_fingerprint(wild_mammal_data, livestock_data),
+                        lambda: build_animal_map(wild_mammal_data, livestock_data))
+
+
+def generate_animal_map(frames=None):
+    """Generates a choropleth map displaying HPAI cases in both wild mammals and livestock."""
+    return load_figure(animal_map_artifact(frames))
@@ -4,40 +4,26 @@
 File name: HPAI_Human_map.py
 Author: Sarah Schoem
 Created: 2/13/25
-Edited: 3/9/2025
-Version: 3.1
+Edited: 10/17/2026
+Version: 3.2
 Description:
     This script displays a choropleth map of the United States containing highly pathogenic avian influenza (HPAI)
     human cases obtained from the CDC website displaying cases since 2024.
+
+    The case table is read from the newest snapshot saved by scrape_CDC_data.
 """
 
 import pandas as pd
 import plotly.graph_objects as go
-import os
-from HPAI_maps.State_Conversion import state_conversion
-from HPAI_maps.scrape_CDC import scrape_CDC_data
-
+from HPAI_maps.State_Normalization import normalize_states
+from HPAI_maps.scrape_CDC import latest_snapshot, scrape_CDC_data
 
-def get_most_recent_csv(download_path):
-    """
-    Finds the most recent CSV file in the download directory.
-    Assumes the filename starts with 'data-table_' and ends with '.csv'.
-    """
-    csv_files = [f for f in os.listdir(download_path) if f.startswith("data-table_") and f.endswith(".csv")]
-
-    if not csv_files:
-        return None
 
-    # Get the most recent file by comparing modification times
-    most_recent_file = max(csv_files, key=lambda f: os.path.getmtime(os.path.join(download_path, f)))
-    return os.path.join(download_path, most_recent_file)
-
-
-def generate_human_map():
-    """Generates a choropleth map for human H5 cases from CDC data."""
+def generate_human_map(csv_file_path=None):
+    """Generates a choropleth map for human H5 cases from CDC data (the newest snapshot if no file is given)."""
     # Fetch the most recent data
-    download_path = os.path.expanduser('~') + "/Downloads/"
-    csv_file_path = get_most_recent_csv(download_path)
+    if csv_file_path is None:
+        csv_file_path = latest_snapshot()
 
     if csv_file_path is None:
         print("No CSV files found.")
@@ -48,10 +34,9 @@ def generate_human_map():
     # Read the downloaded CSV file into a pandas DataFrame
     CDC_data = pd.read_csv(csv_file_path)
 
-    # Clean and preprocess the data
-    CDC_data['State'] = CDC_data['State'].apply(lambda x: str(x).strip())
-    CDC_data['State'] = CDC_data['State'].apply(
-        lambda x: state_conversion(x).upper() if state_conversion(x) is not None else x)
+    # Clean and preprocess the data, keeping names that are not states as they are
+    states = CDC_data['State'].astype(str).str.strip()
+    CDC_data['State'] = normalize_states(states).fillna(states)
 
     # Aggregate case counts per state
     CDC_data['Cases'] = pd.to_numeric(CDC_data['State Total'], errors='coerce').fillna(0)
@@ -77,6 +62,7 @@ def generate_human_map():
 
 
 if __name__ == "__main__":
+    scrape_CDC_data()
     human_map = generate_human_map()
     if human_map:
         human_map.show()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+File name: State_Normalization.py
+Author: Debra Pacheco
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script converts whole columns of US state names to upper case state abbreviations at once, instead of
+    calling state_conversion on every row.
+
+    A reverse lookup from every accepted spelling to its abbreviation is built once. A column is factorized
+    (or its categories are used directly if it is categorical), only the distinct values are looked up, and
+    the result is spread back to all rows with one NumPy take. A feed with millions of rows but a few hundred
+    distinct values costs little more than the factorization.
+
+    Accepted values, in any case and with any extra whitespace or periods:
+        - state names ("Ohio", "NEW  YORK") and abbreviations ("oh")
+        - DC and the territories: "District of Columbia", "Washington D.C.", "Puerto Rico", "Guam",
+          "U.S. Virgin Islands", "American Samoa", "Northern Mariana Islands"
+        - state FIPS codes (39, "06") and county FIPS codes (39049, "06001"), as numbers or text
+    Anything else becomes None.
+
+License: MIT License
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from HPAI_maps.State_Conversion import state_abbreviation
+
+# DC and the territories, which are not in state_abbreviation
+territory_abbreviation = {
+    "DC": "District of Columbia",
+    "PR": "Puerto Rico",
+    "GU": "Guam",
+    "VI": "U.S. Virgin Islands",
+    "AS": "American Samoa",
+    "MP": "Northern Mariana Islands",
+}
+
+# Other names seen in the feeds
+alternate_names = {
+    "DC": ["Washington DC", "Washington D.C.", "D.C."],
+    "VI": ["Virgin Islands", "US Virgin Islands", "United States Virgin Islands"],
+    "MP": ["Northern Mariana Island", "Commonwealth of the Northern Mariana Islands"],
+}
+
+# Two digit FIPS code of every state, DC and territory
+state_fips = {
+    "AL": 1, "AK": 2, "AZ": 4, "AR": 5, "CA": 6, "CO": 8, "CT": 9, "DE": 10, "DC": 11, "FL": 12, "GA": 13,
+    "HI": 15, "ID": 16, "IL": 17, "IN": 18, "IA": 19, "KS": 20, "KY": 21, "LA": 22, "ME": 23, "MD": 24,
+    "MA": 25, "MI": 26, "MN": 27, "MS": 28, "MO": 29, "MT": 30, "NE": 31, "NV": 32, "NH": 33, "NJ": 34,
+    "NM": 35, "NY": 36, "NC": 37, "ND": 38, "OH": 39, "OK": 40, "OR": 41, "PA": 42, "RI": 44, "SC": 45,
+    "SD": 46, "TN": 47, "TX": 48, "UT": 49, "VT": 50, "VA": 51, "WA": 53, "WV": 54, "WI": 55, "WY": 56,
+    "AS": 60, "GU": 66, "MP": 69, "PR": 72, "VI": 78,
+}
+
+_SEPARATORS = re.compile(r"[\s.]+")
+_FIPS = re.compile(r"\d{1,5}(\.0+)?")
+
+
+def _key(value):
+    """ Lookup key of a text value: lower case, without periods, single spaces. """
+    return _SEPARATORS.sub(" ", str(value)).strip().casefold()
+
+
+def _build_lookup():
+    lookup = {}
+    for names in (state_abbreviation, territory_abbreviation):
+        for abbreviation, name in names.items():
+            lookup[_key(name)] = abbreviation
+            lookup[_key(abbreviation)] = abbreviation
+    for abbreviation, names in alternate_names.items():
+        for name in names:
+            lookup[_key(name)] = abbreviation
+    return lookup
+
+
+_lookup = _build_lookup()
+_fips_lookup = {code: abbreviation for abbreviation, code in state_fips.items()}
+
+
+def normalize_state(value):
+    """
+    Converts one state name, abbreviation or FIPS code to the upper case state abbreviation.
+
+    Args:
+    - value (str or int): State in any of the accepted forms
+
+    Returns:
+    - Abbreviation string, or None if the value is not recognized
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (int, np.integer, float, np.floating)):
+        value = f"{value:.0f}" if float(value).is_integer() else str(value)
+
+    text = str(value).strip()
+    abbreviation = _lookup.get(_key(text))
+    if abbreviation is None and _FIPS.fullmatch(text):
+        digits = text.split(".")[0]
+        # One or two digits are a state code, four or five a county code led by the state code
+        if len(digits) <= 2:
+            abbreviation = _fips_lookup.get(int(digits))
+        elif len(digits) >= 4:
+            abbreviation = _fips_lookup.get(int(digits[:-3]))
+    return abbreviation
+
+
+def normalize_states(values):
+    """
+    Converts a column of state names, abbreviations or FIPS codes to upper case state abbreviations.
+
+    Args:
+    - values (Series, array or list): States in any of the accepted forms
+
+    Returns:
+    - Series of abbreviations (None where not recognized) with the index of values if it was a Series
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+
+    # Look up each distinct value once; the extra last entry is for missing values, whose code is -1
+    converted = np.array([normalize_state(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(converted[codes], index=series.index, name=series.name, dtype=object)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""
+File name: data_sources.py
+Author: Sarah Schoem
+Created: 10/17/26
+Version: 1.0
+Description:
+    Shared download layer for the USDA and CDC surveillance files behind the maps. Every download is kept in an
+    on-disk cache, so choosing a map again does not fetch the whole CSV again:
+
+        - A copy younger than the TTL (one hour by default) is used without contacting the server.
+        - An older copy is revalidated with its ETag / Last-Modified headers (If-None-Match /
+          If-Modified-Since); a 304 answer keeps the copy and only resets its age.
+        - If the server cannot be reached or answers with an error, the cached copy is used and a message is
+          printed, so the maps still work offline. Without a cached copy the error is raised as before.
+
+    Requests go through a pooled requests.Session so connections to the same host are reused. A Session is not
+    guaranteed to be thread-safe, so every thread gets its own. Bodies are decoded as UTF-8 unless the server
+    names another charset (requests would otherwise read text/csv as ISO-8859-1). Any URL can be passed, so the
+    functions also work against a local test server.
+
+    fetch_all downloads and parses several sources at the same time in a thread pool, so building a map takes
+    as long as the slowest source rather than the sum of all of them. Each DataSource has its own timeout and
+    number of retries. Attempts that fail in a way that may pass (no connection, a timeout, a 5xx or 429 answer)
+    are retried after 1, 2, 4, ... seconds before falling back to the cache; other errors such as a 404 fall
+    back at once.
+
+License: MIT License
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Detections of HPAI in captive and wild mammals, USDA APHIS
+USDA_MAMMALS_URL = "https://www.aphis.usda.gov/sites/default/files/hpai-mammals.csv"
+
+# Confirmed HPAI in commercial and backyard flocks, CDC
+CDC_FLOCKS_URL = "https://www.cdc.gov/bird-flu/modules/situation-summary/commercial-backyard-flocks.csv"
+
+# CDC situation summary page with the human case tables
+CDC_SITUATION_URL = "https://www.cdc.gov/bird-flu/situation-summary/index.html"
+
+# Default directory for downloaded files
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache")
+
+# Seconds a download is used without asking the server whether it changed
+DEFAULT_TTL = 3600
+
+# Seconds to wait for the server
+DEFAULT_TIMEOUT = 30
+
+# Seconds before the first retry of a failed download; doubled for every further retry
+RETRY_DELAY = 1.0
+
+_sessions = threading.local()
+
+
+def get_session():
+    """ Returns the requests.Session of the calling thread, creating it on first use. """
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions.session = session
+    return session
+
+
+def _decode(response):
+    """ Returns the body as text in the charset the server names, or as UTF-8 if it names none. """
+    if "charset=" in response.headers.get("Content-Type", "").lower():
+        return response.text
+    return response.content.decode("utf-8-sig", errors="replace")
+
+
+def _cache_paths(url, cache_dir):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, key + ".body"), os.path.join(cache_dir, key + ".json")
+
+
+def _read_cached(url, cache_dir):
+    """ Returns (metadata, text) of the cached copy of url, or (None, None). """
+    body_path, meta_path = _cache_paths(url, cache_dir)
+    try:
+        with open(meta_path) as handle:
+            meta = json.load(handle)
+        with open(body_path, encoding="utf-8") as handle:
+            return meta, handle.read()
+    except (OSError, ValueError):
+        return None, None
+
+
+def _write_atomic(path, text):
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8", newline="") as handle:
+        handle.write(text)
+    os.replace(temporary, path)
+
+
+def _is_transient(error):
+    """ Returns True for download errors worth retrying: no connection, a timeout, or a 5xx or 429 answer. """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return (isinstance(error, requests.HTTPError) and response is not None
+            and (response.status_code >= 500 or response.status_code == 429))
+
+
+def _write_cached(url, cache_dir, meta, text=None):
+    """ Saves the metadata, and the body if given, of url. Failing to write only loses the cache. """
+    body_path, meta_path = _cache_paths(url, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if text is not None:
+            _write_atomic(body_path, text)
+        _write_atomic(meta_path, json.dumps(meta))
+    except OSError as error:
+        print(f"Warning: could not cache {url}: {error}")
+
+
+def fetch_text(url, ttl=DEFAULT_TTL, cache_dir=CACHE_DIR, timeout=DEFAULT_TIMEOUT, retries=0, session=None):
+    """
+    Downloads a text file through the cache.
+
+    Args:
+    - url (str): File to download
+    - ttl (float): Seconds a cached copy is used without revalidation; 0 always revalidates
+    - cache_dir (str): Cache directory
+    - timeout (float): Seconds to wait for the server
+    - retries (int): Extra attempts after a failed download; only connection errors, timeouts and 5xx or 429
+      answers are retried
+    - session (requests.Session): Session to use, the calling thread's own one if None
+
+    Returns:
+    - Text of the file
+
+    Raises:
+    - requests.RequestException if every attempt fails and nothing is cached
+    """
+    meta, text = _read_cached(url, cache_dir)
+    now = time.time()
+    if meta is not None and now - meta.get("checked", 0) < ttl:
+        return text
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    for attempt in range(retries + 1):
+        try:
+            response = (session or get_session()).get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and meta is not None:
+                meta["checked"] = now
+                _write_cached(url, cache_dir, meta)
+                return text
+            response.raise_for_status()
+            break
+        except requests.RequestException as error:
+            if attempt < retries and _is_transient(error):
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+                continue
+            if meta is None:
+                raise
+            fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta.get("fetched", 0)))
+            print(f"Could not download {url} ({error}); using the copy from {fetched}.")
+            return text
+
+    text = _decode(response)
+    meta = {"url": url, "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+            "fetched": now, "checked": now}
+    _write_cached(url, cache_dir, meta, text)
+    return text
+
+
+def _parse_csv(text):
+    return pd.read_csv(StringIO(text))
+
+
+def read_csv(url, **kwargs):
+    """ Downloads a CSV file through the cache (keyword arguments as for fetch_text) and returns a DataFrame. """
+    return _parse_csv(fetch_text(url, **kwargs))
+
+
+# A file to download: name is the key of its result in fetch_all, parse turns the text into a DataFrame
+DataSource = namedtuple("DataSource", ["name", "url", "parse", "timeout", "retries"],
+                        defaults=[_parse_csv, DEFAULT_TIMEOUT, 2])
+
+
+def fetch_source(source, ttl=DEFAULT_TTL, cache_dir=CACHE_DIR, session=None):
+    """ Downloads one DataSource through the cache and returns its parsed result. """
+    text = fetch_text(source.url, ttl=ttl, cache_dir=cache_dir, timeout=source.timeout, retries=source.retries,
+                      session=session)
+    return source.parse(text)
+
+
+def fetch_all(sources, ttl=DEFAULT_TTL, cache_dir=CACHE_DIR, raise_errors=True, session=None):
+    """
+    Downloads and parses several sources at the same time.
+
+    Args:
+    - sources (list of DataSource): Sources to fetch
+    - ttl (float): Seconds a cached copy is used without revalidation
+    - cache_dir (str): Cache directory
+    - raise_errors (bool): Raise the first error once every source is done; if False, print it and return None
+      for that source
+    - session (requests.Session): Session used by every worker thread, which the caller must make safe to
+      share; if None each worker uses its own
+
+    Returns:
+    - Dictionary of source name to parsed result
+    """
+    if not sources:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        futures = {source.name: pool.submit(fetch_source, source, ttl, cache_dir, session) for source in sources}
+
+    results = {}
+    errors = []
+    for name, future in futures.items():
+        error = future.exception()
+        if error is None:
+            results[name] = future.result()
+            continue
+        errors.append(error)
+        results[name] = None
+        print(f"Could not get {name}: {error}")
+
+    if errors and raise_errors:
+        raise errors[0]
+    return results
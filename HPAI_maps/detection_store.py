@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+"""
+File name: detection_store.py
+Author: Sarah Schoem
+Created: 10/17/26
+Version: 1.0
+Description:
+    Append-only SQLite store of HPAI detection records with per (category, state, year, month) counts, so a map
+    refresh only processes the detections that are new since the last one instead of the whole history.
+
+    Every row of a downloaded table gets a fingerprint: a hash of its normalized identity columns plus its
+    occurrence number among rows with the same identity, so two detections in one state on the same day are
+    still counted twice. The identity is the state abbreviation, the date as YYYY-MM-DD and any other columns
+    the caller names, such as the species, in lower case with single spaces. A feed that changes how it writes
+    dates or state names therefore keeps its fingerprints, and other columns are not part of them at all, so a
+    revised case count or note does not make a detection new. On ingest the rows whose fingerprints are already
+    stored are dropped, and the counts of the remaining rows are added to the aggregate table. Readers such as
+    generate_animal_map then read a few hundred aggregate rows.
+
+    The column set and identity columns of each category are stored as well. When a feed adds, drops or renames
+    a column, the category is rebuilt from the current feed, since the stored fingerprints may no longer match.
+
+    Stored detections that are no longer in the feed are reported on every ingest. They stay counted unless
+    ingest is called with drop_withdrawn=True, which removes them and their counts. Use rebuild=True, or delete
+    the database file, to start over from the current feed.
+
+License: MIT License
+"""
+
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from HPAI_maps.data_sources import CACHE_DIR
+from HPAI_maps.State_Normalization import normalize_states
+
+# Default database file
+DB_PATH = os.path.join(CACHE_DIR, "detections.sqlite")
+
+# Changed whenever fingerprints are computed differently, so stores written by older code are rebuilt
+FINGERPRINT_VERSION = 2
+
+_SPACES = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    category TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state TEXT,
+    year INTEGER,
+    month INTEGER,
+    record TEXT NOT NULL,
+    PRIMARY KEY (category, fingerprint)
+);
+CREATE TABLE IF NOT EXISTS counts (
+    category TEXT NOT NULL,
+    state TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (category, state, year, month)
+);
+CREATE TABLE IF NOT EXISTS schemas (
+    category TEXT PRIMARY KEY,
+    schema TEXT NOT NULL
+);
+"""
+
+
+def connect(db_path=DB_PATH):
+    """ Opens the store, creating the database and its tables if needed. """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def fingerprints(data, columns=None):
+    """
+    Returns a fingerprint string for every row of data, unique even for rows with the same values.
+
+    Args:
+    - data (DataFrame): Downloaded table
+    - columns (list of str): Identity columns hashed for the fingerprint, all columns if None
+    """
+    identity = data if columns is None else data[list(columns)]
+    hashes = pd.util.hash_pandas_object(identity.astype(str), index=False).map("{:016x}".format)
+    occurrence = hashes.groupby(hashes).cumcount()
+    return hashes + "-" + occurrence.astype(str)
+
+
+def identity_table(data, state_column, date_column, other_columns=(), date_format="mixed"):
+    """
+    Returns the normalized identity columns of a downloaded table, the input of fingerprints.
+
+    States become abbreviations and dates YYYY-MM-DD; a value that cannot be converted is kept as written.
+    Other columns are put in lower case with single spaces.
+    """
+    states = normalize_states(data[state_column])
+    dates = pd.to_datetime(data[date_column], format=date_format, errors="coerce")
+    identity = pd.DataFrame({
+        "state": states.where(states.notna(), data[state_column].astype(str)).values,
+        "date": dates.dt.strftime("%Y-%m-%d").where(dates.notna(), data[date_column].astype(str)).values,
+    })
+    for number, column in enumerate(other_columns):
+        identity[f"other{number}"] = data[column].astype(str).str.replace(_SPACES, " ", regex=True) \
+            .str.strip().str.casefold().values
+    return identity, states, dates
+
+
+def _schema(data, identity):
+    return json.dumps({"columns": sorted(map(str, data.columns)), "identity": identity,
+                       "fingerprint": FINGERPRINT_VERSION})
+
+
+def ingest(data, category, date_column, state_column="State", date_format="mixed", db_path=DB_PATH,
+           rebuild=False, identity_columns=(), drop_withdrawn=False):
+    """
+    Adds the new rows of a downloaded table to the store and updates the counts.
+
+    Args:
+    - data (DataFrame): Downloaded table, one detection per row
+    - category (str): Name of the table, e.g. "wild_mammals"
+    - date_column (str): Column with the detection date
+    - state_column (str): Column with the full state name
+    - date_format (str): Format passed to pd.to_datetime; "mixed" parses each date on its own
+    - db_path (str): Database file
+    - rebuild (bool): Remove the stored rows and counts of the category first; done anyway when the columns
+      of the table or the identity columns differ from the last ingest
+    - identity_columns (sequence of str): Columns that tell detections apart besides the state and date, e.g.
+      the species; those missing from data are ignored
+    - drop_withdrawn (bool): Remove stored detections that are no longer in the feed, and their counts,
+      instead of only reporting them
+
+    Returns:
+    - Number of rows added
+    """
+    others = [column for column in identity_columns
+              if column in data.columns and column not in (state_column, date_column)]
+    schema = _schema(data, [state_column, date_column] + others)
+    identity, states, dates = identity_table(data, state_column, date_column, others, date_format)
+    prints = fingerprints(identity)
+
+    with closing(connect(db_path)) as connection, connection:
+        stored = connection.execute("SELECT schema FROM schemas WHERE category = ?", (category,)).fetchone()
+        if rebuild or stored is None or stored[0] != schema:
+            connection.execute("DELETE FROM detections WHERE category = ?", (category,))
+            connection.execute("DELETE FROM counts WHERE category = ?", (category,))
+            connection.execute("INSERT OR REPLACE INTO schemas (category, schema) VALUES (?, ?)", (category, schema))
+
+        known = {row[0] for row in connection.execute("SELECT fingerprint FROM detections WHERE category = ?",
+                                                      (category,))}
+
+        # The whole feed is downloaded every time, so anything stored but not in it was withdrawn at the source
+        withdrawn = known - set(prints)
+        if withdrawn and drop_withdrawn:
+            _remove(connection, category, withdrawn)
+            print(f"Removed {len(withdrawn)} {category} detection(s) that are no longer in the feed.")
+        elif withdrawn:
+            print(f"Warning: {len(withdrawn)} stored {category} detection(s) are no longer in the feed and are "
+                  "still counted; ingest with drop_withdrawn=True to remove them.")
+
+        is_new = ~prints.isin(list(known)).values
+        if not is_new.any():
+            return 0
+
+        new = data[is_new]
+        rows = pd.DataFrame({"fingerprint": prints[is_new].values,
+                             "state": states[is_new].values,
+                             "year": dates[is_new].dt.year.values,
+                             "month": dates[is_new].dt.month.values,
+                             "record": [json.dumps(record) for record in new.astype(str).to_dict("records")]})
+
+        connection.executemany(
+            "INSERT INTO detections (category, fingerprint, state, year, month, record) VALUES (?, ?, ?, ?, ?, ?)",
+            ((category, fingerprint, state, None if pd.isna(year) else int(year),
+              None if pd.isna(month) else int(month), record)
+             for fingerprint, state, year, month, record in rows.itertuples(index=False)))
+
+        # Rows without a state or date are stored but, as in a groupby, not counted
+        added = rows.groupby(["state", "year", "month"]).size()
+        connection.executemany(
+            "INSERT INTO counts (category, state, year, month, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (category, state, year, month) DO UPDATE SET count = count + excluded.count",
+            ((category, state, int(year), int(month), int(count)) for (state, year, month), count in added.items()))
+        return len(rows)
+
+
+def _remove(connection, category, prints):
+    """ Deletes the given detections of a category and takes them off the counts. """
+    removed = pd.DataFrame(
+        [row for chunk in _chunks(sorted(prints), 500)
+         for row in connection.execute("SELECT fingerprint, state, year, month FROM detections WHERE category = ? "
+                                       f"AND fingerprint IN ({', '.join('?' * len(chunk))})", (category, *chunk))],
+        columns=["fingerprint", "state", "year", "month"])
+    connection.executemany("DELETE FROM detections WHERE category = ? AND fingerprint = ?",
+                           ((category, fingerprint) for fingerprint in removed["fingerprint"]))
+
+    taken = removed.dropna(subset=["state", "year", "month"]).groupby(["state", "year", "month"]).size()
+    connection.executemany(
+        "UPDATE counts SET count = count - ? WHERE category = ? AND state = ? AND year = ? AND month = ?",
+        ((int(count), category, state, int(year), int(month)) for (state, year, month), count in taken.items()))
+    connection.execute("DELETE FROM counts WHERE category = ? AND count <= 0", (category,))
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def monthly_counts(category, db_path=DB_PATH):
+    """ Returns the counts of a category as a DataFrame with columns Abbreviation, Year, Month and Count. """
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query("SELECT state AS Abbreviation, year AS Year, month AS Month, count AS Count "
+                                 "FROM counts WHERE category = ? ORDER BY state, year, month",
+                                 connection, params=(category,))
+
+
+def yearly_counts(category, name="Count", db_path=DB_PATH):
+    """ Returns the counts of a category per state and year, in a column called name. """
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query(f'SELECT state AS Abbreviation, year AS Year, SUM(count) AS "{name}" '
+                                 "FROM counts WHERE category = ? GROUP BY state, year ORDER BY state, year",
+                                 connection, params=(category,))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+File name: map_cache.py
+Author: Sarah Schoem
+Created: 10/17/26
+Version: 1.0
+Description:
+    Cache of finished map figures, so a map whose data has not changed is not built again. A map is stored
+    twice in data_cache/maps: as Plotly figure JSON, which plotly.io can load back into a figure, and as a
+    standalone HTML page with plotly.js included, which opens in a browser without Python or a network.
+
+    Files are named after the map and the fingerprint of the aggregated tables it is drawn from (a SHA-256 of
+    their CSV text and MAP_VERSION). When the aggregates change, the fingerprint changes, the map is built
+    again and the files of older fingerprints are removed.
+
+License: MIT License
+"""
+
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+import plotly.io as pio
+
+from HPAI_maps.data_sources import CACHE_DIR
+
+# Directory of the stored maps
+MAP_DIR = os.path.join(CACHE_DIR, "maps")
+
+# Changed whenever the way maps are drawn changes, so maps stored by older code are built again
+MAP_VERSION = "1"
+
+# Stored files of one map; figure is None when the map came from the cache and has not been loaded
+MapArtifact = namedtuple("MapArtifact", ["name", "fingerprint", "json_path", "html_path", "cached", "figure"])
+
+
+def data_fingerprint(*tables):
+    """ Returns the SHA-256 hex digest of the CSV text of the given DataFrames and MAP_VERSION. """
+    digest = hashlib.sha256(MAP_VERSION.encode("utf-8"))
+    for table in tables:
+        digest.update(table.to_csv(index=False).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _paths(name, fingerprint, map_dir):
+    base = os.path.join(map_dir, f"{name}_{fingerprint[:16]}")
+    return base + ".json", base + ".html"
+
+
+def _write_atomic(path, write):
+    temporary = path + ".tmp"
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def map_artifact(name, fingerprint, build, map_dir=MAP_DIR):
+    """
+    Returns the stored map for a fingerprint, building and storing it first if needed.
+
+    Args:
+    - name (str): Name of the map, e.g. "animal_map"
+    - fingerprint (str): data_fingerprint of the tables the map is drawn from
+    - build (callable): Returns the plotly Figure; only called when the map is not stored
+    - map_dir (str): Directory of the stored maps
+
+    Returns:
+    - MapArtifact
+    """
+    json_path, html_path = _paths(name, fingerprint, map_dir)
+    if os.path.exists(json_path) and os.path.exists(html_path):
+        return MapArtifact(name, fingerprint, json_path, html_path, True, None)
+
+    figure = build()
+    try:
+        os.makedirs(map_dir, exist_ok=True)
+        _write_atomic(json_path, lambda path: pio.write_json(figure, path))
+        _write_atomic(html_path, lambda path: figure.write_html(path, include_plotlyjs=True, full_html=True))
+    except OSError as error:
+        print(f"Warning: could not store the {name}: {error}")
+        return MapArtifact(name, fingerprint, None, None, False, figure)
+
+    # Only the newest version of each map is kept
+    stored = re.compile(re.escape(name) + r"_[0-9a-f]{16}\.(json|html)")
+    for file_name in os.listdir(map_dir):
+        path = os.path.join(map_dir, file_name)
+        if stored.fullmatch(file_name) and path not in (json_path, html_path):
+            os.remove(path)
+    return MapArtifact(name, fingerprint, json_path, html_path, False, figure)
+
+
+def load_figure(artifact):
+    """ Returns the plotly Figure of a MapArtifact, reading the stored JSON if it was not built just now. """
+    if artifact.figure is not None:
+        return artifact.figure
+    return pio.read_json(artifact.json_path)
@@ -4,91 +4,148 @@
 File name: scrape_CDC.py
 Author: Sarah Schoem
 Created: 2/13/25
-Edited: 3/9/2025
-Version: 3.0
+Edited: 10/17/2026
+Version: 4.0
 Description:
     This script obtains Human H5 Cases in the United States from the website: https://www.cdc.gov/bird-flu/situation-summary/index.html?cove-tab=0. This ensures the case data is updated in real-time.
+
+    The data is fetched without a browser. If a CSV endpoint for the case table is set (the url argument or the
+    CDC_HUMAN_CASES_URL environment variable), it and the situation summary page are downloaded at the same time
+    with fetch_all, and the CSV is used unless it fails; otherwise the table is read from the page alone, the
+    same way scrape_fluview_data does. Both downloads go through HPAI_maps.data_sources, so they are cached and
+    revalidated.
+
+    Every table that differs from the previous one is saved as a new snapshot,
+    data_cache/cdc_human_cases/data-table_<date>-<time>.csv, keeping the newest KEEP_SNAPSHOTS.
+    latest_snapshot returns the newest one for generate_human_map.
 """
 
-import time
+import hashlib
 import os
-import shutil
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-def get_next_filename(download_path, base_filename="data-table"):
+from datetime import datetime
+from io import StringIO
+
+import pandas as pd
+import requests
+
+from HPAI_maps.data_sources import CACHE_DIR, CDC_SITUATION_URL, DEFAULT_TTL, DataSource, fetch_all, fetch_source
+from HPAI_maps.scrape_fluview import FLUVIEW_SOURCE
+
+# Directory of the saved case tables
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "cdc_human_cases")
+
+# Environment variable holding the URL of the case table CSV
+URL_VARIABLE = "CDC_HUMAN_CASES_URL"
+
+# Number of snapshots kept
+KEEP_SNAPSHOTS = 30
+
+# Columns generate_human_map needs
+REQUIRED_COLUMNS = ("State", "State Total")
+
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Returns the paths of the saved snapshots, oldest first (the names sort by date)."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    names = sorted(f for f in os.listdir(snapshot_dir) if f.startswith("data-table_") and f.endswith(".csv"))
+    return [os.path.join(snapshot_dir, name) for name in names]
+
+
+def latest_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Returns the path of the newest snapshot, or None if there is none."""
+    snapshots = list_snapshots(snapshot_dir)
+    return snapshots[-1] if snapshots else None
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(data, snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """
+    Saves a case table unless it equals the newest snapshot.
+
+    Returns:
+    - Path of the new snapshot, or of the newest one if nothing changed
     """
-    Generate the next available filename by appending a number at the end.
-    E.g., data-table_1.csv, data-table_2.csv, etc.
+    text = data.to_csv(index=False)
+    latest = latest_snapshot(snapshot_dir)
+    if latest is not None:
+        with open(latest, encoding="utf-8") as handle:
+            if _digest(handle.read()) == _digest(text):
+                return latest
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"data-table_{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.csv")
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8", newline="") as handle:
+        handle.write(text)
+    os.replace(temporary, path)
+
+    for old in list_snapshots(snapshot_dir)[:-keep] if keep else []:
+        os.remove(old)
+    return path
+
+
+def _parse_csv_table(text):
+    data = pd.read_csv(StringIO(text))
+    missing = [column for column in REQUIRED_COLUMNS if column not in data.columns]
+    if missing:
+        raise ValueError(f"the case table CSV has no {', '.join(missing)} column")
+    return data
+
+
+def fetch_human_cases(url=None, page_url=CDC_SITUATION_URL, ttl=DEFAULT_TTL, cache_dir=CACHE_DIR):
     """
-    counter = 1
-    while os.path.exists(os.path.join(download_path, f"{base_filename}_{counter}.csv")):
-        counter += 1
-    return os.path.join(download_path, f"{base_filename}_{counter}.csv")
+    Downloads the table of human H5 cases by state.
 
-def scrape_CDC_data():
-    # Set up Selenium WebDriver using webdriver-manager to automatically manage the driver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service)
+    Args:
+    - url (str): CSV endpoint of the case table; the CDC_HUMAN_CASES_URL environment variable if None, and
+      the situation summary page if neither is set or the CSV cannot be used
+    - page_url (str): Situation summary page
+    - ttl (float): Seconds a cached download is used without revalidation
+    - cache_dir (str): Cache directory of the downloads
 
-    # Open the target webpage
-    driver.get("https://www.cdc.gov/bird-flu/situation-summary/index.html?cove-tab=0")
+    Returns:
+    - DataFrame with a State and a State Total column, or None if no table was found
+    """
+    page = FLUVIEW_SOURCE._replace(url=page_url)
+    url = url or os.environ.get(URL_VARIABLE)
+    if not url:
+        return fetch_source(page, ttl, cache_dir)
+
+    # Both are fetched at once, so falling back to the page costs no extra wait
+    results = fetch_all([DataSource("csv", url, parse=_parse_csv_table), page], ttl, cache_dir, raise_errors=False)
+    if results["csv"] is not None:
+        return results["csv"]
+    print("Reading the table from the situation summary page instead.")
+    return results[page.name]
 
-    # Wait for the page to load
-    time.sleep(5)
 
-    # Use WebDriverWait to wait for the CSV link/button to be clickable
+def scrape_CDC_data(url=None, snapshot_dir=SNAPSHOT_DIR, page_url=CDC_SITUATION_URL, cache_dir=CACHE_DIR):
+    """
+    Fetches the human case table and saves it as a snapshot.
+
+    Returns:
+    - Path of the newest snapshot, or None if no table could be fetched and there is no earlier snapshot
+    """
     try:
-        # Wait until the element is present and clickable
-        csv_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), 'CSV')]"))
-        )
-
-        # Scroll the element into view
-        ActionChains(driver).move_to_element(csv_button).perform()
-
-        # Click the button to download the CSV
-        csv_button.click()
-        print("CSV file download initiated.")
-
-    except Exception as e:
-        print(f"Error: {e}. CSV link or button not found or not clickable.")
-
-    # Wait a few seconds to ensure the download starts
-    time.sleep(5)
-
-    # Define the download path (ensure this is where Chrome saves files)
-    download_path = os.path.expanduser('~') + "/Downloads/"
-    downloaded_file = download_path + "data-table.csv"
-
-    # Generate the next available file name
-    final_file = get_next_filename(download_path)
-
-    # Check if the file is fully downloaded and move it to the desired location
-    retries = 10  # Retry 10 times to check if the file exists and is accessible
-    for _ in range(retries):
-        if os.path.exists(downloaded_file):
-            # Check if the file is still being downloaded (by checking its size)
-            if os.path.getsize(downloaded_file) > 0:  # If the file size is greater than 0
-                # If the file exists and has data, move it to the final location
-                shutil.move(downloaded_file, final_file)
-                print(f"CSV file moved to: {final_file}")
-                driver.quit()
-                return final_file  # Return the path to the CSV file
-            else:
-                print("File is being downloaded, retrying...")
-                time.sleep(1)
-        else:
-            print("File not found, retrying...")
-            time.sleep(1)
-
-    print("Failed to download CSV or file is incomplete.")
-    driver.quit()
-    return None
-
-# Example usage: scrape_CDC_data()
+        data = fetch_human_cases(url, page_url, cache_dir=cache_dir)
+    except requests.RequestException as e:
+        print(f"Error: {e}. Could not download the CDC case table.")
+        data = None
+
+    if data is None:
+        latest = latest_snapshot(snapshot_dir)
+        if latest is not None:
+            print(f"Using the previous snapshot: {latest}")
+        return latest
+
+    path = save_snapshot(data, snapshot_dir)
+    print(f"Newest CDC case table: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    scrape_CDC_data()
@@ -4,26 +4,26 @@
 File name: scrape_fluview.py
 Author: Sarah Schoem
 Created: 2/13/25
-Version: 2.0
+Version: 2.1
 Description:
     This script displays a choropleth map of the United States containing highly pathogenic avian influenza (HPAI)
     human cases obtained from the CDC website displaying cases since 2024.
 
+    The page is downloaded through HPAI_maps.data_sources. FLUVIEW_SOURCE lets fetch_all get it together with
+    the other surveillance files.
+
 License: MIT License
 """
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from io import StringIO
+from HPAI_maps.data_sources import CDC_SITUATION_URL, DataSource, fetch_text
 
-def scrape_fluview_data():
-    # Fetch the webpage
-    url = 'https://www.cdc.gov/bird-flu/situation-summary/index.html'
-    response = requests.get(url)
 
+def parse_fluview_table(html):
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
 
     # Find the section related to "Exposure Source" and get the next table
     section = soup.find(string="Exposure Source")
@@ -47,3 +47,14 @@ def scrape_fluview_data():
     else:
         print("Couldn't find 'Exposure Source' section.")
         return None
+
+
+# Situation summary page as a source for fetch_all
+FLUVIEW_SOURCE = DataSource("fluview", CDC_SITUATION_URL, parse=parse_fluview_table)
+
+
+def scrape_fluview_data(html=None):
+    # Fetch the webpage unless it was already fetched, e.g. by fetch_all
+    if html is None:
+        html = fetch_text(CDC_SITUATION_URL, retries=FLUVIEW_SOURCE.retries)
+    return parse_fluview_table(html)
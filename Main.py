@@ -2,7 +2,8 @@
 
 
 from HPAI_maps import HPAI_Animal_map
-from HPAI_maps.HPAI_Animal_map import generate_animal_map
+from HPAI_maps.HPAI_Animal_map import animal_map_artifact
+from HPAI_maps.map_cache import load_figure
 from HPAI_maps.scrape_CDC import scrape_CDC_data
 from HPAI_maps.scrape_fluview import scrape_fluview_data  # Import the scraping function
 from HPAI_maps.HPAI_Human_map import generate_human_map
@@ -11,6 +12,8 @@ from Protein_Analysis.seq_frequency import multiple_sequence_welcome
 import time
 import plotly.io as pio
 import os
+import webbrowser
+from pathlib import Path
 
 
 """
@@ -54,22 +57,24 @@ def main():
         choice = input("Enter your choice: ")
 
         if choice == "1":   # Avian Influenza in Mammals Map
-            fig = generate_animal_map()
-            print("Animal Map has been generated.\n")
-            fig.show()
+            artifact = animal_map_artifact()  # Reuses the stored map if the case counts have not changed
+            print("Animal Map has been " + ("loaded." if artifact.cached else "generated.") + "\n")
+            if artifact.html_path is not None:
+                webbrowser.open(Path(artifact.html_path).as_uri())  # Standalone page, no need to render again
+            else:
+                load_figure(artifact).show()
 
 
         elif choice == "2":  # Generate Human H5 Cases Map
-            print("Fetching CDC data..."
-                  "Please allow all pop-ups and do not close them out.\n")
+            print("Fetching CDC data...\n")
 
-            # Fetch CDC data (handles getting the most recent CSV)
+            # Fetch CDC data (saves a new snapshot if the table changed and returns the newest one)
             csv_file_path = scrape_CDC_data()
 
             if csv_file_path is None:
                 print("No human data retrieved.")
             else:
-                fig = generate_human_map()  # Generate map using the most recent data file
+                fig = generate_human_map(csv_file_path)  # Generate map using the most recent data file
 
                 # Check if the figure was successfully created
                 if fig is not None:
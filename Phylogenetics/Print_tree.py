@@ -1,47 +1,309 @@
 #!/usr/bin/env python3
 # File Name: Print_tree.py
-# Version 1.0
+# Version 2.0
 # Author: Sarah Schoem
 
 """
 File name: Print_tree.py
 Author: Sarah Schoem
 Created: 2/13/25
-Version: 1.0
+Version: 2.0
 Description:
     This script displays a phylogenetic tree of the H5 virus using the tree_analysis_output.txt file.
 
+    The window stays responsive for trees with thousands of tips:
+        - Text tab: the ASCII tree file is memory-mapped and only the lines in view are put in the text box.
+          Scrolling loads the next range, so the file is never read as a whole.
+        - Clades tab: the Newick tree (H5_tree_upgma.nwk next to this script by default, written by
+          build_tree.py) as an expandable list. It is parsed in a background thread, and the children of a
+          clade are only added when it is opened. If the file is missing, the tab says so.
+        - Find: jumps to an accession in both tabs, opening the clades above it. Pressing Find again goes to
+          the next match in the text.
+
 License: MIT License
 """
 
+import mmap
 import os
+import queue
+import sys
+import threading
 import tkinter as tk
-from tkinter import scrolledtext
+from tkinter import ttk
+
+import numpy as np
+from Bio import Phylo
+
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Phylogenetics.tree_index import TreeIndex
+
+# Newick tree shown in the Clades tab when no tree file is given
+TREE_FILE = "H5_tree_upgma.nwk"
+
+
+class LazyTextView(tk.Frame):
+    """ Read-only text view of a file that only holds the lines currently in view. """
+
+    def __init__(self, master, file_path, rows=30, width=150):
+        super().__init__(master)
+        self.rows = rows
+        self.top = 0
+
+        # Start offset of every line, found with NumPy on the mapped file instead of reading it line by line
+        self.file = open(file_path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        newlines = np.flatnonzero(np.frombuffer(self.data, dtype=np.uint8) == ord("\n")) if size else np.zeros(0, int)
+        self.starts = np.concatenate([[0], newlines + 1])
+        if len(self.starts) > 1 and self.starts[-1] == size:
+            self.starts = self.starts[:-1]  # No empty last line after a final newline
+        self.line_count = len(self.starts) if size else 0
+
+        self.text = tk.Text(self, wrap=tk.NONE, width=width, height=rows)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._scroll)
+        x_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.configure(xscrollcommand=x_scrollbar.set)
+        self.text.tag_configure("match", background="yellow")
+
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # The text box never holds more than a page, so scrolling is handled here rather than by the widget
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(sequence, self._wheel)
+        for key, lines in (("<Prior>", -rows), ("<Next>", rows), ("<Up>", -1), ("<Down>", 1)):
+            self.text.bind(key, lambda event, lines=lines: self.show(self.top + lines) or "break")
+        self.text.bind("<Home>", lambda event: self.show(0) or "break")
+        self.text.bind("<End>", lambda event: self.show(self.line_count) or "break")
+        self.text.bind("<Configure>", self._resize)
+
+        self.match_end = 0
+        self.show(0)
+
+    def _line_bytes(self, first, last):
+        if first >= last:
+            return b""
+        end = self.starts[last] if last < self.line_count else len(self.data)
+        return self.data[self.starts[first]:end]
+
+    def show(self, top, highlight=None):
+        """ Puts lines top .. top + rows in the text box, highlighting line `highlight` if given. """
+        self.top = max(0, min(int(top), max(0, self.line_count - self.rows)))
+        last = min(self.top + self.rows, self.line_count)
+
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", self._line_bytes(self.top, last).decode("utf-8", errors="replace"))
+        if highlight is not None and self.top <= highlight < last:
+            line = highlight - self.top + 1
+            self.text.tag_add("match", f"{line}.0", f"{line}.end")
+        self.text.configure(state=tk.DISABLED)
+
+        if self.line_count:
+            self.scrollbar.set(self.top / self.line_count, last / self.line_count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.show(float(amount) * self.line_count)
+        elif action == "scroll":
+            self.show(self.top + int(amount) * (self.rows if unit == "pages" else 1))
+
+    def _wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.show(self.top - 3)
+        else:
+            self.show(self.top + 3)
+        return "break"
+
+    def _resize(self, event):
+        rows = max(1, event.height // max(1, self.text.tk.call("font", "metrics", self.text.cget("font"),
+                                                                 "-linespace")))
+        if rows != self.rows:
+            self.rows = rows
+            self.show(self.top)
+
+    def find(self, query):
+        """ Shows the next line containing query, wrapping to the start of the file. Returns False if none. """
+        needle = query.encode("utf-8")
+        if not needle or not self.line_count:
+            return False
+        position = self.data.find(needle, self.match_end)
+        if position < 0:
+            position = self.data.find(needle, 0)
+        if position < 0:
+            return False
+
+        self.match_end = position + len(needle)
+        line = int(np.searchsorted(self.starts, position, side="right")) - 1
+        self.show(line - self.rows // 2, highlight=line)
+        return True
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
 
 
-def show_file_content(filename):
+class CladeBrowser(tk.Frame):
+    """ Expandable list of the clades of a Newick tree, filled in as clades are opened. """
+
+    PLACEHOLDER = "placeholder"
+
+    def __init__(self, master, tree_file):
+        super().__init__(master)
+        self.index = None
+        self.status = ttk.Label(self, text=f"Loading {os.path.basename(tree_file)} ...")
+        self.status.pack(anchor="w")
+
+        self.view = ttk.Treeview(self, columns=("tips", "length"), height=25)
+        self.view.heading("#0", text="Clade")
+        self.view.heading("tips", text="Tips")
+        self.view.heading("length", text="Branch length")
+        self.view.column("tips", width=80, anchor="e")
+        self.view.column("length", width=120, anchor="e")
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.view.yview)
+        self.view.configure(yscrollcommand=scrollbar.set)
+        self.view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.view.bind("<<TreeviewOpen>>", self._opened)
+
+        # Parse and index in a thread so the window opens at once; results come back through the queue
+        self.results = queue.Queue()
+        threading.Thread(target=self._load, args=(tree_file,), daemon=True).start()
+        self.after(100, self._poll)
+
+    def _load(self, tree_file):
+        try:
+            self.results.put(TreeIndex(Phylo.read(tree_file, "newick")))
+        except Exception as error:  # Shown in the window instead of lost in the thread
+            self.results.put(error)
+
+    def _poll(self):
+        try:
+            result = self.results.get_nowait()
+        except queue.Empty:
+            self.after(100, self._poll)
+            return
+
+        if isinstance(result, Exception):
+            self.status.configure(text=f"Could not read the tree: {result}")
+            return
+        self.index = result
+        self.status.configure(text=f"{self.index.clade_size(self.index.clades[0])} tips")
+        self._insert("", 0)
+
+    def _insert(self, parent, number):
+        clade = self.index.clades[number]
+        tips = self.index.clade_size(clade)
+        name = clade.name or f"Clade ({tips} tips)"
+        length = "" if clade.branch_length is None else f"{clade.branch_length:.6g}"
+        item = self.view.insert(parent, tk.END, iid=str(number), text=name, values=(tips, length))
+        if clade.clades:
+            self.view.insert(item, tk.END, iid=f"{number}-{self.PLACEHOLDER}")
+
+    def _expand(self, item):
+        """ Replaces the placeholder under item with the clade's children. """
+        placeholder = f"{item}-{self.PLACEHOLDER}"
+        if self.view.exists(placeholder):
+            self.view.delete(placeholder)
+            for child in self.index.clades[int(item)].clades:
+                self._insert(item, self.index.number(child))
+
+    def _opened(self, event):
+        self._expand(self.view.focus())
+
+    def collapse_all(self):
+        """ Closes every clade that has been added to the list, not only the top level. """
+        items = list(self.view.get_children(""))
+        while items:
+            item = items.pop()
+            self.view.item(item, open=False)
+            items.extend(self.view.get_children(item))
+
+    def find(self, query):
+        """ Opens the clades above the clade named query and selects it. Returns False if it is not found. """
+        if self.index is None or query not in self.index.names:
+            return False
+        target = self.index.names[query]
+
+        # Ancestors are the clades whose preorder range holds the target, in order from the root
+        numbers = np.arange(len(self.index.clades))
+        for ancestor in np.flatnonzero((numbers < target) & (self.index.end > target)):
+            self._expand(str(ancestor))
+            self.view.item(str(ancestor), open=True)
+        self.view.selection_set(str(target))
+        self.view.focus(str(target))
+        self.view.see(str(target))
+        return True
+
+
+def show_file_content(filename, tree_file=None):
+    """
+    Opens the tree viewer.
+
+    Args:
+    - filename (str): ASCII tree file next to this script, e.g. tree_analysis_output.txt from analyze_tree.py
+    - tree_file (str): Newick tree for the Clades tab, TREE_FILE next to this script if None
+    """
     # Get the directory of the current script (Print_tree.py)
     script_dir = os.path.dirname(os.path.abspath(__file__))  # This is the folder where Print_tree.py is located
     file_path = os.path.join(script_dir, filename)  # Combine the script directory with the filename
+    tree_path = os.path.join(script_dir, tree_file or TREE_FILE)
+
+    if not os.path.exists(file_path):
+        print(f"Error: The file {filename} was not found in {script_dir}")
+        return
 
     # Create the main window
     window = tk.Tk()
     window.title("File Content Viewer")
 
-    # Setting window parameters
-    text_area = scrolledtext.ScrolledText(window, wrap=tk.WORD, width=150,
-                                          height=30)  # Adjust height to be less vertical
-    text_area.pack(padx=10, pady=10)
+    # Search bar
+    search_bar = tk.Frame(window)
+    search_bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+    query = tk.StringVar()
+    entry = ttk.Entry(search_bar, textvariable=query, width=30)
+    message = ttk.Label(search_bar, text="")
 
-    # Open and read the file
-    try:
-        with open(file_path, "r") as file:
-            file_content = file.read()
+    notebook = ttk.Notebook(window)
+    notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    text_view = LazyTextView(notebook, file_path)
+    notebook.add(text_view, text="Text")
+    clades = None
+    if os.path.exists(tree_path):
+        clades = CladeBrowser(notebook, tree_path)
+        notebook.add(clades, text="Clades")
+    else:
+        missing = ttk.Label(notebook, text=f"The Newick tree {tree_path} was not found.\n"
+                                           "Run python -m Phylogenetics.build_tree to create it.", padding=20)
+        notebook.add(missing, text="Clades")
 
-        # Insert the file content into the text area
-        text_area.insert(tk.END, file_content)
+    def find(event=None):
+        accession = query.get().strip()
+        in_text = text_view.find(accession)
+        in_tree = clades is not None and clades.find(accession)
+        message.configure(text="" if in_text or in_tree else f"{accession} not found")
 
-        # Run the application
-        window.mainloop()  # Keep the window open
-    except FileNotFoundError:
-        print(f"Error: The file {filename} was not found in {script_dir}")
+    ttk.Label(search_bar, text="Accession:").pack(side=tk.LEFT)
+    entry.pack(side=tk.LEFT, padx=5)
+    entry.bind("<Return>", find)
+    ttk.Button(search_bar, text="Find", command=find).pack(side=tk.LEFT)
+    if clades is not None:
+        ttk.Button(search_bar, text="Collapse all", command=clades.collapse_all).pack(side=tk.LEFT, padx=5)
+    message.pack(side=tk.LEFT, padx=5)
+
+    # Run the application
+    window.mainloop()  # Keep the window open
+    text_view.close()
+
+
+if __name__ == "__main__":
+    show_file_content("tree_analysis_output.txt")
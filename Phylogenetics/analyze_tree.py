@@ -1,5 +1,14 @@
+import os
+import sys
+
 from Bio import Phylo
 
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Phylogenetics.tree_index import TreeIndex
+
 """
 File name: analyze_tree.py
 Author: Janessa Reed
@@ -11,9 +20,13 @@ License: MIT License
 """
 
 
+# Input and output files are next to this script, wherever it is run from
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Load the phylogenetic tree
-TREE_FILE = "H5_tree_upgma.nwk"
+TREE_FILE = os.path.join(SCRIPT_DIR, "H5_tree_upgma.nwk")
 tree = Phylo.read(TREE_FILE, "newick")
+index = TreeIndex(tree)
 
 # Identify and print all clades and their branch lengths
 print("\nIdentifying Clades and Branch Lengths:\n")
@@ -24,19 +37,19 @@ for clade in tree.find_clades():
 # Find the Most Recent Common Ancestor (MRCA) of two sequences
 seq1 = "JX258652.1"
 seq2 = "KP286538.1"
-mrca = tree.common_ancestor(seq1, seq2)
+mrca = index.mrca(seq1, seq2)
 print(f"\nMost Recent Common Ancestor (MRCA) of {seq1} and {seq2}: {mrca}")
+print(f"Patristic distance between {seq1} and {seq2}: {index.distance(seq1, seq2)}")
 
-# Compare branch lengths - find the top 5 longest branches
-branches = [(clade.name, clade.branch_length) for clade in tree.find_clades() if clade.branch_length]
-sorted_branches = sorted(branches, key=lambda x: x[1], reverse=True)
+# For many pairs at once, e.g. all accessions of an outbreak, use index.query_pairs([(seq1, seq2), ...])
 
+# Compare branch lengths - find the top 5 longest branches
 print("\nTop 5 Longest Branches:")
-for name, length in sorted_branches[:5]:
-    print(f"{name}: {length}")
+for clade, length in index.top_branches(5):
+    print(f"{clade.name}: {length}")
 
 # Optional: Save a textual representation of the tree
-TREE_OUTPUT = "tree_analysis_output.txt"
+TREE_OUTPUT = os.path.join(SCRIPT_DIR, "tree_analysis_output.txt")
 with open(TREE_OUTPUT, "w") as f:
     Phylo.draw_ascii(tree, file=f)
 
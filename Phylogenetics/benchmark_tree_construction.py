@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+
+import numpy as np
+from Bio.Phylo.TreeConstruction import DistanceTreeConstructor
+
+from Phylogenetics.distance_matrix import to_distance_matrix
+from Phylogenetics.tree_construction import neighbor_joining, upgma
+
+"""
+File name: benchmark_tree_construction.py
+Author: Janessa Reed
+Created: 10/17/26
+Version: 1.0
+Description:
+    Times neighbor_joining and upgma from tree_construction.py on simulated distance matrices of 500, 2,000 and
+    10,000 taxa, and DistanceTreeConstructor.nj on the sizes it can finish (300 taxa or fewer by default).
+
+    The distances come from a random tree: clusters are joined at increasing heights as in a coalescent, every
+    tip gets its own extra branch so rates differ between lineages, and a little noise is added. This gives
+    tree-like but not perfectly additive data, close to distances between real influenza sequences.
+
+    Usage:
+        python -m Phylogenetics.benchmark_tree_construction --sizes 500 2000 10000
+
+License: MIT License
+"""
+
+
+def simulated_distances(n, seed=0):
+    """ Returns an (n, n) symmetric distance matrix from a random tree with uneven tip branches and noise. """
+    rng = np.random.default_rng(seed)
+    distances = np.zeros((n, n))
+    clusters = [np.array([i]) for i in range(n)]
+    height = 0.0
+
+    while len(clusters) > 1:
+        k = len(clusters)
+        height += rng.exponential(2.0 / (k * (k - 1)))
+        a, b = rng.choice(k, size=2, replace=False)
+        left, right = clusters[a], clusters[b]
+        distances[np.ix_(left, right)] = 2 * height
+        distances[np.ix_(right, left)] = 2 * height
+        clusters = [c for i, c in enumerate(clusters) if i not in (a, b)] + [np.concatenate([left, right])]
+
+    tips = rng.exponential(0.05, size=n)
+    noise = rng.normal(0, 0.005, size=(n, n))
+    distances += tips[:, None] + tips[None, :] + (noise + noise.T) / 2
+    np.fill_diagonal(distances, 0.0)
+    return np.clip(distances, 0.0, None)
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def run_benchmark(sizes, bio_max=300, seed=0):
+    """ Prints the build time of each method for every number of taxa and returns them as a list of dicts. """
+    results = []
+    print(f"{'taxa':>7} {'neighbor_joining':>17} {'upgma':>9} {'Bio nj':>9}")
+    for n in sizes:
+        distances = simulated_distances(n, seed)
+        names = [f"Taxon{i + 1}" for i in range(n)]
+
+        row = {"taxa": n,
+               "neighbor_joining": _timed(neighbor_joining, distances, names),
+               "upgma": _timed(upgma, distances, names),
+               "bio_nj": None}
+        if n <= bio_max:
+            row["bio_nj"] = _timed(DistanceTreeConstructor().nj, to_distance_matrix(names, distances))
+
+        bio = f"{row['bio_nj']:8.2f}s" if row["bio_nj"] is not None else f"{'-':>9}"
+        print(f"{n:>7} {row['neighbor_joining']:16.2f}s {row['upgma']:8.2f}s {bio}")
+        results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NumPy neighbor joining and UPGMA.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 10000], help="numbers of taxa")
+    parser.add_argument("--bio-max", type=int, default=300,
+                        help="largest size also run with DistanceTreeConstructor.nj (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    run_benchmark(args.sizes, args.bio_max, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 
+import os
+import sys
+
 from Bio import Phylo
-from Bio.Phylo.TreeConstruction import DistanceTreeConstructor, DistanceMatrix
-from Bio import AlignIO
-from Bio.Phylo.TreeConstruction import DistanceCalculator
 import matplotlib.pyplot as plt
 
+# Lets the script also run from its own folder; the repository root is on the path under python -m
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Phylogenetics.distance_matrix import fasta_distance_matrix
+from Phylogenetics.tree_construction import neighbor_joining
+
 """
 File name: build_tree.py
 Author: Janessa Reed
@@ -17,26 +24,33 @@ Description:
 License: MIT License
 """
 
-# Load the alignment
-alignment = AlignIO.read("H5_Aligned_Official (3).fasta", "fasta")
+# Alignment next to this script, so it can be run from the repository root with python -m Phylogenetics.build_tree
+ALIGNMENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "H5_Aligned_Official (3).fasta")
+
+# Newick tree read by analyze_tree.py, graphical_tree.py and the Clades tab of Print_tree.py
+TREE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "H5_tree_upgma.nwk")
 
-# Compute pairwise distances
-calculator = DistanceCalculator("identity")
-dm = calculator.get_distance(alignment)
+# Guarded because the distance matrix may use a process pool, which re-imports this file on Windows
+if __name__ == "__main__":
+    # Compute pairwise distances ("identity" gives the same matrix as DistanceCalculator("identity"); "p", "jc69"
+    # and "k2p" are also available)
+    dm = fasta_distance_matrix(ALIGNMENT_FILE, "identity")
 
-# Construct a UPGMA tree
-constructor = DistanceTreeConstructor()
-tree = constructor.nj(dm)  # Neighbor-Joining method
+    # Construct a Neighbor-Joining tree, same topology and branch lengths as DistanceTreeConstructor().nj(dm) up
+    # to ties
+    tree = neighbor_joining(dm)
 
-# Save the tree in Newick format
-#Phylo.write(tree, "H5_tree_upgma.nwk", "newick")
+    # Save the tree in Newick format (the file keeps its old name, which the other scripts read, although the
+    # tree is built with Neighbor-Joining rather than UPGMA)
+    Phylo.write(tree, TREE_FILE, "newick")
+    print(f"Tree saved as {TREE_FILE}")
 
-# Display ASCII tree
-print("\nUPGMA Phylogenetic Tree:\n")
-Phylo.draw_ascii(tree)
+    # Display ASCII tree
+    print("\nNeighbor-Joining Phylogenetic Tree:\n")
+    Phylo.draw_ascii(tree)
 
-# Graphical visualization
-plt.figure(figsize=(10, 8))
-Phylo.draw(tree, do_show=False)
-#plt.savefig("H5_tree_upgma.png")
-#print("\nTree saved as H5_tree_upgma.png")
+    # Graphical visualization
+    plt.figure(figsize=(10, 8))
+    Phylo.draw(tree, do_show=False)
+    #plt.savefig("H5_tree_upgma.png")
+    #print("\nTree saved as H5_tree_upgma.png")
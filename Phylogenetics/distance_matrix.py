@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from Bio.Phylo.TreeConstruction import DistanceMatrix
+
+from Genetic_Analysis.Alignment_store import store_for
+
+"""
+File name: distance_matrix.py
+Author: Janessa Reed
+Created: 10/17/26
+Version: 1.0
+Description:
+    Computes pairwise distance matrices of a nucleotide alignment with NumPy instead of comparing sequences
+    character by character, and returns them as a Biopython DistanceMatrix for DistanceTreeConstructor.
+
+    The alignment is held as a uint8 matrix. For a tile of rows against another tile, each base gets a 0/1
+    indicator matrix and the match, compared-site and transition counts of every pair in the tile come out of
+    a few matrix products. Tiles of the upper triangle are spread across a process pool.
+
+    Models:
+        identity  1 - identical characters / alignment length, gaps and ambiguous letters included. This is
+                  DistanceCalculator("identity") and the default.
+        p         mismatches / compared sites
+        jc69      Jukes-Cantor (1969) correction of p
+        k2p       Kimura (1980) two-parameter distance from transitions and transversions
+
+    For p, jc69 and k2p only sites where both sequences have A, C, G or T/U are compared (pairwise deletion).
+    With deletion="complete" every column holding a gap or ambiguous base in any sequence is removed first.
+    Corrections that are undefined (saturated pairs, or pairs with no compared sites) are set to the largest
+    defined distance in the matrix so tree building can still use them.
+
+License: MIT License
+"""
+
+MODELS = ("identity", "p", "jc69", "k2p")
+
+# Rows per tile
+TILE_ROWS = 256
+
+# Base codes: A, C, G and T/U are 0-3 in either case, gaps are 4, anything else 5
+A, C, G, T, GAP, OTHER = range(6)
+_BASE_CODES = np.full(256, OTHER, dtype=np.uint8)
+for _code, _bases in ((A, "Aa"), (C, "Cc"), (G, "Gg"), (T, "TtUu")):
+    for _base in _bases:
+        _BASE_CODES[ord(_base)] = _code
+_BASE_CODES[ord("-")] = _BASE_CODES[ord(".")] = GAP
+
+_matrix = None
+_settings = None
+
+
+def encode_nucleotides(matrix):
+    """ Converts a uint8 matrix of alignment characters to base codes (A, C, G, T = 0-3, gap 4, other 5). """
+    return _BASE_CODES[np.asarray(matrix)]
+
+
+def _indicators(block, symbols):
+    return [(block == symbol).astype(np.float64) for symbol in symbols]
+
+
+def _tile_distances(rows_a, rows_b, model, symbols):
+    """
+    Distances between two blocks of rows.
+
+    Args:
+    - rows_a, rows_b (ndarray): Blocks of the alignment matrix, raw characters for identity, base codes otherwise
+    - model (str): One of MODELS
+    - symbols (array): Characters present in the alignment, used by identity
+
+    Returns:
+    - Array of shape (len(rows_a), len(rows_b)), NaN where the distance is undefined
+    """
+    if model == "identity":
+        matches = sum(x @ y.T for x, y in zip(_indicators(rows_a, symbols), _indicators(rows_b, symbols)))
+        return 1 - matches / rows_a.shape[1] if rows_a.shape[1] else np.ones((len(rows_a), len(rows_b)))
+
+    bases_a = _indicators(rows_a, (A, C, G, T))
+    bases_b = _indicators(rows_b, (A, C, G, T))
+    compared = sum(bases_a) @ sum(bases_b).T
+    matches = sum(x @ y.T for x, y in zip(bases_a, bases_b))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = (compared - matches) / compared
+        if model == "p":
+            return p
+        if model == "jc69":
+            return np.where(p < 0.75, -0.75 * np.log(1 - 4.0 * p / 3), np.nan)
+
+        # Transitions are A<->G and C<->T, every other mismatch is a transversion
+        a_a, c_a, g_a, t_a = bases_a
+        a_b, c_b, g_b, t_b = bases_b
+        transitions = (a_a @ g_b.T + g_a @ a_b.T + c_a @ t_b.T + t_a @ c_b.T) / compared
+        transversions = p - transitions
+        w1 = 1 - 2 * transitions - transversions
+        w2 = 1 - 2 * transversions
+        valid = (w1 > 0) & (w2 > 0)
+        return np.where(valid, -0.5 * np.log(np.where(valid, w1, 1)) - 0.25 * np.log(np.where(valid, w2, 1)),
+                        np.nan)
+
+
+def _init_worker(matrix, settings):
+    global _matrix, _settings
+    _matrix = matrix
+    _settings = settings
+
+
+def _tile(bounds):
+    (i0, i1), (j0, j1) = bounds
+    model, symbols = _settings
+    return bounds, _tile_distances(_matrix[i0:i1], _matrix[j0:j1], model, symbols)
+
+
+def _tile_bounds(n, tile_rows):
+    edges = [(start, min(start + tile_rows, n)) for start in range(0, n, tile_rows)]
+    return [(edges[i], edges[j]) for i in range(len(edges)) for j in range(i, len(edges))]
+
+
+def distance_array(matrix, model="identity", deletion="pairwise", processes=None, tile_rows=TILE_ROWS):
+    """
+    Computes the square distance matrix of an alignment.
+
+    Args:
+    - matrix (ndarray): uint8 alignment matrix of shape (sequences, alignment length), one character per byte
+    - model (str): One of MODELS
+    - deletion (str): "pairwise" or "complete" handling of gaps and ambiguous bases (not used by identity)
+    - processes (int): Number of worker processes, all cores if None, 1 to run in this process
+    - tile_rows (int): Rows per tile
+
+    Returns:
+    - Symmetric float64 array of shape (sequences, sequences) with a zero diagonal
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; choose from {', '.join(MODELS)}")
+    if deletion not in ("pairwise", "complete"):
+        raise ValueError(f"Unknown deletion {deletion!r}; use 'pairwise' or 'complete'")
+
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    symbols = None
+    if model == "identity":
+        symbols = np.flatnonzero(np.bincount(matrix.ravel(), minlength=256)).astype(np.uint8)
+    else:
+        matrix = encode_nucleotides(matrix)
+        if deletion == "complete":
+            matrix = np.ascontiguousarray(matrix[:, (matrix <= T).all(axis=0)])
+
+    n = len(matrix)
+    distances = np.zeros((n, n))
+    tasks = _tile_bounds(n, tile_rows)
+
+    def store(bounds, tile):
+        (i0, i1), (j0, j1) = bounds
+        distances[i0:i1, j0:j1] = tile
+        distances[j0:j1, i0:i1] = tile.T
+
+    if processes == 1 or len(tasks) <= 1:
+        _init_worker(matrix, (model, symbols))
+        for bounds in tasks:
+            store(*_tile(bounds))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(matrix, (model, symbols))) as pool:
+            for bounds, tile in pool.map(_tile, tasks):
+                store(bounds, tile)
+
+    np.fill_diagonal(distances, 0.0)
+    undefined = ~np.isfinite(distances)
+    if undefined.any():
+        defined = distances[~undefined]
+        distances[undefined] = defined.max() if defined.size else 0.0
+    return distances
+
+
+def to_distance_matrix(names, distances):
+    """ Wraps a square distance array in a Biopython DistanceMatrix (lower triangle with the diagonal). """
+    return DistanceMatrix(list(names), [row[:i + 1].tolist() for i, row in enumerate(distances)])
+
+
+def fasta_distance_matrix(fasta_file, model="identity", deletion="pairwise", processes=None):
+    """
+    Computes the distance matrix of an aligned FASTA file.
+
+    Args:
+    - fasta_file (str): Path to the aligned FASTA file
+    - model (str): One of MODELS
+    - deletion (str): "pairwise" or "complete" handling of gaps and ambiguous bases
+    - processes (int): Number of worker processes, all cores if None
+
+    Returns:
+    - Bio.Phylo.TreeConstruction.DistanceMatrix named by record id
+    """
+    store = store_for(fasta_file)
+    distances = distance_array(np.asarray(store.matrix), model, deletion, processes)
+    return to_distance_matrix(store.ids, distances)
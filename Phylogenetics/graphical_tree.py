@@ -1,3 +1,5 @@
+import os
+
 import matplotlib.pyplot as plt
 from Bio import Phylo  
 
@@ -10,6 +12,9 @@ Version: 1.0
 License: MIT License
 """
 
-tree = Phylo.read("H5_tree_upgma.nwk", "newick")
+# Newick tree written by build_tree.py next to this script
+TREE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "H5_tree_upgma.nwk")
+
+tree = Phylo.read(TREE_FILE, "newick")
 plt.figure(figsize=(10, 8))
 Phylo.draw(tree, do_show=True)
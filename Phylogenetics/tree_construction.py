@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from Bio.Phylo import BaseTree
+from Bio.Phylo.TreeConstruction import DistanceMatrix
+
+"""
+File name: tree_construction.py
+Author: Janessa Reed
+Created: 10/17/26
+Version: 1.0
+Description:
+    Neighbor-joining and UPGMA tree construction on NumPy arrays, for alignments with thousands of sequences
+    where DistanceTreeConstructor becomes too slow. Both functions take a Biopython DistanceMatrix (or a square
+    array and names) and return a Bio.Phylo tree, so the trees can be drawn, saved as Newick and analysed the
+    same way as before.
+
+    neighbor_joining uses the same Q criterion, branch lengths, distance update and final join as
+    DistanceTreeConstructor.nj, so it gives the same topology and branch lengths up to ties: when several pairs
+    share the best Q, the pair joined (and so the inner clade names) may differ. It does not rebuild the Q
+    matrix each step. As in RapidNJ (Simonsen et al., 2008), every row keeps its columns sorted by distance,
+    and with r(i) the row sum, u(i) = r(i) / (m - 2) and the row's entries walked in increasing order,
+
+        Q(i, j) = D(i, j) - u(i) - u(j) >= D(i, j) - u(i) - max_k u(k)
+
+    so a row is left as soon as this bound is no better than the best Q found. Since a pair only needs to be
+    found from one of its rows, the row with the larger u(j) takes it and the bound becomes D(i, j) - 2 u(i)
+    for most rows. Rows are sorted again once half of the nodes have been joined.
+
+    upgma joins the closest pair using the minimum of every row, kept up to date as nodes are joined. The new
+    distances are averages weighted by cluster size (UPGMA) by default; weighted=True averages the two distances
+    equally (WPGMA), which is what DistanceTreeConstructor.upgma does.
+
+License: MIT License
+"""
+
+
+def _as_array(distances, names=None):
+    """ Returns (names, square float64 array) from a DistanceMatrix or an array. """
+    if isinstance(distances, DistanceMatrix):
+        n = len(distances.names)
+        matrix = np.zeros((n, n))
+        for i, row in enumerate(distances.matrix):
+            matrix[i, :i + 1] = row
+        matrix = matrix + np.tril(matrix, -1).T
+        return list(distances.names), matrix
+
+    matrix = np.array(distances, dtype=np.float64)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("Distances must be a square matrix")
+    if names is None:
+        names = [f"Taxon{i + 1}" for i in range(len(matrix))]
+    if len(names) != len(matrix):
+        raise ValueError(f"{len(names)} names given for {len(matrix)} taxa")
+    return list(names), matrix
+
+
+# Sorted entries of every row checked in the first slice of the search; later slices are 4 times wider
+SEARCH_PREFIX = 64
+
+
+def _tie_tolerance(value):
+    """ Q values closer than this are treated as equal, since they only differ by rounding. """
+    return 1e-10 * (1 + abs(value)) if np.isfinite(value) else 0.0
+
+
+class _RowMinima:
+    """ Smallest value and its column for every row of a distance matrix with inf on removed entries. """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.column = matrix.argmin(axis=1)
+        self.value = matrix[np.arange(len(matrix)), self.column]
+
+    def refresh(self, rows):
+        if len(rows):
+            self.column[rows] = self.matrix[rows].argmin(axis=1)
+            self.value[rows] = self.matrix[rows, self.column[rows]]
+
+    def update(self, alive, joined, new_row, removed):
+        """ Updates the minima after `removed` was merged into `joined`, whose new distances are new_row. """
+        stale = alive[(self.column[alive] == joined) | (self.column[alive] == removed)]
+        closer = alive[new_row[alive] < self.value[alive]]
+        self.value[closer] = new_row[closer]
+        self.column[closer] = joined
+        self.refresh(np.union1d(stale, [joined]))
+        self.value[removed] = np.inf
+
+
+def _sorted_columns(matrix, rows, alive, order, chunk_rows=512):
+    """ Stores, for each given row, the alive columns sorted by distance, padding the rest with the row itself. """
+    for first in range(0, len(rows), chunk_rows):
+        block = rows[first:first + chunk_rows]
+        ranked = alive[np.argsort(matrix[np.ix_(block, alive)], axis=1, kind="stable")]
+        order[block, :len(alive)] = ranked
+        order[block, len(alive):] = block[:, None]
+
+
+def neighbor_joining(distances, names=None):
+    """
+    Builds a neighbor-joining tree.
+
+    Args:
+    - distances (DistanceMatrix or array): Distances between taxa
+    - names (list of str): Taxon names when distances is an array
+
+    Returns:
+    - Unrooted Bio.Phylo.BaseTree.Tree, laid out like DistanceTreeConstructor.nj
+    """
+    names, matrix = _as_array(distances, names)
+    n = len(names)
+    clades = [BaseTree.Clade(None, name) for name in names]
+
+    if n == 1:
+        return BaseTree.Tree(clades[0], rooted=False)
+    if n == 2:
+        clades[1].branch_length = matrix[1, 0] / 2.0
+        clades[0].branch_length = matrix[1, 0] - clades[1].branch_length
+        inner_clade = BaseTree.Clade(None, "Inner")
+        inner_clade.clades.extend([clades[1], clades[0]])
+        return BaseTree.Tree(inner_clade, rooted=False)
+
+    row_sums = matrix.sum(axis=1)
+    np.fill_diagonal(matrix, np.inf)
+    is_alive = np.ones(n, dtype=bool)
+    inner_count = 0
+
+    # Every row's columns sorted by distance. A sorted entry is only used while its column still holds the node
+    # it held when the row was sorted, which is when born[column] <= sorted_at[row]
+    order = np.empty((n, n), dtype=np.int32)
+    _sorted_columns(matrix, np.arange(n), np.arange(n), order)
+    sorted_at = np.zeros(n, dtype=np.int64)
+    born = np.zeros(n, dtype=np.int64)
+    row_length = np.full(n, n)
+    last_sort = 0
+    sorted_alive = n
+
+    for step, m in enumerate(range(n, 2, -1), start=1):
+        alive = np.flatnonzero(is_alive)
+        node_dist = row_sums / (m - 2)
+        max_node_dist = node_dist[alive].max()
+
+        # Once half of the sorted nodes are gone the prefixes are mostly dead entries, so sort again
+        if m <= sorted_alive // 2:
+            _sorted_columns(matrix, alive, alive, order)
+            sorted_at[alive] = last_sort = step - 1
+            row_length[alive] = m
+            sorted_alive = m
+
+        # Each pair only has to be found once. Row i handles partners j with node_dist[j] <= node_dist[i], plus
+        # partners that cannot see i because they were sorted before i was created. Rows sorted at the last
+        # full sort have only the first kind, so every Q left in them is at least D(i, j) - 2 * node_dist[i];
+        # newer rows need the looser bound with the largest node_dist
+        partner_bound = np.where(born > last_sort, max_node_dist, node_dist)
+
+        # Walk the sorted entries of every row in widening slices. Later entries of a row are at least as far as
+        # the furthest valid entry seen so far, so a row is finished once its bound can no longer beat the best
+        # Q found, or once all its entries are seen
+        best = np.inf
+        found = []
+        rows = alive
+        reached = np.full(n, -np.inf)
+        start, stop = 0, SEARCH_PREFIX
+        while len(rows):
+            columns = order[rows, start:stop]
+            values = matrix[rows[:, None], columns]
+            valid = is_alive[columns] & (born[columns] <= sorted_at[rows, None]) & np.isfinite(values)
+            wanted = valid & ((node_dist[columns] <= node_dist[rows, None]) | (sorted_at[columns] < born[rows, None]))
+            q = np.where(wanted, values - node_dist[rows, None] - node_dist[columns], np.inf)
+            best = min(best, q.min())
+            found.append((rows, columns, q))
+
+            reached[rows] = np.maximum(reached[rows], np.where(valid, values, -np.inf).max(axis=1))
+            unfinished = (stop < row_length[rows]) & \
+                (reached[rows] - node_dist[rows] - partner_bound[rows] <= best + _tie_tolerance(best))
+            rows = rows[unfinished]
+            start, stop = stop, stop * 4
+
+        # Pairs within rounding of the best are tied; take the one DistanceTreeConstructor finds first
+        limit = best + _tie_tolerance(best)
+        pairs = []
+        for rows, columns, q in found:
+            hits = np.nonzero(q <= limit)
+            pairs += zip(rows[hits[0]].tolist(), columns[hits].tolist())
+        drop, keep = min((max(i, j), min(i, j)) for i, j in pairs)
+
+        # Bio keeps the new node in the slot of the lower index
+        d_pair = matrix[keep, drop]
+
+        inner_count += 1
+        inner_clade = BaseTree.Clade(None, "Inner" + str(inner_count))
+        inner_clade.clades.extend([clades[drop], clades[keep]])
+        clades[drop].branch_length = (d_pair + node_dist[drop] - node_dist[keep]) / 2.0
+        clades[keep].branch_length = d_pair - clades[drop].branch_length
+        clades[keep] = inner_clade
+        clades[drop] = None
+
+        others = alive[(alive != keep) & (alive != drop)]
+        new_row = np.full(n, np.inf)
+        new_row[others] = (matrix[drop, others] + matrix[keep, others] - d_pair) / 2.0
+        row_sums[others] += new_row[others] - matrix[drop, others] - matrix[keep, others]
+        row_sums[keep] = new_row[others].sum()
+
+        is_alive[drop] = False
+        matrix[keep, :] = matrix[:, keep] = new_row
+        matrix[drop, :] = matrix[:, drop] = np.inf
+
+        # The new node's row is sorted now; older rows no longer trust their entries for its slot
+        born[keep] = sorted_at[keep] = step
+        row_length[keep] = len(others)
+        _sorted_columns(matrix, np.array([keep]), others, order)
+
+    # Join the last two nodes, hanging the other one under the last inner clade
+    last, other = np.flatnonzero(is_alive)
+    if clades[other] is inner_clade:
+        last, other = other, last
+    clades[last].branch_length = 0
+    clades[other].branch_length = matrix[last, other]
+    clades[last].clades.append(clades[other])
+    return BaseTree.Tree(clades[last], rooted=False)
+
+
+def upgma(distances, names=None, weighted=False):
+    """
+    Builds a UPGMA (or WPGMA) tree.
+
+    Args:
+    - distances (DistanceMatrix or array): Distances between taxa
+    - names (list of str): Taxon names when distances is an array
+    - weighted (bool): Average the distances of the two joined clusters equally (WPGMA) instead of by size
+
+    Returns:
+    - Rooted Bio.Phylo.BaseTree.Tree with inner clades named Inner1, Inner2, ...
+    """
+    names, matrix = _as_array(distances, names)
+    n = len(names)
+    clades = [BaseTree.Clade(None, name) for name in names]
+    if n == 1:
+        return BaseTree.Tree(clades[0])
+
+    np.fill_diagonal(matrix, np.inf)
+    minima = _RowMinima(matrix)
+    is_alive = np.ones(n, dtype=bool)
+    heights = np.zeros(n)
+    sizes = np.ones(n)
+
+    for inner_count in range(1, n):
+        i = int(np.argmin(minima.value))
+        j = int(minima.column[i])
+        keep, drop = min(i, j), max(i, j)
+        height = matrix[keep, drop] / 2.0
+
+        inner_clade = BaseTree.Clade(None, "Inner" + str(inner_count))
+        inner_clade.clades.extend([clades[drop], clades[keep]])
+        clades[drop].branch_length = height - heights[drop]
+        clades[keep].branch_length = height - heights[keep]
+        clades[keep] = inner_clade
+        clades[drop] = None
+
+        is_alive[drop] = False
+        others = np.flatnonzero(is_alive & (np.arange(n) != keep))
+        new_row = np.full(n, np.inf)
+        if weighted:
+            new_row[others] = (matrix[drop, others] + matrix[keep, others]) / 2.0
+        else:
+            new_row[others] = (sizes[drop] * matrix[drop, others] + sizes[keep] * matrix[keep, others]) \
+                / (sizes[drop] + sizes[keep])
+
+        heights[keep] = height
+        sizes[keep] += sizes[drop]
+        matrix[keep, :] = matrix[:, keep] = new_row
+        matrix[drop, :] = matrix[:, drop] = np.inf
+        minima.update(others, keep, new_row, drop)
+
+    inner_clade.branch_length = 0
+    return BaseTree.Tree(inner_clade)
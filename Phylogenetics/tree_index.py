@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+
+import numpy as np
+from Bio import Phylo
+from Bio.Phylo import BaseTree
+
+"""
+File name: tree_index.py
+Author: Janessa Reed
+Created: 10/17/26
+Version: 1.0
+Description:
+    Precomputed index over a Bio.Phylo tree for repeated MRCA, patristic distance and clade membership
+    questions. tree.common_ancestor and tree.distance search the whole tree on every call, which is too slow
+    when thousands of accession pairs are checked during an outbreak investigation.
+
+    The index is built in one walk of the tree:
+        - every clade gets a number in preorder, so the clades below a clade are the numbers from it up to
+          end[clade], and "is X in the clade of Y" is two comparisons
+        - the distance from the root (sum of branch lengths, a missing length counted as 0) of every clade
+        - an Euler tour (the clades in the order a depth-first walk visits them, parents revisited after each
+          child) with a sparse table of the shallowest tour position in every range of 2^k positions
+
+    The MRCA of two clades is the shallowest clade in the tour between their first visits, which the sparse
+    table gives from two lookups. The patristic distance is then root_distance[a] + root_distance[b] -
+    2 * root_distance[mrca]. The pair queries do the same for whole arrays of pairs at once with NumPy.
+
+    Usage:
+        python -m Phylogenetics.tree_index tree.nwk pairs.tsv -o pair_results.tsv
+
+    pairs.tsv holds two accessions per line (tab separated); the output lists the MRCA and patristic distance
+    of each pair, with the number of terminals under the MRCA since inner clades are often unnamed.
+
+License: MIT License
+"""
+
+
+class TreeIndex:
+    """ Constant-time MRCA, patristic distance and clade membership queries on a Bio.Phylo tree. """
+
+    def __init__(self, tree):
+        """
+        Args:
+        - tree (Bio.Phylo Tree or Clade): Tree to index; it must not be changed while the index is used
+        """
+        root = tree.root if isinstance(tree, BaseTree.Tree) else tree
+        clades = [root]
+        root_distance = [0.0]
+        branch_length = [np.nan if root.branch_length is None else root.branch_length]
+        end = [0]
+        tour = [0]
+        first_visit = [0]
+        tour_depth = [0]
+
+        # Iterative depth-first walk so deep, ladder-like trees do not hit the recursion limit
+        stack = [(0, iter(root.clades))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                end[node] = len(clades)
+                if stack:
+                    tour.append(stack[-1][0])
+                    tour_depth.append(len(stack) - 1)
+                continue
+
+            number = len(clades)
+            clades.append(child)
+            root_distance.append(root_distance[node] + (child.branch_length or 0.0))
+            branch_length.append(np.nan if child.branch_length is None else child.branch_length)
+            end.append(0)
+            first_visit.append(len(tour))
+            tour.append(number)
+            tour_depth.append(len(stack))
+            stack.append((number, iter(child.clades)))
+
+        self.clades = clades
+        self.root_distance = np.array(root_distance)
+        self.branch_length = np.array(branch_length)
+        self.end = np.array(end)
+        self.first_visit = np.array(first_visit)
+        self.tour = np.array(tour)
+        self.tour_depth = np.array(tour_depth)
+        self._sparse_table()
+
+        # Terminals up to each preorder number, so the size of a clade is a difference of two entries
+        terminal = np.array([clade.is_terminal() for clade in clades])
+        self.terminal_count = np.concatenate([[0], np.cumsum(terminal)])
+
+        self.numbers = {id(clade): number for number, clade in enumerate(clades)}
+        self.names = {}
+        for number, clade in enumerate(clades):
+            if clade.name is not None:
+                self.names.setdefault(clade.name, number)  # The first in preorder, like tree.find_any
+
+    def _sparse_table(self):
+        """ Row k holds, for every tour position i, the shallowest position in i .. i + 2^k - 1. """
+        size = len(self.tour)
+        levels = max(1, int(size).bit_length())
+        table = np.zeros((levels, size), dtype=np.int64)
+        table[0] = np.arange(size)
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            left = table[k - 1, :size - half]
+            right = table[k - 1, half:]
+            table[k, :size - half] = np.where(self.tour_depth[left] <= self.tour_depth[right], left, right)
+        self.table = table
+        self.log2 = np.zeros(size + 1, dtype=np.int64)
+        self.log2[2:] = np.floor(np.log2(np.arange(2, size + 1))).astype(np.int64)
+
+    def number(self, target):
+        """ Returns the preorder number of a clade given as a Clade or a clade name. """
+        if isinstance(target, BaseTree.Clade):
+            number = self.numbers.get(id(target))
+        else:
+            number = self.names.get(target)
+        if number is None:
+            raise ValueError(f"{target} is not in the tree")
+        return number
+
+    def _numbers(self, targets):
+        return np.array([self.number(target) for target in targets], dtype=np.int64)
+
+    def _lca(self, a, b):
+        """ Preorder numbers of the MRCAs of two arrays of preorder numbers. """
+        left = np.minimum(self.first_visit[a], self.first_visit[b])
+        right = np.maximum(self.first_visit[a], self.first_visit[b])
+        k = self.log2[right - left + 1]
+        first = self.table[k, left]
+        second = self.table[k, right - (1 << k) + 1]
+        return self.tour[np.where(self.tour_depth[first] <= self.tour_depth[second], first, second)]
+
+    def mrca(self, *targets):
+        """ Returns the most recent common ancestor Clade of one or more clades or names. """
+        if not targets:
+            raise ValueError("At least one clade is needed")
+        node = self.number(targets[0])
+        for target in targets[1:]:
+            node = int(self._lca(node, self.number(target)))
+        return self.clades[node]
+
+    def distance(self, first, second):
+        """ Returns the patristic distance (sum of branch lengths on the path) between two clades or names. """
+        a, b = self.number(first), self.number(second)
+        mrca = self._lca(a, b)
+        return float(self.root_distance[a] + self.root_distance[b] - 2 * self.root_distance[mrca])
+
+    def distance_from_root(self, target):
+        """ Returns the sum of branch lengths from the root to a clade. """
+        return float(self.root_distance[self.number(target)])
+
+    def in_clade(self, target, ancestor):
+        """ Returns True if target is ancestor or lies below it. """
+        a, t = self.number(ancestor), self.number(target)
+        return bool(a <= t < self.end[a])
+
+    def clade_size(self, ancestor):
+        """ Returns the number of terminals below ancestor. """
+        a = self.number(ancestor)
+        return int(self.terminal_count[self.end[a]] - self.terminal_count[a])
+
+    def members(self, ancestor):
+        """ Returns the terminal clades below ancestor, in tree order. """
+        a = self.number(ancestor)
+        return [clade for clade in self.clades[a:self.end[a]] if clade.is_terminal()]
+
+    def query_pairs(self, pairs):
+        """
+        Finds the MRCA and patristic distance of many pairs at once.
+
+        Args:
+        - pairs (list of tuple): (first, second) clades or names, e.g. pairs of accessions
+
+        Returns:
+        - List of MRCA clades and an array of distances, both in the order of pairs
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return [], np.zeros(0)
+        a = self._numbers(first for first, _ in pairs)
+        b = self._numbers(second for _, second in pairs)
+        mrcas = self._lca(a, b)
+        distances = self.root_distance[a] + self.root_distance[b] - 2 * self.root_distance[mrcas]
+        return [self.clades[node] for node in mrcas], distances
+
+    def top_branches(self, k=5):
+        """ Returns the k longest branches as (Clade, branch length) pairs, longest first. """
+        lengths = np.where(np.isnan(self.branch_length) | (self.branch_length == 0), -np.inf, self.branch_length)
+        candidates = np.flatnonzero(np.isfinite(lengths))
+        if k < len(candidates):
+            # Keep every branch tied with the k-th longest, so which of them are returned does not depend on
+            # argpartition
+            kth = -np.partition(-lengths[candidates], k - 1)[k - 1]
+            candidates = candidates[lengths[candidates] >= kth]
+        # Longest first, ties in preorder
+        candidates = candidates[np.lexsort((candidates, -lengths[candidates]))][:k]
+        return [(self.clades[node], float(lengths[node])) for node in candidates]
+
+
+def read_pairs(pairs_file):
+    """ Reads (first, second) name pairs from a tab separated file, skipping blank lines and # comments. """
+    with open(pairs_file, newline="") as handle:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(handle, delimiter="\t")
+                if row and not row[0].startswith("#") and len(row) >= 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MRCA and patristic distance of accession pairs in a tree.")
+    parser.add_argument("tree", help="tree file")
+    parser.add_argument("pairs", help="tab separated file with two accessions per line")
+    parser.add_argument("-o", "--output", default="pair_results.tsv", help="output TSV (default: %(default)s)")
+    parser.add_argument("--format", default="newick", help="tree file format (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    index = TreeIndex(Phylo.read(args.tree, args.format))
+    pairs = read_pairs(args.pairs)
+    mrcas, distances = index.query_pairs(pairs)
+
+    with open(args.output, "w", newline="") as handle:
+        writer = csv.writer(handle, delimiter="\t")
+        writer.writerow(["first", "second", "mrca", "mrca_terminals", "patristic_distance"])
+        for (first, second), mrca, distance in zip(pairs, mrcas, distances):
+            writer.writerow([first, second, mrca.name or "", index.clade_size(mrca), f"{distance:.6g}"])
+    print(f"Wrote {len(pairs)} pairs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
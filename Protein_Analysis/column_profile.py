@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import numpy as np
+from collections import Counter
+
+from Genetic_Analysis.Fasta_stream import read_fasta, read_alignment_blocks, DEFAULT_MAX_BYTES
+from Genetic_Analysis.Alignment_store import store_for, file_digest
+
+"""
+File name: column_profile.py
+Author: Debra Pacheco
+Created: 10/17/26
+Version: 1.0
+Description:
+    This script loads a multiple sequence alignment into a 2-D uint8 character matrix and counts the residues in
+    every column in one vectorized pass. Each residue is encoded by its ASCII byte so the counts are a
+    (columns x 256) array built with bincount, a block of rows at a time, which keeps memory flat for alignments
+    with 100k+ sequences. Alignments are streamed in blocks of rows under a configurable memory ceiling, so the
+    whole file never has to be held in memory.
+
+    The first row each residue appears in is kept alongside the counts so ties are broken the same way
+    Counter.most_common does: the residue seen first in the column wins. Rows can also be given group labels
+    (for example human and animal hosts) and every group is counted in the same pass.
+
+    Profiles can be persisted to a compressed .npz cache next to this script. A cached profile is reused while
+    the source alignment keeps the same mtime and size, or the same SHA-256 digest if those have changed, and is
+    rebuilt automatically once the alignment is edited. Profiles are counted from the alignment's memory-mapped
+    store (see Genetic_Analysis/Alignment_store.py) so the text FASTA is only parsed once.
+
+License: MIT License
+"""
+
+GAP = ord("-")
+ALPHABET_SIZE = 256
+
+# Number of matrix cells handled per bincount call
+CHUNK_CELLS = 1 << 22
+
+# Default location of cached profiles
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def load_alignment_matrix(msa_file):
+    """ Given a FASTA alignment returns the record ids and a matrix of residue bytes.
+
+    Parameters:
+    msa_file (file path): file path to a FASTA formatted file containing aligned sequence data
+
+    Returns:
+    tuple: (ids, matrix) where ids is a list of record ids and matrix is a uint8 array of shape
+           (sequences, alignment length)
+
+    """
+    ids = []
+    rows = []
+    for record_id, sequence in read_fasta(msa_file):
+        ids.append(record_id)
+        rows.append(sequence)
+
+    if not rows:
+        raise ValueError(f"No sequences found in {msa_file}")
+
+    width = len(rows[0])
+    if any(len(row) != width for row in rows):
+        raise ValueError("Sequences must all be the same length")
+
+    matrix = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), width)
+    return ids, matrix
+
+
+def _rows_per_chunk(width, chunk_cells):
+    return max(1, chunk_cells // max(width, 1))
+
+
+def group_column_counts(matrix, labels, n_groups, chunk_cells=CHUNK_CELLS):
+    """ Given a residue matrix and a group label per row returns the residue counts of every column per group.
+
+    All groups are counted together in the same bincount pass, so splitting an alignment into groups costs no
+    more than counting it whole.
+
+    Parameters:
+    matrix (ndarray): uint8 array of shape (sequences, alignment length)
+    labels (ndarray): integer group of each row, from 0 to n_groups - 1
+    n_groups (int): number of groups
+    chunk_cells (int): number of matrix cells counted per pass
+
+    Returns:
+    ndarray: int64 array of shape (n_groups, alignment length, 256)
+
+    """
+    n_rows, width = matrix.shape
+    group_size = width * ALPHABET_SIZE
+    offsets = np.arange(width, dtype=np.intp) * ALPHABET_SIZE
+    group_offsets = np.asarray(labels, dtype=np.intp) * group_size
+    counts = np.zeros(n_groups * group_size, dtype=np.int64)
+
+    step = _rows_per_chunk(width, chunk_cells)
+    for start in range(0, n_rows, step):
+        keys = matrix[start:start + step].astype(np.intp) + offsets + group_offsets[start:start + step, None]
+        counts += np.bincount(keys.ravel(), minlength=n_groups * group_size)
+
+    return counts.reshape(n_groups, width, ALPHABET_SIZE)
+
+
+def column_counts(matrix, chunk_cells=CHUNK_CELLS):
+    """ Given a residue matrix returns the count of every residue byte in every column.
+
+    Parameters:
+    matrix (ndarray): uint8 array of shape (sequences, alignment length)
+    chunk_cells (int): number of matrix cells counted per pass
+
+    Returns:
+    ndarray: int64 array of shape (alignment length, 256)
+
+    """
+    labels = np.zeros(matrix.shape[0], dtype=np.intp)
+    return group_column_counts(matrix, labels, 1, chunk_cells)[0]
+
+
+def group_first_occurrence(matrix, labels, counts, chunk_cells=CHUNK_CELLS):
+    """ Given a residue matrix, row groups and their counts returns the first row each residue appears in per
+    column and group.
+
+    Rows are scanned in blocks that start small and double in size, and the scan stops as soon as every residue
+    in the counts has been seen, which is usually within the first few hundred rows. Row numbers refer to the
+    whole matrix, so their order within a group is the order the group's sequences appear in.
+
+    Parameters:
+    matrix (ndarray): uint8 array of shape (sequences, alignment length)
+    labels (ndarray): integer group of each row, from 0 to n_groups - 1
+    counts (ndarray): group counts returned by group_column_counts
+    chunk_cells (int): largest number of matrix cells handled per pass
+
+    Returns:
+    ndarray: int64 array shaped like counts, set to the number of rows where a residue is absent
+
+    """
+    n_rows, width = matrix.shape
+    group_size = width * ALPHABET_SIZE
+    offsets = np.arange(width, dtype=np.intp) * ALPHABET_SIZE
+    group_offsets = np.asarray(labels, dtype=np.intp) * group_size
+    first = np.full(counts.size, n_rows, dtype=np.int64)
+    outstanding = np.flatnonzero(counts.ravel())
+
+    step = 64
+    start = 0
+    while start < n_rows and np.any(first[outstanding] == n_rows):
+        block = matrix[start:start + step]
+        keys = (block.astype(np.intp) + offsets + group_offsets[start:start + step, None]).ravel()
+        unique_keys, index = np.unique(keys, return_index=True)
+
+        unseen = first[unique_keys] == n_rows
+        first[unique_keys[unseen]] = start + index[unseen] // width
+
+        start += len(block)
+        step = min(step * 2, _rows_per_chunk(width, chunk_cells))
+
+    return first.reshape(counts.shape)
+
+
+def first_occurrence(matrix, counts, chunk_cells=CHUNK_CELLS):
+    """ Given a residue matrix and its column counts returns the first row each residue appears in per column.
+
+    Parameters:
+    matrix (ndarray): uint8 array of shape (sequences, alignment length)
+    counts (ndarray): column counts returned by column_counts
+    chunk_cells (int): largest number of matrix cells handled per pass
+
+    Returns:
+    ndarray: int64 array of shape (alignment length, 256), set to the number of rows where a residue is absent
+
+    """
+    labels = np.zeros(matrix.shape[0], dtype=np.intp)
+    return group_first_occurrence(matrix, labels, counts[None], chunk_cells)[0]
+
+
+def most_common_codes(counts, first):
+    """ Returns the most common residue byte in each column, breaking ties by first appearance. """
+    top = counts.max(axis=-1, keepdims=True)
+    tie_break = np.where((counts == top) & (top > 0), first, np.iinfo(np.int64).max)
+    return np.argmin(tie_break, axis=-1).astype(np.uint8)
+
+
+def consensus_string(counts, first):
+    """ Returns the most common residue in each column as a string, gaps included. """
+    return most_common_codes(counts, first).tobytes().decode("ascii")
+
+
+def profile_frequencies(counts, first):
+    """ Given column counts returns a dictionary of residue frequencies keyed on consensus position.
+
+    Columns where the most common residue is a gap are skipped, so position 1 is the first column that appears
+    in the consensus sequence.
+
+    Parameters:
+    counts (ndarray): column counts returned by column_counts
+    first (ndarray): first appearances returned by first_occurrence
+
+    Returns:
+    Dictionary: one based consensus position mapped to a Counter of residues at that position
+
+    """
+    top = most_common_codes(counts, first)
+    position_frequencies = {}
+
+    for consensus_position, column in enumerate(np.flatnonzero(top != GAP), start=1):
+        present = np.flatnonzero(counts[column])
+        present = present[np.argsort(first[column, present], kind="stable")]
+        position_frequencies[consensus_position] = Counter(
+            {chr(code): int(counts[column, code]) for code in present})
+
+    return position_frequencies
+
+
+def stream_group_profile(msa_file, label_rows=None, n_groups=1, max_bytes=DEFAULT_MAX_BYTES):
+    """ Given a FASTA alignment returns the column counts and first appearances of each row group, reading the
+    file in blocks of at most max_bytes.
+
+    Parameters:
+    msa_file (file path): file path to a FASTA formatted file containing aligned sequence data
+    label_rows (function): given a list of record ids returns their integer groups, all rows are group 0 if None
+    n_groups (int): number of groups
+    max_bytes (int): memory ceiling for one block of sequence data
+
+    Returns:
+    tuple: (counts, first) shaped (n_groups, alignment length, 256) as returned by group_column_counts and
+           group_first_occurrence, with row numbers counted over the whole file
+
+    """
+    not_seen = np.iinfo(np.int64).max
+    counts = None
+    first = None
+    n_rows = 0
+
+    for ids, block in read_alignment_blocks(msa_file, max_bytes):
+        if label_rows is None:
+            labels = np.zeros(len(ids), dtype=np.intp)
+        else:
+            labels = np.asarray(label_rows(ids), dtype=np.intp)
+
+        block_counts = group_column_counts(block, labels, n_groups)
+        if counts is None:
+            counts = np.zeros_like(block_counts)
+            first = np.full(block_counts.shape, not_seen, dtype=np.int64)
+
+        # Only residues that earlier blocks have not seen need their first appearance looked up
+        wanted = np.where(first == not_seen, block_counts, 0)
+        block_first = group_first_occurrence(block, labels, wanted)
+        found = block_first < len(block)
+        first[found] = block_first[found] + n_rows
+
+        counts += block_counts
+        n_rows += len(block)
+
+    first[first == not_seen] = n_rows
+    return counts, first
+
+
+def calculate_profile(msa_file, max_bytes=DEFAULT_MAX_BYTES):
+    """ Given a FASTA alignment returns the consensus-position-keyed residue frequencies of all its sequences. """
+    counts, first = stream_group_profile(msa_file, max_bytes=max_bytes)
+    return profile_frequencies(counts[0], first[0])
+
+
+def _cache_path(msa_file, cache_dir):
+    path_key = hashlib.sha1(os.path.abspath(msa_file).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(msa_file)}.{path_key}.profile.npz")
+
+
+def _write_profile_cache(cache_file, counts, first, digest, stat):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    temp_file = cache_file + ".tmp"
+    with open(temp_file, "wb") as handle:
+        np.savez_compressed(handle, counts=counts, first=first, digest=np.array(digest),
+                            mtime_ns=np.array(stat.st_mtime_ns), size=np.array(stat.st_size))
+    os.replace(temp_file, cache_file)
+
+
+def load_profile_arrays(msa_file, cache_dir=CACHE_DIR):
+    """ Given a FASTA alignment returns its column counts and first appearances, using the on-disk cache.
+
+    Parameters:
+    msa_file (file path): file path to a FASTA formatted file containing aligned sequence data
+    cache_dir (directory path): directory holding cached profiles
+
+    Returns:
+    tuple: (counts, first) as returned by column_counts and first_occurrence
+
+    """
+    stat = os.stat(msa_file)
+    cache_file = _cache_path(msa_file, cache_dir)
+    digest = None
+
+    try:
+        with np.load(cache_file) as cached:
+            counts, first = cached["counts"], cached["first"]
+            cached_digest = str(cached["digest"])
+            unchanged = int(cached["mtime_ns"]) == stat.st_mtime_ns and int(cached["size"]) == stat.st_size
+
+        if unchanged:
+            return counts, first
+
+        # The file was touched, so only trust the cache if its contents are the same
+        digest = file_digest(msa_file)
+        if digest == cached_digest:
+            _write_profile_cache(cache_file, counts, first, digest, stat)
+            return counts, first
+    except (OSError, KeyError, ValueError):
+        pass
+
+    if digest is None:
+        digest = file_digest(msa_file)
+
+    # Count from the memory-mapped alignment store, which later consensus work reuses
+    matrix = store_for(msa_file).matrix
+    counts = column_counts(matrix)
+    first = first_occurrence(matrix, counts)
+
+    try:
+        _write_profile_cache(cache_file, counts, first, digest, stat)
+    except OSError:
+        pass  # A read-only checkout still gets the profile, just without the cache
+
+    return counts, first
+
+
+def cached_profile(msa_file, cache_dir=CACHE_DIR):
+    """ Same as calculate_profile but reads and writes the on-disk profile cache. """
+    return profile_frequencies(*load_profile_arrays(msa_file, cache_dir))
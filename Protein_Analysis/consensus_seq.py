@@ -1,23 +1,32 @@
 #!/usr/bin/env python3
 
-from Bio import AlignIO
-from collections import Counter
+import os
+import numpy as np
+from functools import lru_cache
+
+from Genetic_Analysis.Fasta_stream import DEFAULT_MAX_BYTES
+from Genetic_Analysis.Alignment_store import store_for, store_rows
+from Protein_Analysis.column_profile import group_column_counts, group_first_occurrence, consensus_string
 
 """
 File name: consensus_seq.py
 Author: Debra Pacheco
 Created: 02/01/25
-Version: 1.0
+Version: 1.1
 Description:
     This script will generate a consensus sequence 
 
+    Human and animal consensus sequences are built from one count matrix per group in a single pass over the
+    alignment, and the result is memoized per alignment and accession set so repeated comparisons in one session
+    are free. The alignment is read through its memory-mapped store, where human rows are looked up by accession.
+
 License: MIT License
 """
 
 Accession_list = []
 
 
-def get_consensus_sequence(msa_file, accession_file, accession_list=Accession_list):
+def get_consensus_sequence(msa_file, accession_file, accession_list=Accession_list, max_bytes=DEFAULT_MAX_BYTES):
     """
     Given a multiple sequence alignment (MSA) and a file with human host accession numbers,
     this function returns consensus sequences for human and animal viruses.
@@ -25,60 +34,42 @@ def get_consensus_sequence(msa_file, accession_file, accession_list=Accession_li
     Parameters:
     msa_file (str): Path to the MSA FASTA file.
     accession_file (str): Path to the file containing human host accession numbers.
+    max_bytes (int): Memory ceiling for the block of sequences read at one time.
 
     Returns:
     tuple: (human_consensus, animal_consensus), where each is a string representing
            the most frequent amino acids at each position.
     """
 
-    # Load the alignment
-    alignment = AlignIO.read(msa_file, "fasta")
-
     # Load accession numbers from human hosts
     with open(accession_file) as file:
         human_accessions = {line.strip() for line in file}
 
-    # Separate sequences into human and animal groups
-    human_seqs = []
-    animal_seqs = []
-
     if len(human_accessions) == 0:
         human_accessions = Accession_list
 
-    for record in alignment:
-        if record.id in human_accessions:
-            human_seqs.append(record.seq)
-        else:
-            animal_seqs.append(record.seq)
-
-    # Identify differences at each position
-    sequence_length = len(alignment[0].seq)
-
-    def get_most_common_base(sequences):
-        """ Returns the most common base at each position in a given set of sequences. """
-        consensus = []
-        for pos in range(sequence_length):
-            column = [seq[pos] for seq in sequences]
-            freq = Counter(column)
-            most_common_base, _ = freq.most_common(1)[0]  # Get the most frequent amino acid
-            consensus.append(most_common_base)
-        return "".join(consensus)
-
-    # Generate consensus sequences
-    #    print(human_seqs)
-    #    print(animal_seqs)
-    human_consensus = get_most_common_base(human_seqs) if human_seqs else None
-    animal_consensus = get_most_common_base(animal_seqs) if animal_seqs else None
-
-    # Remove any gaps in the consensus to match positions to NCBI positions
-    try:
-        human_consensus = (human_consensus.replace('-', ''))
-    except AttributeError:
-        pass
-    try:
-        animal_consensus = (animal_consensus.replace('-', ''))
-    except AttributeError:
-        pass
+    # Memoize on the alignment contents as well as its path so an edited file is recounted
+    stat = os.stat(msa_file)
+    return _group_consensus(os.path.abspath(msa_file), stat.st_mtime_ns, stat.st_size, frozenset(human_accessions),
+                            max_bytes)
+
+
+@lru_cache(maxsize=32)
+def _group_consensus(msa_path, mtime_ns, size, human_accessions, max_bytes):
+    """ Returns the gap-stripped (human_consensus, animal_consensus) of an alignment, None for an empty group. """
+    store = store_for(msa_path, max_bytes=max_bytes)
+
+    # Separate sequences into human (1) and animal (0) groups
+    labels = np.zeros(len(store.ids), dtype=np.intp)
+    labels[store_rows(store, human_accessions)] = 1
+
+    counts = group_column_counts(store.matrix, labels, 2)
+    first = group_first_occurrence(store.matrix, labels, counts)
+
+    # Generate consensus sequences, removing any gaps to match positions to NCBI positions.
+    # A group without sequences has no counts and gets no consensus.
+    animal_consensus = consensus_string(counts[0], first[0]).replace('-', '') if counts[0, 0].any() else None
+    human_consensus = consensus_string(counts[1], first[1]).replace('-', '') if counts[1, 0].any() else None
 
     return human_consensus, animal_consensus
 
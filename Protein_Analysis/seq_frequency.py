@@ -2,17 +2,19 @@
 import os
 import tkinter as tk
 import requests
-from Bio import SeqIO, AlignIO, Align
-from collections import Counter
+from functools import lru_cache
+from Bio import Align
 
 from Protein_Analysis.amino_acid_compare import compare_pb2_mutations, show_table, file_selector
 from Protein_Analysis.consensus_seq import seq_compare, get_consensus_sequence
+from Protein_Analysis.column_profile import calculate_profile, cached_profile
+from Genetic_Analysis.Fasta_stream import read_fasta
 
 """
 File name: seq_frequency.py
 Author: Debra Pacheco
 Created: 02/01/25
-Version: 1.4
+Version: 1.5
 Description:
     This script contains two functions. Calculate_amino_acid_freq takes a multiple sequence alignment file and creates a 
     dictionary of all amino acid residues at each position.
@@ -38,34 +40,16 @@ def calculate_amino_acid_freq(msa_file):
 
     """
 
-    # Load the alignment
-    alignment = AlignIO.read(msa_file, "fasta")
+    # Count every column of the alignment in one vectorized pass
+    return calculate_profile(msa_file)
 
-    # Identify amino acid frequencies at each position
-    sequence_length = len(alignment[0].seq)
-    position_frequencies = {}
 
-    consensus_position = 0
+@lru_cache(maxsize=None)
+def animal_position_counts():
+    """ Returns the reference animal frequencies, computed on first use and cached on disk between runs. """
+    return cached_profile(msa_file)
 
-    for position in range(sequence_length):
-        column = [record.seq[position] for record in alignment]
-        freq = Counter(column)
 
-        # Skip positions where the most common amino acid is a gap
-        most_common_aa, most_common_count = freq.most_common(1)[0]
-        if most_common_aa == '-':
-            continue
-
-        # This position will appear in the consensus
-        consensus_position += 1
-
-        # Store frequencies for non-gap positions
-        position_frequencies[consensus_position] = freq
-
-    return position_frequencies
-
-
-position_count_animal = calculate_amino_acid_freq(msa_file)
 position_count_human = {}
 
 
@@ -75,6 +59,8 @@ def multiple_sequence_welcome():
 
     file_type = "4"
 
+    position_count_animal = animal_position_counts()
+
     print("  Do you have a single sequence to manually enter or a FASTA multiple sequence alignment file?\n")
     print("                    Please choose from the following options.\n")
 
@@ -131,9 +117,7 @@ def multiple_sequence_welcome():
                 exit()
 
             # Use all accessions in file as accession list
-            accessions = []
-            for record in SeqIO.parse(file_path, "fasta"):
-                accessions.append(record.id)
+            accessions = [record_id for record_id, _ in read_fasta(file_path)]
 
             # Human accession file is blank and all accessions from MSA are used to create consensus
             user_sequence = get_consensus_sequence(file_path, "Protein_Analysis/blank.txt", accession_list=accessions)
@@ -0,0 +1,64 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StandIn:
+    """ Local HTTP server standing in for the USDA and CDC sites.
+
+    routes maps a path to (status, headers, body) or to a function taking the request headers and returning
+    that tuple. Every request is recorded in requests as (path, headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.delay = {}
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers)))
+                time.sleep(stand_in.delay.get(self.path, 0))
+                route = stand_in.routes.get(self.path, (404, {}, "not found"))
+                status, headers, body = route(self.headers) if callable(route) else route
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def hits(self, path):
+        return sum(1 for requested, _ in self.requests if requested == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    """ Retries wait RETRY_DELAY seconds and more; the tests do not need to. """
+    from HPAI_maps import data_sources
+    monkeypatch.setattr(data_sources, "RETRY_DELAY", 0.0)
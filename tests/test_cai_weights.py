@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from Genetic_Analysis.CAI_weights import calculate_cai_hosts
+from Genetic_Analysis.Calculate_CAI import (PSEUDOCOUNT, calculate_cai, calculate_cai_batch,
+                                            influenza_relative_adaptiveness, relative_adaptiveness,
+                                            synonymous_families)
+
+
+def test_families_leave_out_single_codon_amino_acids_and_stops():
+    families = synonymous_families()
+    assert "M" not in families and "W" not in families and "*" not in families
+    assert sum(len(codons) for codons in families.values()) == 59
+
+
+def test_most_used_codon_of_every_family_has_weight_one():
+    for codons in synonymous_families().values():
+        weights = [influenza_relative_adaptiveness[codon] for codon in codons]
+        assert max(weights) == 1.0
+        assert all(0 < weight <= 1 for weight in weights)
+
+
+def test_missing_codons_get_the_pseudocount():
+    weights = relative_adaptiveness({"GCT": 10, "GCC": 4})
+
+    assert weights["GCT"] == 1.0
+    assert weights["GCC"] == pytest.approx(0.4)
+    assert weights["GCA"] == weights["GCG"] == pytest.approx(PSEUDOCOUNT / 10)
+    # A family that was never seen is all pseudocounts, so every codon in it is equally adapted
+    assert {weights[codon] for codon in synonymous_families()["C"]} == {1.0}
+
+
+def test_default_scores_are_between_zero_and_one_and_batch_matches():
+    rng = np.random.default_rng(0)
+    sequences = ["".join(rng.choice(list("TCAG"), size=300)) for _ in range(20)] + ["ATGTGG", ""]
+
+    batch = calculate_cai_batch(sequences)
+    assert list(batch) == [calculate_cai(sequence) for sequence in sequences]
+    assert np.all((batch[:-2] > 0) & (batch[:-2] <= 1))
+    assert batch[-2] == batch[-1] == 0  # Only Met and Trp, or nothing, to score
+
+
+def test_preferred_codons_score_one_for_every_host():
+    preferred = "".join(max(codons, key=influenza_relative_adaptiveness.get)
+                        for codons in synonymous_families().values())
+    scores = calculate_cai_hosts([preferred], {"influenza": influenza_relative_adaptiveness})
+    assert scores["influenza"].item() == 1.0
@@ -0,0 +1,147 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from Genetic_Analysis.Codeml_batch import LOGFILE, build_jobs, prepare_job, run_batch, run_job
+
+MLC = """CODONML (in paml version 4.9j, February 2020)  seqfile.phy
+Model: One dN/dS ratio,
+Codon frequency model: F3x4
+ns =   3  ls = 100
+
+TREE #  1:  (1, 2, 3);   MP score: 10
+lnL(ntime:  3  np:  5):   -1234.567890      +0.000000
+   4..1     4..2     4..3
+   0.10000  0.20000  0.30000  2.00000  0.25000
+
+tree length =   0.60000
+
+(1: 0.100000, 2: 0.200000, 3: 0.300000);
+
+Detailed output identifying parameters
+
+kappa (ts/tv) =  2.00000
+
+omega (dN/dS) =  0.25000
+"""
+
+# Stands in for codeml: STUB_CODEML picks what it does, every call is appended to STUB_CODEML_CALLS
+STUB = """#!{python}
+import os, sys, time
+with open(os.environ["STUB_CODEML_CALLS"], "a") as calls:
+    calls.write(os.getcwd() + "\\n")
+mode = os.environ.get("STUB_CODEML", "ok")
+if mode == "fail":
+    print("Error: something went wrong")
+    sys.exit(1)
+if mode == "sleep":
+    time.sleep(30)
+with open("mlc", "w") as out:
+    out.write({mlc!r} if mode == "ok" else "not codeml output\\n")
+print("Time used: 0:01")
+"""
+
+
+@pytest.fixture
+def stub_codeml(tmp_path, monkeypatch):
+    """ Puts a stub codeml first on PATH and returns a function giving the number of times it ran. """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "codeml"
+    script.write_text(STUB.format(python=sys.executable, mlc=MLC))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    calls = tmp_path / "calls.txt"
+    calls.write_text("")
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("STUB_CODEML_CALLS", str(calls))
+    return lambda: len(calls.read_text().splitlines())
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    alignment = tmp_path / "h5.phy"
+    alignment.write_text(" 3 6\nA  ATGAAA\nB  ATGAAG\nC  ATGCAA\n")
+    tree = tmp_path / "h5.nwk"
+    tree.write_text("(A, B, C);\n")
+    return [str(alignment)], [str(tree)]
+
+
+@pytest.fixture
+def job_dir(inputs, tmp_path):
+    job = build_jobs(*inputs, models=["M0"])[0]
+    return prepare_job(job, str(tmp_path / "runs"))
+
+
+def test_ok_job_is_parsed(stub_codeml, job_dir):
+    row = run_job(job_dir)
+
+    assert row["status"] == "ok"
+    assert row["returncode"] == 0
+    assert row["lnL"] == pytest.approx(-1234.56789)
+    assert (row["np"], row["kappa"], row["omega"]) == (5, 2.0, 0.25)
+    assert "Time used" in open(os.path.join(job_dir, LOGFILE)).read()
+
+
+def test_nonzero_exit_is_failed(stub_codeml, job_dir, monkeypatch):
+    monkeypatch.setenv("STUB_CODEML", "fail")
+    row = run_job(job_dir)
+
+    assert (row["status"], row["returncode"]) == ("failed", 1)
+    assert "something went wrong" in open(os.path.join(job_dir, LOGFILE)).read()
+
+
+def test_slow_job_times_out(stub_codeml, job_dir, monkeypatch):
+    monkeypatch.setenv("STUB_CODEML", "sleep")
+    row = run_job(job_dir, timeout=0.5)
+
+    assert row["status"] == "timeout"
+    assert row["seconds"] < 10
+
+
+def test_unreadable_output_is_parse_error(stub_codeml, job_dir, monkeypatch):
+    monkeypatch.setenv("STUB_CODEML", "garbage")
+    assert run_job(job_dir)["status"] == "parse_error"
+
+
+def test_missing_executable_is_not_found(job_dir, tmp_path):
+    assert run_job(job_dir, codeml_path=str(tmp_path / "no_codeml"))["status"] == "not_found"
+
+
+def test_executable_without_permission_is_failed(job_dir, tmp_path):
+    script = tmp_path / "codeml_no_exec"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o644)
+    if os.access(script, os.X_OK):
+        pytest.skip("running as a user that can execute any file")
+
+    assert run_job(job_dir, codeml_path=str(script))["status"] == "failed"
+
+
+def test_batch_runs_every_job_and_reuses_cached_results(stub_codeml, inputs, tmp_path):
+    jobs = build_jobs(*inputs, models=["M0", "M1a"])
+    options = dict(work_dir=str(tmp_path / "runs"), processes=2, quiet=True, cache_dir=str(tmp_path / "cache"))
+
+    first = run_batch(jobs, **options)
+    assert list(first["job"]) == [job.name for job in jobs]
+    assert list(first["status"]) == ["ok", "ok"]
+    assert stub_codeml() == 2
+
+    second = run_batch(jobs, **options)
+    assert list(second["status"]) == ["cached", "cached"]
+    assert list(second["lnL"]) == list(first["lnL"])
+    assert stub_codeml() == 2
+
+
+def test_failed_jobs_are_not_cached(stub_codeml, inputs, tmp_path, monkeypatch):
+    jobs = build_jobs(*inputs, models=["M0"])
+    options = dict(work_dir=str(tmp_path / "runs"), quiet=True, cache_dir=str(tmp_path / "cache"))
+
+    monkeypatch.setenv("STUB_CODEML", "fail")
+    assert list(run_batch(jobs, **options)["status"]) == ["failed"]
+
+    monkeypatch.setenv("STUB_CODEML", "ok")
+    assert list(run_batch(jobs, **options)["status"]) == ["ok"]
+    assert stub_codeml() == 2
@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from HPAI_maps import data_sources
+from HPAI_maps.data_sources import DataSource, fetch_all, fetch_text, get_session
+
+CSV = "State,Count\nOhio,3\nTexas,5\n"
+
+
+def test_revalidates_with_etag_and_keeps_copy_on_304(stand_in, tmp_path):
+    def route(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, ""
+        return 200, {"ETag": '"v1"'}, CSV
+    stand_in.routes["/data.csv"] = route
+
+    assert fetch_text(stand_in.url("/data.csv"), ttl=0, cache_dir=tmp_path) == CSV
+    assert fetch_text(stand_in.url("/data.csv"), ttl=0, cache_dir=tmp_path) == CSV
+
+    assert stand_in.hits("/data.csv") == 2
+    assert "If-None-Match" not in stand_in.requests[0][1]
+    assert stand_in.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_copy_younger_than_ttl_is_used_without_request(stand_in, tmp_path):
+    stand_in.routes["/data.csv"] = (200, {}, CSV)
+
+    for _ in range(3):
+        assert fetch_text(stand_in.url("/data.csv"), ttl=3600, cache_dir=tmp_path) == CSV
+    assert stand_in.hits("/data.csv") == 1
+
+
+def test_offline_falls_back_to_cached_copy(stand_in, tmp_path, capsys):
+    url = stand_in.url("/data.csv")
+    stand_in.routes["/data.csv"] = (200, {}, CSV)
+    fetch_text(url, cache_dir=tmp_path)
+
+    stand_in.close()
+    assert fetch_text(url, ttl=0, cache_dir=tmp_path, timeout=2, retries=1) == CSV
+    assert "using the copy from" in capsys.readouterr().out
+
+
+def test_server_error_is_retried(stand_in, tmp_path):
+    stand_in.routes["/data.csv"] = (503, {}, "busy")
+
+    with pytest.raises(requests.HTTPError):
+        fetch_text(stand_in.url("/data.csv"), cache_dir=tmp_path, retries=2)
+    assert stand_in.hits("/data.csv") == 3
+
+
+def test_client_error_is_not_retried(stand_in, tmp_path):
+    with pytest.raises(requests.HTTPError):
+        fetch_text(stand_in.url("/missing.csv"), cache_dir=tmp_path, retries=2)
+    assert stand_in.hits("/missing.csv") == 1
+
+
+def test_fetch_all_downloads_sources_at_the_same_time(stand_in, tmp_path):
+    names = ["a", "b", "c"]
+    for name in names:
+        stand_in.routes[f"/{name}.csv"] = (200, {}, CSV)
+        stand_in.delay[f"/{name}.csv"] = 0.5
+    sources = [DataSource(name, stand_in.url(f"/{name}.csv")) for name in names]
+
+    start = time.perf_counter()
+    results = fetch_all(sources, cache_dir=tmp_path)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(results) == names
+    assert all(results[name]["Count"].sum() == 8 for name in names)
+    assert elapsed < 1.2  # One after another would take at least 1.5 s
+
+
+def test_fetch_all_without_raise_errors_returns_none_for_failed_source(stand_in, tmp_path):
+    stand_in.routes["/good.csv"] = (200, {}, CSV)
+    sources = [DataSource("good", stand_in.url("/good.csv")), DataSource("bad", stand_in.url("/bad.csv"))]
+
+    results = fetch_all(sources, cache_dir=tmp_path, raise_errors=False)
+
+    assert results["bad"] is None
+    assert len(results["good"]) == 2
+
+
+def test_csv_without_charset_is_read_as_utf8(stand_in, tmp_path):
+    text = "State,Species\nQuébec,Renard roux\n"
+    stand_in.routes["/utf8.csv"] = (200, {"Content-Type": "text/csv"}, text)
+
+    assert fetch_text(stand_in.url("/utf8.csv"), cache_dir=tmp_path) == text
+    assert fetch_text(stand_in.url("/utf8.csv"), cache_dir=tmp_path) == text  # From the cache
+
+
+def test_every_thread_gets_its_own_session():
+    barrier = threading.Barrier(3)
+
+    def session_of_worker():
+        barrier.wait()  # All three workers are alive at once, so none reuses another's thread
+        return get_session()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        sessions = list(pool.map(lambda _: session_of_worker(), range(3)))
+
+    assert len({id(session) for session in sessions}) == 3
+    assert get_session() is get_session()
+    assert get_session() not in sessions
+
+
+def test_fetch_all_workers_do_not_share_a_session(stand_in, tmp_path, monkeypatch):
+    used = []
+    original = data_sources.get_session
+    monkeypatch.setattr(data_sources, "get_session", lambda: used.append(original()) or used[-1])
+    for name in "ab":
+        stand_in.routes[f"/{name}.csv"] = (200, {}, CSV)
+        stand_in.delay[f"/{name}.csv"] = 0.2
+
+    fetch_all([DataSource(name, stand_in.url(f"/{name}.csv")) for name in "ab"], cache_dir=tmp_path)
+
+    assert len(used) == 2 and used[0] is not used[1]
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from HPAI_maps.detection_store import ingest, monthly_counts, yearly_counts
+
+
+def feed(*rows, extra=None):
+    data = pd.DataFrame(rows, columns=["State", "Date Detected", "Species"])
+    data["Note"] = "none"
+    for column, values in (extra or {}).items():
+        data[column] = values
+    return data
+
+
+ROWS = [("Ohio", "1/2/2025", "Red fox"),
+        ("Ohio", "1/2/2025", "Red fox"),
+        ("Texas", "3/15/2024", "House mouse")]
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = str(tmp_path / "detections.sqlite")
+
+    def add(data, **options):
+        return ingest(data, "wild_mammals", "Date Detected", db_path=db_path, identity_columns=("Species",),
+                      **options)
+    add.db_path = db_path
+    return add
+
+
+def totals(store):
+    counts = yearly_counts("wild_mammals", db_path=store.db_path)
+    return dict(zip(zip(counts["Abbreviation"], counts["Year"]), counts["Count"]))
+
+
+def test_reingest_adds_nothing(store):
+    assert store(feed(*ROWS)) == 3
+    assert store(feed(*ROWS)) == 0
+    assert totals(store) == {("OH", 2025): 2, ("TX", 2024): 1}
+
+
+def test_identical_rows_are_counted_separately(store):
+    store(feed(*ROWS[:1]))
+    assert store(feed(*ROWS)) == 2
+    assert totals(store)[("OH", 2025)] == 2
+
+
+def test_revised_non_identity_column_is_not_new(store):
+    store(feed(*ROWS))
+    revised = feed(*ROWS)
+    revised["Note"] = "confirmed"
+    assert store(revised) == 0
+
+
+@pytest.mark.parametrize("ohio", [("Ohio", "01/02/2025", "Red fox"),
+                                  ("Ohio", "2025-01-02 00:00:00", "Red fox"),
+                                  (" ohio ", "1/2/2025", "Red fox"),
+                                  ("OH", "1/2/2025", "red  fox")])
+def test_reformatted_identity_values_are_not_new(store, ohio):
+    store(feed(*ROWS))
+    assert store(feed(ohio, ohio, ROWS[2])) == 0
+    assert totals(store) == {("OH", 2025): 2, ("TX", 2024): 1}
+
+
+def test_new_column_rebuilds_category(store):
+    store(feed(*ROWS))
+    assert store(feed(*ROWS, extra={"County": ["A", "B", "C"]})) == 3
+    assert totals(store) == {("OH", 2025): 2, ("TX", 2024): 1}
+
+
+def test_withdrawn_detections_are_reported(store, capsys):
+    store(feed(*ROWS))
+    assert store(feed(*ROWS[1:])) == 0
+
+    assert "1 stored wild_mammals detection(s) are no longer in the feed" in capsys.readouterr().out
+    assert totals(store) == {("OH", 2025): 2, ("TX", 2024): 1}
+
+
+def test_withdrawn_detections_can_be_dropped(store):
+    store(feed(*ROWS))
+    store(feed(*ROWS[1:2], ("Utah", "2/1/2025", "Bobcat")), drop_withdrawn=True)
+
+    assert totals(store) == {("OH", 2025): 1, ("UT", 2025): 1}
+    months = monthly_counts("wild_mammals", store.db_path)
+    assert sorted(zip(months["Abbreviation"], months["Month"], months["Count"])) == [("OH", 1, 1), ("UT", 2, 1)]
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from HPAI_maps.scrape_CDC import (URL_VARIABLE, fetch_human_cases, list_snapshots, save_snapshot,
+                                  scrape_CDC_data)
+
+CASES = "State,State Total\nOhio,2\nTexas,5\n"
+
+PAGE = """<html><body>
+<h2>Exposure Source</h2>
+<table>
+<tr><th>State</th><th>Dairy</th><th>Poultry</th><th>Other</th><th>Unknown</th><th>Total</th></tr>
+<tr><td>Ohio</td><td>1</td><td>0</td><td>0</td><td>1</td><td>2</td></tr>
+<tr><td>Texas</td><td>4</td><td>1</td><td>0</td><td>0</td><td>5</td></tr>
+</table>
+</body></html>"""
+
+
+def test_csv_endpoint_is_used_when_it_has_the_columns(stand_in, tmp_path):
+    stand_in.routes["/cases.csv"] = (200, {}, CASES)
+    stand_in.routes["/page.html"] = (200, {}, PAGE)
+
+    data = fetch_human_cases(stand_in.url("/cases.csv"), stand_in.url("/page.html"), cache_dir=tmp_path)
+
+    assert list(data["State"]) == ["Ohio", "Texas"]
+    assert list(data["State Total"]) == [2, 5]
+
+
+def test_csv_endpoint_from_environment_variable(stand_in, tmp_path, monkeypatch):
+    stand_in.routes["/cases.csv"] = (200, {}, CASES)
+    monkeypatch.setenv(URL_VARIABLE, stand_in.url("/cases.csv"))
+
+    data = fetch_human_cases(page_url=stand_in.url("/page.html"), cache_dir=tmp_path)
+
+    assert data["State Total"].sum() == 7
+
+
+@pytest.mark.parametrize("route", [(404, {}, "not found"), (200, {}, "State,Cases\nOhio,2\n")])
+def test_falls_back_to_situation_page(stand_in, tmp_path, route):
+    stand_in.routes["/cases.csv"] = route
+    stand_in.routes["/page.html"] = (200, {}, "<html><body>No tables today</body></html>")
+
+    data = fetch_human_cases(stand_in.url("/cases.csv"), stand_in.url("/page.html"), cache_dir=tmp_path)
+
+    assert data is None  # The page was read, but it has no case table
+    assert stand_in.hits("/page.html") == 1
+
+
+def test_page_table_is_parsed(stand_in, tmp_path):
+    pytest.importorskip("lxml")
+    stand_in.routes["/page.html"] = (200, {}, PAGE)
+
+    data = fetch_human_cases(stand_in.url("/missing.csv"), stand_in.url("/page.html"), cache_dir=tmp_path)
+
+    assert list(data["State"]) == ["Ohio", "Texas"]
+    assert list(data["State Total"]) == [2, 5]
+
+
+def test_unchanged_table_is_not_saved_again(stand_in, tmp_path):
+    stand_in.routes["/cases.csv"] = (200, {}, CASES)
+    snapshots = tmp_path / "snapshots"
+    options = dict(snapshot_dir=str(snapshots), page_url=stand_in.url("/page.html"), cache_dir=str(tmp_path))
+
+    first = scrape_CDC_data(stand_in.url("/cases.csv"), **options)
+    second = scrape_CDC_data(stand_in.url("/cases.csv"), **options)
+    assert first == second
+    assert len(list_snapshots(str(snapshots))) == 1
+
+    stand_in.routes["/changed.csv"] = (200, {}, CASES + "Utah,1\n")
+    third = scrape_CDC_data(stand_in.url("/changed.csv"), **options)
+    assert third != first
+    assert len(list_snapshots(str(snapshots))) == 2
+    assert pd.read_csv(third)["State Total"].sum() == 8
+
+
+def test_previous_snapshot_is_used_when_nothing_can_be_fetched(stand_in, tmp_path):
+    snapshots = str(tmp_path / "snapshots")
+    saved = save_snapshot(pd.DataFrame({"State": ["Ohio"], "State Total": [2]}), snapshots)
+    stand_in.routes["/page.html"] = (500, {}, "error")
+
+    assert scrape_CDC_data(stand_in.url("/missing.csv"), snapshots, stand_in.url("/page.html"),
+                           str(tmp_path)) == saved
+
+
+def test_only_newest_snapshots_are_kept(tmp_path):
+    snapshots = str(tmp_path)
+    paths = [save_snapshot(pd.DataFrame({"State": ["Ohio"], "State Total": [total]}), snapshots, keep=3)
+             for total in range(5)]
+
+    assert list_snapshots(snapshots) == paths[-3:]
+    assert pd.read_csv(list_snapshots(snapshots)[-1])["State Total"].item() == 4
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from Bio.Phylo.TreeConstruction import DistanceMatrix, DistanceTreeConstructor
+
+from Phylogenetics.tree_construction import neighbor_joining, upgma
+
+
+def random_matrix(n, seed):
+    """ DistanceMatrix of n taxa with random distances, all different so no step has a tie. """
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0.05, 1.0, size=(n, n))
+    names = [f"T{i}" for i in range(n)]
+    return DistanceMatrix(names, [[float(values[i, j]) for j in range(i)] + [0.0] for i in range(n)])
+
+
+def patristic(tree, names):
+    """ Matrix of the distances between every pair of tips along the tree. """
+    tips = {tip.name: tip for tip in tree.get_terminals()}
+    return np.array([[tree.distance(tips[a], tips[b]) if a != b else 0.0 for b in names] for a in names])
+
+
+@pytest.mark.parametrize("n, seed", [(3, 0), (4, 1), (8, 2), (15, 3), (30, 4)])
+def test_neighbor_joining_matches_biopython(n, seed):
+    matrix = random_matrix(n, seed)
+    expected = patristic(DistanceTreeConstructor().nj(matrix), matrix.names)
+
+    np.testing.assert_allclose(patristic(neighbor_joining(matrix), matrix.names), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("n, seed", [(3, 5), (4, 6), (8, 7), (15, 8), (30, 9)])
+def test_weighted_upgma_matches_biopython(n, seed):
+    matrix = random_matrix(n, seed)
+    expected = patristic(DistanceTreeConstructor().upgma(matrix), matrix.names)
+
+    np.testing.assert_allclose(patristic(upgma(matrix, weighted=True), matrix.names), expected, atol=1e-9)
+
+
+def test_upgma_gives_an_ultrametric_tree():
+    matrix = random_matrix(12, 10)
+    tree = upgma(matrix)
+    depths = [tree.distance(tip) for tip in tree.get_terminals()]
+    np.testing.assert_allclose(depths, depths[0], atol=1e-9)